@@ -1,127 +1,104 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List
+from collections import defaultdict
 from database import get_db
-from models import Candidate, DailyLog, MonthlyKPI, CandidateSection, Project, User
+from models import Candidate, DailyLog, MonthlyKPI, CandidateSection, User
 from schemas import CandidateCreate, CandidateUpdate, CandidateResponse, CandidateReorder
 from auth import get_current_active_user
+from log_window import LogWindow, log_window
+from photo_store import photo_field
+from versioning import bump_project_version, project_data_version, stamp_changes, record_deletion, conditional_response, make_etag
+from access import access_index, verify_project_access
+from ordering import next_display_order, reorder_rows
+from serializers import serialize_daily_log, serialize_monthly_kpi
 
 router = APIRouter(prefix="/api/candidates", tags=["Candidates"])
 
-def verify_project_access(project_id: int, user: User, db: Session):
-    """Helper to ensure user owns project and is assigned if not admin"""
-    query = db.query(Project).filter(
-        Project.id == project_id, 
-        Project.organization_id == user.organization_id
-    )
-    
-    # Non-admins must be assigned to the project
-    if user.role != "admin":
-        query = query.filter(Project.assigned_leads.any(User.id == user.id))
-        
-    project = query.first()
-    if not project:
-        raise HTTPException(status_code=403, detail="Not authorized to access this project")
-    return project
+def load_candidate_payloads(candidates: List[Candidate], db: Session, window: LogWindow) -> List[dict]:
+    """Build the frontend payload for a list of candidates.
 
-@router.get("/project/{project_id}")
-def get_candidates_by_project(
-    project_id: int, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Get all candidates for a specific project with their daily logs and KPIs"""
-    verify_project_access(project_id, current_user, db)
+    Sections, daily logs and KPIs are fetched with one query per table for the
+    whole list and grouped in Python, so the query count does not grow with
+    the number of candidates. Only daily logs inside `window` are included.
+    """
+    candidate_ids = [c.id for c in candidates]
+    section_ids = defaultdict(list)
+    daily_logs = defaultdict(dict)
+    monthly_kpis = defaultdict(dict)
 
-    candidates = db.query(Candidate).filter(
-        Candidate.project_id == project_id
-    ).order_by(Candidate.display_order).all()
-    
-    # Transform each candidate to include daily logs and KPIs
-    result = []
-    for candidate in candidates:
-        # Get section assignments for this candidate
+    if candidate_ids:
         section_assignments = db.query(CandidateSection).filter(
-            CandidateSection.candidate_id == candidate.id
-        ).all()
-        section_ids = [cs.section_id for cs in section_assignments]
-        
-        # Get daily logs
-        daily_logs = db.query(DailyLog).filter(
-            DailyLog.candidate_id == candidate.id
+            CandidateSection.candidate_id.in_(candidate_ids)
         ).all()
-        
-        # Get monthly KPIs
-        monthly_kpis = db.query(MonthlyKPI).filter(
-            MonthlyKPI.candidate_id == candidate.id
-        ).order_by(MonthlyKPI.month.desc()).all()
-        
-        # Transform to frontend format
-        candidate_data = {
+        for cs in section_assignments:
+            section_ids[cs.candidate_id].append(cs.section_id)
+
+        # Plain rows, serialized straight from the tuples
+        logs = db.execute(select(*serialize_daily_log.columns).where(
+            DailyLog.candidate_id.in_(candidate_ids),
+            DailyLog.log_date.between(*window)
+        ).order_by(DailyLog.log_date))
+        for log in logs:
+            daily_logs[log.candidate_id][str(log.log_date)] = serialize_daily_log(log)
+
+        kpis = db.execute(select(*serialize_monthly_kpi.columns).where(
+            MonthlyKPI.candidate_id.in_(candidate_ids)
+        ).order_by(MonthlyKPI.month.desc()))
+        for kpi in kpis:
+            monthly_kpis[kpi.candidate_id][str(kpi.month)] = serialize_monthly_kpi(kpi)
+
+    return [
+        {
             "id": candidate.id,
             "name": candidate.name,
             "photo": candidate.photo,
             "role": candidate.role,
             "displayOrder": candidate.display_order,
-            "section_ids": section_ids,  # ✅ ADDED THIS
-            "dailyLogs": {
-                str(log.log_date): {
-                    "timeIn": str(log.time_in) if log.time_in else None,
-                    "timeOut": str(log.time_out) if log.time_out else None,
-                    "taskBriefing": log.task_briefing,
-                    "tbtConducted": log.tbt_conducted,
-                    "violationBriefing": log.violation_briefing,
-                    "checklistSubmitted": log.checklist_submitted,
-                    "inductionsCovered": log.inductions_covered,
-                    "barcodeImplemented": log.barcode_implemented,
-                    "attendanceVerified": log.attendance_verified,
-                    "safetyObservationsRecorded": log.safety_observations_recorded,
-                    "sorNcrClosed": log.sor_ncr_closed,
-                    "mockDrillParticipated": log.mock_drill_participated,
-                    "campaignParticipated": log.campaign_participated,
-                    "monthlyInspectionsCompleted": log.monthly_inspections_completed,
-                    "nearMissReported": log.near_miss_reported,
-                    "weeklyTrainingBriefed": log.weekly_training_briefed,
-                    "dailyReportsFollowup": log.daily_reports_followup,
-                    "msraCommunicated": log.msra_communicated,
-                    "consultantResponses": log.consultant_responses,
-                    "weeklyTbtFullParticipation": log.weekly_tbt_full_participation,
-                    "welfareFacilitiesMonitored": log.welfare_facilities_monitored,
-                    "mondayNcrShared": log.monday_ncr_shared,
-                    "safetyWalksConducted": log.safety_walks_conducted,
-                    "trainingSessionsConducted": log.training_sessions_conducted,
-                    "barcodeSystem100": log.barcode_system_100,
-                    "taskBriefingsParticipating": log.task_briefings_participating,
-                    "comment": log.comment,
-                    "description": log.description
-                }
-                for log in daily_logs
-            },
-            "monthlyKPIs": {
-                str(kpi.month): {
-                    "observationsOpen": kpi.observations_open,
-                    "observationsClosed": kpi.observations_closed,
-                    "violations": kpi.violations,
-                    "ncrsOpen": kpi.ncrs_open,
-                    "ncrsClosed": kpi.ncrs_closed,
-                    "weeklyReportsOpen": kpi.weekly_reports_open,
-                    "weeklyReportsClosed": kpi.weekly_reports_closed
-                }
-                for kpi in monthly_kpis
-            }
+            "section_ids": section_ids[candidate.id],
+            "dailyLogs": daily_logs[candidate.id],
+            "monthlyKPIs": monthly_kpis[candidate.id]
         }
-        
-        result.append(candidate_data)
+        for candidate in candidates
+    ]
+
+def project_candidates_payload(db: Session, project_id: int, window: LogWindow, current_user: User,
+                               request: Request, response: Response):
+    verify_project_access(project_id, current_user, db)
+
+    # Answer 304 before loading anything if the client already has this version
+    etag = make_etag("candidates", project_id, project_data_version(db, project_id), *window)
+    not_modified = conditional_response(request, response, etag)
+    if not_modified:
+        return not_modified
+
+    candidates = db.query(Candidate).filter(
+        Candidate.project_id == project_id
+    ).order_by(Candidate.display_order).all()
     
-    return result
+    return load_candidate_payloads(candidates, db, window)
+
+@router.get("/project/{project_id}")
+def get_candidates_by_project(
+    project_id: int, 
+    request: Request,
+    response: Response,
+    window: LogWindow = Depends(log_window),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get all candidates for a specific project with their daily logs (within ?from=&to= or ?month=) and KPIs"""
+    return project_candidates_payload(db, project_id, window, current_user, request, response)
 
 @router.get("/{candidate_id}")
 def get_candidate(
     candidate_id: int, 
+    window: LogWindow = Depends(log_window),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get a specific candidate by ID with daily logs and KPIs"""
+    """Get a specific candidate by ID with daily logs (within ?from=&to= or ?month=) and KPIs"""
     candidate = db.query(Candidate).filter(Candidate.id == candidate_id).first()
     if not candidate:
         raise HTTPException(status_code=404, detail="Candidate not found")
@@ -129,78 +106,7 @@ def get_candidate(
     # Security: Verify project ownership
     verify_project_access(candidate.project_id, current_user, db)
     
-    # Get section assignments for this candidate
-    section_assignments = db.query(CandidateSection).filter(
-        CandidateSection.candidate_id == candidate.id
-    ).all()
-    section_ids = [cs.section_id for cs in section_assignments]
-    
-    # Get daily logs
-    daily_logs = db.query(DailyLog).filter(
-        DailyLog.candidate_id == candidate.id
-    ).all()
-    
-    # Get monthly KPIs
-    monthly_kpis = db.query(MonthlyKPI).filter(
-        MonthlyKPI.candidate_id == candidate.id
-    ).order_by(MonthlyKPI.month.desc()).all()
-    
-    # Transform to frontend format
-    candidate_data = {
-        "id": candidate.id,
-        "name": candidate.name,
-        "photo": candidate.photo,
-        "role": candidate.role,
-        "displayOrder": candidate.display_order,
-        "section_ids": section_ids,  # ✅ ADDED THIS
-        "dailyLogs": {
-            str(log.log_date): {
-                "timeIn": str(log.time_in) if log.time_in else None,
-                "timeOut": str(log.time_out) if log.time_out else None,
-                "taskBriefing": log.task_briefing,
-                "tbtConducted": log.tbt_conducted,
-                "violationBriefing": log.violation_briefing,
-                "checklistSubmitted": log.checklist_submitted,
-                "inductionsCovered": log.inductions_covered,
-                "barcodeImplemented": log.barcode_implemented,
-                "attendanceVerified": log.attendance_verified,
-                "safetyObservationsRecorded": log.safety_observations_recorded,
-                "sorNcrClosed": log.sor_ncr_closed,
-                "mockDrillParticipated": log.mock_drill_participated,
-                "campaignParticipated": log.campaign_participated,
-                "monthlyInspectionsCompleted": log.monthly_inspections_completed,
-                "nearMissReported": log.near_miss_reported,
-                "weeklyTrainingBriefed": log.weekly_training_briefed,
-                "dailyReportsFollowup": log.daily_reports_followup,
-                "msraCommunicated": log.msra_communicated,
-                "consultantResponses": log.consultant_responses,
-                "weeklyTbtFullParticipation": log.weekly_tbt_full_participation,
-                "welfareFacilitiesMonitored": log.welfare_facilities_monitored,
-                "mondayNcrShared": log.monday_ncr_shared,
-                "safetyWalksConducted": log.safety_walks_conducted,
-                "trainingSessionsConducted": log.training_sessions_conducted,
-                "barcodeSystem100": log.barcode_system_100,
-                "taskBriefingsParticipating": log.task_briefings_participating,
-                "comment": log.comment,
-                "description": log.description
-            }
-            for log in daily_logs
-        },
-        "monthlyKPIs": {
-            str(kpi.month): {
-                "observationsOpen": kpi.observations_open,
-                "observationsClosed": kpi.observations_closed,
-                "violations": kpi.violations,
-                "ncrsOpen": kpi.ncrs_open,
-                "ncrsClosed": kpi.ncrs_closed,
-                "weeklyReportsOpen": kpi.weekly_reports_open,
-                "weeklyReportsClosed": kpi.weekly_reports_closed
-            }
-            for kpi in monthly_kpis
-        }
-    }
-    
-    return candidate_data
+    return load_candidate_payloads([candidate], db, window)[0]
 
 @router.post("", response_model=CandidateResponse)
 def create_candidate(
@@ -212,19 +118,17 @@ def create_candidate(
     # Security: Verify project ownership
     verify_project_access(candidate.project_id, current_user, db)
 
-    # Get max display_order for this project
-    max_order = db.query(Candidate).filter(
-        Candidate.project_id == candidate.project_id
-    ).count()
-    
-    # Create candidate data without display_order from input
+    # Create candidate data without display_order from input; new candidates go last
     candidate_data = candidate.model_dump()
-    candidate_data['display_order'] = max_order  # Override with calculated order
+    candidate_data['display_order'] = next_display_order(db, Candidate, candidate.project_id)
+    candidate_data['photo'] = photo_field(candidate_data.get('photo'))
     
     db_candidate = Candidate(**candidate_data)
     db.add(db_candidate)
+    stamp_changes(db, candidate.project_id, db_candidate)
     db.commit()
     db.refresh(db_candidate)
+    access_index.remember_candidate(db_candidate.id, db_candidate.project_id)
     return db_candidate
 
 @router.put("/{candidate_id}", response_model=CandidateResponse)
@@ -245,9 +149,13 @@ def update_candidate(
     if current_user.role == "viewer":
         raise HTTPException(status_code=403, detail="Viewers cannot update candidates")
 
-    for key, value in candidate.model_dump(exclude_unset=True).items():
+    update_data = candidate.model_dump(exclude_unset=True)
+    if "photo" in update_data:
+        update_data["photo"] = photo_field(update_data["photo"])
+    for key, value in update_data.items():
         setattr(db_candidate, key, value)
     
+    stamp_changes(db, db_candidate.project_id, db_candidate)
     db.commit()
     db.refresh(db_candidate)
     return db_candidate
@@ -271,8 +179,11 @@ def delete_candidate(
     # Security: Verify project ownership
     verify_project_access(db_candidate.project_id, current_user, db)
 
+    version = bump_project_version(db, db_candidate.project_id)
+    record_deletion(db, db_candidate.project_id, version, "candidate", db_candidate.id)
     db.delete(db_candidate)
     db.commit()
+    access_index.forget_candidate(candidate_id)
     return {"message": "Candidate deleted successfully"}
 
 @router.put("/project/{project_id}/reorder")
@@ -286,13 +197,6 @@ def reorder_candidates(
     # Security: Verify project ownership
     verify_project_access(project_id, current_user, db)
 
-    for index, candidate_id in enumerate(reorder.candidate_ids):
-        candidate = db.query(Candidate).filter(
-            Candidate.id == candidate_id,
-            Candidate.project_id == project_id
-        ).first()
-        if candidate:
-            candidate.display_order = index
-    
+    moved = reorder_rows(db, Candidate, project_id, reorder.candidate_ids)
     db.commit()
-    return {"message": "Candidates reordered successfully"}
\ No newline at end of file
+    return {"message": "Candidates reordered successfully", "moved": moved}
\ No newline at end of file
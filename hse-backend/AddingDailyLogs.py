@@ -1,26 +1,90 @@
-from fastapi import APIRouter, Depends, HTTPException
+from collections import defaultdict
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List, Tuple
 from datetime import date, time
-from database import get_db
-from models import DailyLog, MonthlyKPI, Candidate, Project, User
-from schemas import DailyLogCreate, DailyLogResponse, MonthlyKPICreate, MonthlyKPIResponse
+from database import get_db, insert_for
+from models import Candidate, DailyLog, MonthlyKPI, Project, User
+from checklist import CHECKLIST_COLUMNS, pack_answers
+from schemas import DailyLogBulkResult, DailyLogCreate, DailyLogResponse, MonthlyKPICreate, MonthlyKPIImportReport, MonthlyKPIResponse
 from auth import get_current_active_user
+from rollups import log_contribution, apply_rollup_delta, apply_rollup_deltas
+from versioning import bump_project_version, bump_project_versions, record_deletion
+from access import access_index, accessible_candidates, verify_candidate_access, verify_project_access
+from kpi_import import import_monthly_kpis, request_rows
+from log_window import parse_month
 
 router = APIRouter(prefix="/api", tags=["Daily Logs & Monthly KPIs"])
 
-def verify_candidate_access(candidate_id: int, user: User, db: Session):
-    """Ensure user's organization owns the candidate (via Project)"""
-    candidate = db.query(Candidate).join(Project).filter(
-        Candidate.id == candidate_id, 
-        Project.organization_id == user.organization_id
-    ).first()
-    if not candidate:
-        raise HTTPException(status_code=403, detail="Not authorized for this candidate")
-    return candidate
+MAX_BULK_LOGS = 2000
+BULK_UPSERT_CHUNK = 500  # Rows per INSERT, under the bind parameter limit
+
+LogKey = Tuple[int, date]  # (candidate_id, log_date)
 
 # ==================== DAILY LOGS ====================
 
+def upsert_daily_logs(db: Session, merged: Dict[LogKey, dict], projects: Dict[int, int]):
+    """Write logs keyed by (candidate_id, log_date) with INSERT ... ON CONFLICT DO UPDATE.
+
+    `merged` holds the fields sent for each log (only those are updated on
+    conflict, checklist answers bit by bit) and `projects` maps candidate ids
+    to their project, which is bumped once. Rollups are adjusted. Returns
+    (before, saved): the rows as they were and the DailyLog objects written,
+    by key. The caller commits.
+    """
+    before, saved = {}, {}
+    if not merged:
+        return before, saved
+
+    table = DailyLog.__table__
+    # The bump locks the projects until commit, so `before` can't go stale
+    versions = bump_project_versions(db, {projects[candidate_id] for candidate_id, _ in merged})
+    for log in db.execute(select(table).where(
+        table.c.candidate_id.in_({candidate_id for candidate_id, _ in merged}),
+        table.c.log_date.in_({log_date for _, log_date in merged})
+    )):
+        if (log.candidate_id, log.log_date) in merged:
+            before[(log.candidate_id, log.log_date)] = log
+
+    # Rows are grouped by the columns and questions they set (normally a single group)
+    shapes = defaultdict(list)
+    for (candidate_id, _), fields in merged.items():
+        given, answered, yes = pack_answers(fields)
+        values = {column: value for column, value in fields.items() if column not in CHECKLIST_COLUMNS}
+        values.update(checklist_answered=answered, checklist_yes=yes, change_version=versions[projects[candidate_id]])
+        shapes[(frozenset(values), given)].append(values)
+
+    insert = insert_for(db)
+    for (columns, given), values in shapes.items():
+        for start in range(0, len(values), BULK_UPSERT_CHUNK):
+            statement = insert(DailyLog).values(values[start:start + BULK_UPSERT_CHUNK])
+            set_ = {column: statement.excluded[column] for column in columns
+                    if column not in ("candidate_id", "log_date", "checklist_answered", "checklist_yes")}
+            if given:
+                # Replace the bits of the questions sent, keep the others
+                for column in ("checklist_answered", "checklist_yes"):
+                    set_[column] = table.c[column].bitwise_and(~given).bitwise_or(statement.excluded[column])
+            statement = statement.on_conflict_do_update(
+                index_elements=["candidate_id", "log_date"], set_=set_
+            ).returning(DailyLog)
+            for log in db.scalars(statement, execution_options={"populate_existing": True}):
+                saved[(log.candidate_id, log.log_date)] = log
+
+    apply_rollup_deltas(db, [
+        (log_contribution(before.get(key)), log_contribution(log)) for key, log in saved.items()
+    ])
+    return before, saved
+
+def save_daily_log(db: Session, log_data: DailyLogCreate, current_user: User):
+    """Create the log for (candidate, date), or update it if it exists"""
+    project_id = verify_candidate_access(log_data.candidate_id, current_user, db)
+    key = (log_data.candidate_id, log_data.log_date)
+    _, saved = upsert_daily_logs(db, {key: log_data.model_dump(exclude_unset=True)}, {log_data.candidate_id: project_id})
+    db.commit()
+    return saved[key]
+
 @router.post("/daily-logs", response_model=DailyLogResponse)
 def create_or_update_daily_log(
     log_data: DailyLogCreate, 
@@ -28,29 +92,48 @@ def create_or_update_daily_log(
     current_user: User = Depends(get_current_active_user)
 ):
     """Create or update a daily log (Secure)"""
-    verify_candidate_access(log_data.candidate_id, current_user, db)
+    return save_daily_log(db, log_data, current_user)
 
-    # Check if log already exists for this candidate and date
-    existing_log = db.query(DailyLog).filter(
-        DailyLog.candidate_id == log_data.candidate_id,
-        DailyLog.log_date == log_data.log_date
-    ).first()
-    
-    if existing_log:
-        # Update existing log
-        for key, value in log_data.model_dump(exclude_unset=True).items():
-            if key != 'candidate_id':  # Don't update candidate_id
-                setattr(existing_log, key, value)
-        db.commit()
-        db.refresh(existing_log)
-        return existing_log
-    else:
-        # Create new log
-        db_log = DailyLog(**log_data.model_dump())
-        db.add(db_log)
-        db.commit()
-        db.refresh(db_log)
-        return db_log
+def save_daily_logs(db: Session, rows: List[DailyLogCreate], current_user: User) -> List[DailyLogBulkResult]:
+    """Upsert many logs with one access lookup and one statement per chunk"""
+    projects = accessible_candidates({row.candidate_id for row in rows}, current_user, db)
+
+    # Rows for the same candidate and date are merged, later values winning
+    merged = {}
+    for row in rows:
+        if row.candidate_id in projects:
+            merged.setdefault((row.candidate_id, row.log_date), {}).update(row.model_dump(exclude_unset=True))
+
+    before, saved = upsert_daily_logs(db, merged, projects)
+    db.commit()
+
+    results = []
+    for index, row in enumerate(rows):
+        key = (row.candidate_id, row.log_date)
+        log = saved.get(key)
+        results.append(DailyLogBulkResult(
+            index=index,
+            candidate_id=row.candidate_id,
+            log_date=row.log_date,
+            status="forbidden" if log is None else "updated" if key in before else "created",
+            log=log and DailyLogResponse.model_validate(log)
+        ))
+    return results
+
+@router.post("/daily-logs/bulk", response_model=List[DailyLogBulkResult])
+def bulk_upsert_daily_logs(
+    logs: List[DailyLogCreate],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Create or update many daily logs at once, e.g. a week of a project's checklist grid.
+
+    Returns one result per row, in request order. Rows for candidates the user
+    can't access are skipped with status "forbidden"; the rest are saved.
+    """
+    if len(logs) > MAX_BULK_LOGS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_LOGS} logs per request")
+    return save_daily_logs(db, logs, current_user)
 
 @router.get("/daily-logs/candidate/{candidate_id}", response_model=List[DailyLogResponse])
 def get_daily_logs_by_candidate(
@@ -88,18 +171,57 @@ def update_daily_log(
     current_user: User = Depends(get_current_active_user)
 ):
     """Update an existing daily log (Secure)"""
-    db_log = db.query(DailyLog).filter(DailyLog.id == log_id).first()
-    if not db_log:
+    # Bump (and so lock) the log's project first: the log is read under that
+    # lock, so the rollup delta is computed from its current values
+    locked = db.execute(
+        update(Project)
+        .where(Project.id == select(Candidate.project_id).join(DailyLog, DailyLog.candidate_id == Candidate.id)
+               .where(DailyLog.id == log_id).scalar_subquery())
+        .values(data_version=Project.data_version + 1)
+        .returning(Project.id, Project.data_version)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if locked is None:
         raise HTTPException(status_code=404, detail="Daily log not found")
+    project_id, version = locked
+    verify_project_access(project_id, current_user, db)
     
-    verify_candidate_access(db_log.candidate_id, current_user, db)
+    db_log = db.query(DailyLog).filter(DailyLog.id == log_id).with_for_update().populate_existing().first()
+    if db_log is None:
+        raise HTTPException(status_code=404, detail="Daily log not found")
+    if access_index.candidate_project_id(db_log.candidate_id, db) != project_id:
+        # Moved to another project between the bump and the read
+        raise HTTPException(status_code=409, detail="The daily log was changed meanwhile, please try again")
+    if log_data.candidate_id != db_log.candidate_id:
+        # Moving the log to another candidate needs access to that one too
+        target_project_id = verify_candidate_access(log_data.candidate_id, current_user, db)
+        if target_project_id != project_id:
+            record_deletion(db, project_id, version, "daily_log", db_log.id,
+                            candidate_id=db_log.candidate_id, log_date=str(db_log.log_date))
+            version = bump_project_version(db, target_project_id)
     
-    for key, value in log_data.model_dump(exclude_unset=True).items():
-        setattr(db_log, key, value)
+    before = log_contribution(db_log)
+    fields = log_data.model_dump(exclude_unset=True)
+    values = {column: value for column, value in fields.items() if column not in CHECKLIST_COLUMNS}
+    given, answered, yes = pack_answers(fields)
+    if given:
+        values["checklist_answered"] = DailyLog.checklist_answered.bitwise_and(~given).bitwise_or(answered)
+        values["checklist_yes"] = DailyLog.checklist_yes.bitwise_and(~given).bitwise_or(yes)
+    values["change_version"] = version
+    try:
+        db_log = db.scalars(
+            update(DailyLog).where(DailyLog.id == log_id).values(**values).returning(DailyLog),
+            execution_options={"populate_existing": True}
+        ).one()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="A daily log already exists for this candidate and date")
+    apply_rollup_delta(db, before, log_contribution(db_log))
     
+    # Serialized before the commit expires it, so no query to reload it
+    response = DailyLogResponse.model_validate(db_log)
     db.commit()
-    db.refresh(db_log)
-    return db_log
+    return response
 
 @router.delete("/daily-logs/{log_id}")
 def delete_daily_log(
@@ -112,8 +234,12 @@ def delete_daily_log(
     if not db_log:
         raise HTTPException(status_code=404, detail="Daily log not found")
     
-    verify_candidate_access(db_log.candidate_id, current_user, db)
+    project_id = verify_candidate_access(db_log.candidate_id, current_user, db)
     
+    version = bump_project_version(db, project_id)
+    record_deletion(db, project_id, version, "daily_log", db_log.id,
+                    candidate_id=db_log.candidate_id, log_date=str(db_log.log_date))
+    apply_rollup_delta(db, log_contribution(db_log), None)
     db.delete(db_log)
     db.commit()
     return {"message": "Daily log deleted successfully"}
@@ -127,29 +253,35 @@ def create_or_update_monthly_kpi(
     current_user: User = Depends(get_current_active_user)
 ):
     """Create or update monthly KPI (Secure)"""
-    verify_candidate_access(kpi_data.candidate_id, current_user, db)
+    project_id = verify_candidate_access(kpi_data.candidate_id, current_user, db)
+    version = bump_project_version(db, project_id)
 
-    # Check if KPI already exists for this candidate and month
-    existing_kpi = db.query(MonthlyKPI).filter(
-        MonthlyKPI.candidate_id == kpi_data.candidate_id,
-        MonthlyKPI.month == kpi_data.month
-    ).first()
-    
-    if existing_kpi:
-        # Update existing KPI
-        for key, value in kpi_data.model_dump(exclude_unset=True).items():
-            if key != 'candidate_id':  # Don't update candidate_id
-                setattr(existing_kpi, key, value)
-        db.commit()
-        db.refresh(existing_kpi)
-        return existing_kpi
-    else:
-        # Create new KPI
-        db_kpi = MonthlyKPI(**kpi_data.model_dump())
-        db.add(db_kpi)
-        db.commit()
-        db.refresh(db_kpi)
-        return db_kpi
+    # One statement: insert, or update the fields sent if the month exists
+    table = MonthlyKPI.__table__
+    statement = insert_for(db)(table).values(**kpi_data.model_dump(), change_version=version)
+    updates = kpi_data.model_dump(exclude_unset=True, exclude={"candidate_id", "month"})
+    kpi = db.execute(statement.on_conflict_do_update(
+        index_elements=["candidate_id", "month"],
+        set_=dict(updates, change_version=version)
+    ).returning(*table.c)).one()
+    db.commit()
+    return kpi
+
+@router.post("/monthly-kpis/project/{project_id}/import", response_model=MonthlyKPIImportReport,
+             response_model_exclude_none=True)
+def import_project_monthly_kpis(
+    project_id: int,
+    month: str = Query(..., description="YYYY-MM or the date to file the KPIs under"),
+    rows: List[dict] = Depends(request_rows),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Import a month of KPIs for many candidates of a project (JSON rows or CSV).
+
+    See kpi_import.py for the accepted columns. Returns counts and a status
+    per row; rows with errors are skipped and the rest are saved.
+    """
+    return import_monthly_kpis(db, project_id, parse_month(month), rows, current_user)
 
 @router.get("/monthly-kpis/candidate/{candidate_id}", response_model=List[MonthlyKPIResponse])
 def get_monthly_kpis_by_candidate(
@@ -191,12 +323,25 @@ def update_monthly_kpi(
     if not db_kpi:
         raise HTTPException(status_code=404, detail="Monthly KPI not found")
     
-    verify_candidate_access(db_kpi.candidate_id, current_user, db)
+    project_id = verify_candidate_access(db_kpi.candidate_id, current_user, db)
+    version = bump_project_version(db, project_id)
+    if kpi_data.candidate_id != db_kpi.candidate_id:
+        # Moving the KPI to another candidate needs access to that one too
+        target_project_id = verify_candidate_access(kpi_data.candidate_id, current_user, db)
+        if target_project_id != project_id:
+            record_deletion(db, project_id, version, "monthly_kpi", db_kpi.id,
+                            candidate_id=db_kpi.candidate_id, month=str(db_kpi.month))
+            version = bump_project_version(db, target_project_id)
     
     for key, value in kpi_data.model_dump(exclude_unset=True).items():
         setattr(db_kpi, key, value)
+    db_kpi.change_version = version
     
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="A monthly KPI already exists for this candidate and month")
     db.refresh(db_kpi)
     return db_kpi
 
@@ -211,8 +356,11 @@ def delete_monthly_kpi(
     if not db_kpi:
         raise HTTPException(status_code=404, detail="Monthly KPI not found")
     
-    verify_candidate_access(db_kpi.candidate_id, current_user, db)
+    project_id = verify_candidate_access(db_kpi.candidate_id, current_user, db)
     
+    version = bump_project_version(db, project_id)
+    record_deletion(db, project_id, version, "monthly_kpi", db_kpi.id,
+                    candidate_id=db_kpi.candidate_id, month=str(db_kpi.month))
     db.delete(db_kpi)
     db.commit()
     return {"message": "Monthly KPI deleted successfully"}
\ No newline at end of file
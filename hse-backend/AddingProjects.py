@@ -1,27 +1,102 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only, selectinload
 from typing import List
 from database import get_db
-from models import Project, User
-from schemas import ProjectCreate, ProjectUpdate, ProjectResponse
+from models import Candidate, Project, User
+from schemas import ProjectCreate, ProjectUpdate, ProjectResponse, ProjectSummary
 from auth import get_current_active_user
+from log_window import LogWindow, log_window
+from scoring import project_scores
+from rollups import covers_whole_months, rollup_field_counts
+from versioning import bump_project_version, bump_project_versions, conditional_response, make_etag
+from photo_store import photo_field
+from access import access_index, bump_access_version, can_access_project
 
 router = APIRouter(prefix="/api/projects", tags=["Projects"])
 
+def visible_projects_query(db: Session, user: User):
+    """Projects of the user's organization; non-admins only see projects assigned to them"""
+    query = db.query(Project).filter(Project.organization_id == user.organization_id)
+    
+    # Approach A: If user is not admin, only show projects assigned to them
+    if user.role != "admin":
+        # Using a subquery to avoid duplicates without needing .distinct() on JSON columns
+        query = query.filter(Project.assigned_leads.any(User.id == user.id))
+    return query
+
+def projects_not_modified(query, view: str, request: Request, response: Response, user: User):
+    """Cheap (id, version) stamp first; skip loading full rows when the client is current"""
+    stamp = query.with_entities(Project.id, Project.data_version).order_by(Project.id).all()
+    etag = make_etag(view, user.id, *(f"{pid}.{version}" for pid, version in stamp))
+    return conditional_response(request, response, etag)
+
+def visible_projects(db: Session, current_user: User, request: Request, response: Response):
+    query = visible_projects_query(db, current_user)
+    
+    not_modified = projects_not_modified(query, "projects", request, response, current_user)
+    if not_modified:
+        return not_modified
+    
+    # Leads are serialized after the session work is done, so load them now
+    return query.options(selectinload(Project.assigned_leads)).all()
+
 @router.get("", response_model=List[ProjectResponse])
 def get_all_projects(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get all projects for the current user's organization (Isolation for Leads & Viewers)"""
-    query = db.query(Project).filter(Project.organization_id == current_user.organization_id)
+    return visible_projects(db, current_user, request, response)
+
+@router.get("/summary", response_model=List[ProjectSummary])
+def get_project_summaries(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Lightweight project list for pickers: a few columns, leads and candidate counts.
+
+    One query for the projects (with counts from a grouped subquery) and one
+    selectinload for all their leads; photos and JSON columns are never loaded.
+    """
+    query = visible_projects_query(db, current_user)
     
-    # Approach A: If user is not admin, only show projects assigned to them
-    if current_user.role != "admin":
-        # Using a subquery to avoid duplicates without needing .distinct() on JSON columns
-        query = query.filter(Project.assigned_leads.any(User.id == current_user.id))
+    not_modified = projects_not_modified(query, "project-summaries", request, response, current_user)
+    if not_modified:
+        return not_modified
+    
+    # Count only the candidates of the listed projects, not the whole table
+    candidate_counts = db.query(
+        Candidate.project_id, func.count(Candidate.id).label("candidate_count")
+    ).filter(
+        Candidate.project_id.in_(query.with_entities(Project.id).scalar_subquery())
+    ).group_by(Candidate.project_id).subquery()
     
-    return query.all()
+    rows = query.options(
+        load_only(Project.id, Project.name, Project.location, Project.company, Project.hse_lead_name),
+        selectinload(Project.assigned_leads).load_only(User.id, User.username, User.full_name, User.role)
+    ).outerjoin(
+        candidate_counts, candidate_counts.c.project_id == Project.id
+    ).add_columns(
+        func.coalesce(candidate_counts.c.candidate_count, 0)
+    ).order_by(Project.id).all()
+    
+    return [
+        ProjectSummary(
+            id=project.id,
+            name=project.name,
+            location=project.location,
+            company=project.company,
+            hse_lead_name=project.hse_lead_name,
+            candidate_count=count,
+            assigned_leads=project.assigned_leads
+        )
+        for project, count in rows
+    ]
 
 @router.get("/{project_id}", response_model=ProjectResponse)
 def get_project(
@@ -44,6 +119,24 @@ def get_project(
         raise HTTPException(status_code=404, detail="Project not found or access denied")
     return project
 
+def scores_for_project(db: Session, project_id: int, window: LogWindow, current_user: User):
+    if not can_access_project(project_id, current_user, db):
+        raise HTTPException(status_code=404, detail="Project not found or access denied")
+    
+    # Whole-month windows (the default, or ?month=) are served from the monthly rollups
+    counts = rollup_field_counts(db, project_id, window) if covers_whole_months(window) else None
+    return project_scores(db, project_id, window, counts)
+
+@router.get("/{project_id}/scores")
+def get_project_scores(
+    project_id: int, 
+    window: LogWindow = Depends(log_window),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Compliance scores per candidate, section and project (within ?from=&to= or ?month=)"""
+    return scores_for_project(db, project_id, window, current_user)
+
 @router.post("", response_model=ProjectResponse)
 def create_project(
     project: ProjectCreate, 
@@ -56,6 +149,7 @@ def create_project(
         
     project_data = project.model_dump(exclude={"assigned_lead_ids"})
     project_data['organization_id'] = current_user.organization_id
+    project_data['hse_lead_photo'] = photo_field(project_data.get('hse_lead_photo'))
     
     db_project = Project(**project_data)
     
@@ -65,8 +159,10 @@ def create_project(
         db_project.assigned_leads = leads
     
     db.add(db_project)
+    access_version = bump_access_version(db, current_user.organization_id)
     db.commit()
     db.refresh(db_project)
+    access_index.invalidate_organization(current_user.organization_id, access_version)
     return db_project
 
 @router.put("/{project_id}", response_model=ProjectResponse)
@@ -88,17 +184,15 @@ def update_project(
     # If not admin, must be explicitly assigned to this project to update it
     if current_user.role != "admin":
         # Check if project is in their assigned list
-        is_assigned = db.query(Project).filter(
-            Project.id == project_id,
-            Project.assigned_leads.any(User.id == current_user.id)
-        ).first()
-        if not is_assigned:
+        if not can_access_project(project_id, current_user, db):
              raise HTTPException(status_code=403, detail="You are not assigned to manage this project")
 
     if current_user.role == "viewer":
         raise HTTPException(status_code=403, detail="Viewers cannot update projects")
     
     update_data = project.model_dump(exclude_unset=True)
+    if "hse_lead_photo" in update_data:
+        update_data["hse_lead_photo"] = photo_field(update_data["hse_lead_photo"])
     
     # Handle Lead assignment changes (Admin Only)
     if "assigned_lead_ids" in update_data:
@@ -111,8 +205,14 @@ def update_project(
     for key, value in update_data.items():
         setattr(db_project, key, value)
     
+    bump_project_version(db, db_project.id)
+    leads_changed = "assigned_lead_ids" in project.model_fields_set
+    if leads_changed:
+        access_version = bump_access_version(db, current_user.organization_id)
     db.commit()
     db.refresh(db_project)
+    if leads_changed:
+        access_index.invalidate_organization(current_user.organization_id, access_version)
     return db_project
 
 @router.delete("/{project_id}")
@@ -134,7 +234,10 @@ def delete_project(
         raise HTTPException(status_code=404, detail="Project not found")
     
     db.delete(db_project)
+    access_version = bump_access_version(db, current_user.organization_id)
     db.commit()
+    access_index.invalidate_organization(current_user.organization_id, access_version)
+    access_index.forget_project(project_id)
     return {"message": "Project deleted successfully"}
 
 @router.put("/user/{user_id}/assignments")
@@ -164,9 +267,13 @@ def update_user_assignments(
     valid_project_ids = [pid for pid in project_ids if pid in org_project_ids]
     
     # Replace assigned projects
+    previous_project_ids = [p.id for p in target_user.assigned_projects]
     target_user.assigned_projects = [p for p in org_projects if p.id in valid_project_ids]
+    bump_project_versions(db, set(previous_project_ids) ^ set(valid_project_ids))
+    access_version = bump_access_version(db, current_user.organization_id)
     
     db.commit()
+    access_index.invalidate_organization(current_user.organization_id, access_version)
     return {"message": "Assignments updated", "count": len(valid_project_ids)}
 
 
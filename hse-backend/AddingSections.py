@@ -1,42 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
-from models import Section, CandidateSection, Project, User, Candidate
+from models import Section, CandidateSection, User, Candidate
 from schemas import (
     SectionCreate, SectionUpdate, SectionResponse, SectionReorder,
     CandidateSectionCreate, CandidateSectionResponse
 )
 from auth import get_current_active_user
+from versioning import bump_project_version, lock_project, project_data_version, stamp_changes, record_deletion, conditional_response, make_etag
+from access import verify_project_access
+from ordering import next_display_order, reorder_rows
 
 router = APIRouter(prefix="/api/sections", tags=["Sections"])
 
-def verify_project_access(project_id: int, user: User, db: Session):
-    """Ensure user's organization owns the project and user is assigned if not admin"""
-    query = db.query(Project).filter(
-        Project.id == project_id, 
-        Project.organization_id == user.organization_id
-    )
-    
-    if user.role != "admin":
-        query = query.filter(Project.assigned_leads.any(User.id == user.id))
-        
-    project = query.first()
-    if not project:
-        raise HTTPException(status_code=403, detail="Not authorized for this project")
-    return project
-
 # ==================== SECTIONS ====================
 
 @router.get("/project/{project_id}", response_model=List[SectionResponse])
 def get_sections_by_project(
     project_id: int, 
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get all sections for a specific project (Scoped to Org)"""
     verify_project_access(project_id, current_user, db)
     
+    etag = make_etag("sections", project_id, project_data_version(db, project_id))
+    not_modified = conditional_response(request, response, etag)
+    if not_modified:
+        return not_modified
+    
     sections = db.query(Section).filter(
         Section.project_id == project_id
     ).order_by(Section.display_order).all()
@@ -65,17 +61,13 @@ def create_section(
     """Create a new section (Verify Ownership)"""
     verify_project_access(section.project_id, current_user, db)
     
-    # Get max display_order for this project
-    max_order = db.query(Section).filter(
-        Section.project_id == section.project_id
-    ).count()
-    
-    # Create section data
+    # Create section data; new sections go last
     section_data = section.model_dump()
-    section_data['display_order'] = max_order
+    section_data['display_order'] = next_display_order(db, Section, section.project_id)
     
     db_section = Section(**section_data)
     db.add(db_section)
+    stamp_changes(db, section.project_id, db_section)
     db.commit()
     db.refresh(db_section)
     return db_section
@@ -100,6 +92,7 @@ def update_section(
     for key, value in section.model_dump(exclude_unset=True).items():
         setattr(db_section, key, value)
     
+    stamp_changes(db, db_section.project_id, db_section)
     db.commit()
     db.refresh(db_section)
     return db_section
@@ -122,6 +115,8 @@ def delete_section(
     
     verify_project_access(db_section.project_id, current_user, db)
     
+    version = bump_project_version(db, db_section.project_id)
+    record_deletion(db, db_section.project_id, version, "section", db_section.id)
     db.delete(db_section)
     db.commit()
     return {"message": "Section deleted successfully"}
@@ -136,16 +131,9 @@ def reorder_sections(
     """Reorder sections (Verify Ownership)"""
     verify_project_access(project_id, current_user, db)
 
-    for index, section_id in enumerate(reorder.section_ids):
-        section = db.query(Section).filter(
-            Section.id == section_id,
-            Section.project_id == project_id
-        ).first()
-        if section:
-            section.display_order = index
-    
+    moved = reorder_rows(db, Section, project_id, reorder.section_ids)
     db.commit()
-    return {"message": "Sections reordered successfully"}
+    return {"message": "Sections reordered successfully", "moved": moved}
 
 # ==================== CANDIDATE-SECTION ASSOCIATIONS ====================
 
@@ -206,7 +194,8 @@ def assign_candidate_to_section(
     if not candidate or candidate.project_id != section.project_id:
         raise HTTPException(status_code=400, detail="Invalid candidate for this section/project")
 
-    # 3. Check if already assigned
+    # 3. Check if already assigned, under the project lock so two requests can't both insert
+    lock_project(db, section.project_id)
     existing = db.query(CandidateSection).filter(
         CandidateSection.candidate_id == assignment.candidate_id,
         CandidateSection.section_id == assignment.section_id
@@ -217,6 +206,7 @@ def assign_candidate_to_section(
     
     db_assignment = CandidateSection(**assignment.model_dump())
     db.add(db_assignment)
+    stamp_changes(db, section.project_id, db_assignment)
     db.commit()
     db.refresh(db_assignment)
     return db_assignment
@@ -242,6 +232,9 @@ def unassign_candidate_from_section(
     if not assignment:
         raise HTTPException(status_code=404, detail="Assignment not found")
     
+    version = bump_project_version(db, section.project_id)
+    record_deletion(db, section.project_id, version, "section_assignment", assignment.id,
+                    candidate_id=candidate_id, section_id=section_id)
     db.delete(assignment)
     db.commit()
     return {"message": "Candidate unassigned from section successfully"}
@@ -252,22 +245,48 @@ def sync_section_candidates(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Sync all candidates for a section to match the provided IDs (Batch Update)"""
+    """Sync all candidates for a section to match the provided IDs (Batch Update).
+
+    Only the difference is written: one bulk insert for new members and one
+    bulk delete for removed ones. Ids outside the section's project are ignored.
+    """
     section = db.query(Section).filter(Section.id == section_id).first()
     if not section:
         raise HTTPException(status_code=404, detail="Section not found")
     verify_project_access(section.project_id, current_user, db)
     
-    # 1. Remove all existing assignments for this section
-    db.query(CandidateSection).filter(CandidateSection.section_id == section_id).delete()
+    # Lock first, so a concurrent sync of the project can't change the members read below
+    lock_project(db, section.project_id)
+    wanted = {cid for (cid,) in db.query(Candidate.id).filter(
+        Candidate.project_id == section.project_id,
+        Candidate.id.in_(set(candidate_ids))
+    )}
+    current = db.query(CandidateSection.id, CandidateSection.candidate_id).filter(
+        CandidateSection.section_id == section_id
+    ).all()
+    added = wanted - {cid for _, cid in current}
+    removed = {cid for _, cid in current if cid not in wanted}
     
-    # 2. Add new assignments
-    for cid in candidate_ids:
-        # Verify candidate exists and belongs to the same project
-        cand = db.query(Candidate).filter(Candidate.id == cid, Candidate.project_id == section.project_id).first()
-        if cand:
-            new_assign = CandidateSection(section_id=section_id, candidate_id=cid)
-            db.add(new_assign)
-            
-    db.commit()
-    return {"message": "Section candidates synced successfully", "count": len(candidate_ids)}
+    if added or removed:
+        version = bump_project_version(db, section.project_id)
+        if removed:
+            for assignment_id, cid in current:
+                if cid in removed:
+                    record_deletion(db, section.project_id, version, "section_assignment", assignment_id,
+                                    candidate_id=cid, section_id=section_id)
+            db.query(CandidateSection).filter(
+                CandidateSection.section_id == section_id,
+                CandidateSection.candidate_id.in_(removed)
+            ).delete(synchronize_session=False)
+        if added:
+            db.execute(insert(CandidateSection), [
+                {"section_id": section_id, "candidate_id": cid, "change_version": version}
+                for cid in sorted(added)
+            ])
+        db.commit()
+    return {
+        "message": "Section candidates synced successfully",
+        "count": len(wanted),
+        "added": len(added),
+        "removed": len(removed)
+    }
@@ -1,56 +1,44 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from datetime import timedelta
 from typing import List
 from database import get_db
 import models
 import schemas
 from limiter_config import limiter
+from versioning import bump_project_versions
+from access import access_index
+from password_hashing import password_hasher
 from auth import (
-    get_password_hash, 
-    authenticate_user, 
-    create_access_token, 
+    create_user_token,
     get_current_user,
-    ACCESS_TOKEN_EXPIRE_DAYS
+    principal_cache,
+    token_versions,
+    bump_token_version
 )
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
-@router.post("/register", response_model=schemas.TokenResponse)
-@limiter.limit("5/minute")
-def register(request: Request, user: schemas.UserCreate, db: Session = Depends(get_db)):
+def registration_conflict(db: Session, user: schemas.UserCreate):
+    """The reason `user` can't register, or None"""
     # Check if username exists
-    existing_user = db.query(models.User).filter(models.User.username == user.username).first()
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
+    if db.query(models.User).filter(models.User.username == user.username).first():
+        return "Username already registered"
     
     # Check if email exists if provided
-    if user.email:
-        existing_email = db.query(models.User).filter(models.User.email == user.email).first()
-        if existing_email:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
+    if user.email and db.query(models.User).filter(models.User.email == user.email).first():
+        return "Email already registered"
 
-    # 1. Create Organization
-    org_name = user.company_name
     # Check if company exists (optional, maybe allow duplicates if strict isolation)
-    # For now, simplistic unique check
-    existing_org = db.query(models.Organization).filter(models.Organization.name == org_name).first()
-    if existing_org:
-        # In MVP, we might fail or join exist? 
-        # SaaS Best Practice: unique org names or allow duplicates but distinct IDs.
-        # Let's enforce unique names for simplicity in MVP.
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Company name already registered. Please contact your admin."
-        )
+    # SaaS Best Practice: unique org names or allow duplicates but distinct IDs.
+    # Let's enforce unique names for simplicity in MVP.
+    if db.query(models.Organization).filter(models.Organization.name == user.company_name).first():
+        return "Company name already registered. Please contact your admin."
+    return None
 
-    new_org = models.Organization(name=org_name)
+def create_organization_admin(db: Session, user: schemas.UserCreate, password_hash: str) -> models.User:
+    # 1. Create Organization
+    new_org = models.Organization(name=user.company_name)
     db.add(new_org)
     db.commit()
     db.refresh(new_org)
@@ -60,7 +48,7 @@ def register(request: Request, user: schemas.UserCreate, db: Session = Depends(g
         username=user.username,
         email=user.email,
         full_name=user.full_name,
-        password_hash=get_password_hash(user.password),
+        password_hash=password_hash,
         is_admin=True, # Legacy support
         role="admin",  # Phase 5: SaaS Role
         organization_id=new_org.id
@@ -69,12 +57,27 @@ def register(request: Request, user: schemas.UserCreate, db: Session = Depends(g
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    return db_user
+
+# Login and registration are async so bcrypt runs on the password_hasher
+# pool while the request waits, not on a threadpool slot; the short
+# queries around it go through run_in_threadpool.
+
+@router.post("/register", response_model=schemas.TokenResponse)
+@limiter.limit("5/minute")
+async def register(request: Request, user: schemas.UserCreate, db: Session = Depends(get_db)):
+    conflict = await run_in_threadpool(registration_conflict, db, user)
+    if conflict:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=conflict
+        )
+
+    password_hash = await password_hasher.hash(user.password)
+    db_user = await run_in_threadpool(create_organization_admin, db, user, password_hash)
     
     # Login immediately after registration
-    access_token = create_access_token(
-        data={"user_id": db_user.id, "username": db_user.username},
-        expires_delta=timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
-    )
+    access_token = create_user_token(db_user)
     
     return {
         "access_token": access_token,
@@ -84,9 +87,11 @@ def register(request: Request, user: schemas.UserCreate, db: Session = Depends(g
 
 @router.post("/login", response_model=schemas.TokenResponse)
 @limiter.limit("10/minute")
-def login(request: Request, credentials: schemas.UserLogin, db: Session = Depends(get_db)):
+async def login(request: Request, credentials: schemas.UserLogin, db: Session = Depends(get_db)):
     # Debug: Check user existence first
-    user = db.query(models.User).filter(models.User.username == credentials.username).first()
+    user = await run_in_threadpool(
+        lambda: db.query(models.User).filter(models.User.username == credentials.username).first()
+    )
     
     if not user:
         raise HTTPException(
@@ -95,17 +100,14 @@ def login(request: Request, credentials: schemas.UserLogin, db: Session = Depend
             headers={"WWW-Authenticate": "Bearer"},
         )
         
-    if not authenticate_user(db, credentials.username, credentials.password):
+    if not await password_hasher.verify(credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Debug: Password mismatch for existing user",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = create_access_token(
-        data={"user_id": user.id, "username": user.username},
-        expires_delta=timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
-    )
+    access_token = create_user_token(user)
     
     return {
         "access_token": access_token,
@@ -124,17 +126,21 @@ def change_password(
     db: Session = Depends(get_db)
 ):
     # Verify current password
-    if not authenticate_user(db, current_user.username, data.current_password):
+    if not password_hasher.verify_sync(data.current_password, current_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect current password"
         )
     
-    # Update password
-    current_user.password_hash = get_password_hash(data.new_password)
+    # Update password and sign out every other session; the caller gets a new token
+    current_user.password_hash = password_hasher.hash_sync(data.new_password)
+    versions = bump_token_version(db, current_user.id, revoke=True)
     db.commit()
+    token_versions.note(current_user.id, *versions)
+    principal_cache.invalidate_user(current_user.id)
+    db.refresh(current_user)
     
-    return {"message": "Password updated successfully"}
+    return {"message": "Password updated successfully", "access_token": create_user_token(current_user)}
 
 @router.post("/verify-delete-pin/{project_id}")
 def verify_delete_pin(
@@ -196,7 +202,7 @@ def invite_user(
         username=user_data.username,
         email=user_data.email,
         full_name=user_data.full_name,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=password_hasher.hash_sync(user_data.password),
         role="viewer", # Default to lowest role
         organization_id=current_user.organization_id
     )
@@ -226,8 +232,14 @@ def delete_user(
     if user_to_delete.id == current_user.id:
         raise HTTPException(status_code=400, detail="You cannot delete yourself")
         
+    # Projects list this user among their leads
+    bump_project_versions(db, [p.id for p in user_to_delete.assigned_projects])
+    versions = bump_token_version(db, user_id, revoke=True)
     db.delete(user_to_delete)
     db.commit()
+    token_versions.note(user_id, *versions)
+    principal_cache.invalidate_user(user_id)
+    access_index.invalidate_user(user_id)
     return {"message": "User removed successfully"}
 
 @router.put("/users/{user_id}/role")
@@ -259,7 +271,11 @@ def update_user_role(
         raise HTTPException(status_code=400, detail="You cannot demote yourself")
     
     user_to_update.role = role_data.role
+    bump_project_versions(db, [p.id for p in user_to_update.assigned_projects])
+    versions = bump_token_version(db, user_to_update.id)  # Tokens still name the old role
     db.commit()
+    token_versions.note(user_to_update.id, *versions)
+    principal_cache.invalidate_user(user_to_update.id)
     db.refresh(user_to_update)
     
     return {"message": f"Role updated to {role_data.role}", "user": user_to_update}
\ No newline at end of file
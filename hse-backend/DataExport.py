@@ -1,11 +1,26 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from database import get_db
-from models import Project, Candidate, DailyLog, MonthlyKPI, Section, User
-from auth import get_current_active_user
+from models import DAILY_LOG_FIELDS, Project, Candidate, CandidateSection, DailyLog, MonthlyKPI, Section, User
+from auth import get_current_active_user, get_current_user
+import csv
+import io
 import json
+import queue
+import threading
+import zipfile
 from datetime import date, time
 
+# Rows fetched per round trip by the streaming export (server-side cursor)
+STREAM_BATCH_SIZE = 1000
+
+# The ZIP export is written by a worker thread into a bounded queue of chunks,
+# so at most ZIP_QUEUE_CHUNKS * ZIP_CHUNK_SIZE bytes are buffered at any time
+ZIP_CHUNK_SIZE = 64 * 1024
+ZIP_QUEUE_CHUNKS = 16
+
 router = APIRouter(prefix="/api/export", tags=["Data Export"])
 
 def json_serial(obj):
@@ -14,12 +29,65 @@ def json_serial(obj):
         return obj.isoformat()
     raise TypeError ("Type %s not serializable" % type(obj))
 
+def daily_log_columns():
+    """Daily log columns with one True/False/NULL column per checklist question"""
+    return [getattr(DailyLog, name).label(name) for name in DAILY_LOG_FIELDS]
+
+def backup_statements(organization_id: int):
+    """(record type, SELECT) pairs for every table in the backup, scoped to one organization"""
+    org_projects = select(Project.id).where(Project.organization_id == organization_id)
+    org_candidates = select(Candidate.id).where(Candidate.project_id.in_(org_projects))
+    return [
+        ("project", select(Project.id, Project.name, Project.location, Project.company)
+            .where(Project.organization_id == organization_id)
+            .order_by(Project.id)),
+        ("candidate", select(Candidate.id, Candidate.project_id, Candidate.name, Candidate.role)
+            .where(Candidate.project_id.in_(org_projects))
+            .order_by(Candidate.project_id, Candidate.id)),
+        ("daily_log", select(*daily_log_columns())
+            .where(DailyLog.candidate_id.in_(org_candidates))
+            .order_by(DailyLog.candidate_id, DailyLog.log_date)),
+        ("monthly_kpi", select(MonthlyKPI.__table__)
+            .where(MonthlyKPI.candidate_id.in_(org_candidates))
+            .order_by(MonthlyKPI.candidate_id, MonthlyKPI.month)),
+    ]
+
+def stream_backup(bind, organization_id: int, header: dict):
+    """Yield the backup as NDJSON chunks.
+
+    Uses its own session so it outlives the request's dependency, and reads
+    every table through a server-side cursor so memory stays bounded by
+    STREAM_BATCH_SIZE rows whatever the size of the organization.
+    """
+    yield json.dumps(dict(header, type="backup")) + "\n"
+    with Session(bind=bind) as session:
+        for record_type, statement in backup_statements(organization_id):
+            result = session.execute(statement.execution_options(yield_per=STREAM_BATCH_SIZE))
+            for rows in result.mappings().partitions():
+                yield "".join(
+                    json.dumps(dict(row, type=record_type), default=json_serial) + "\n"
+                    for row in rows
+                )
+
 @router.get("/full-backup")
 def export_all_data(
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams one record per line"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_user)  # Full row: the header needs the organization name
 ):
-    """Export complete organization data as JSON"""
+    """Export complete organization data as JSON (or streamed NDJSON)"""
+    
+    if format == "ndjson":
+        header = {
+            "organization": current_user.organization.name,
+            "exported_at": date.today().isoformat(),
+            "exported_by": current_user.username
+        }
+        return StreamingResponse(
+            stream_backup(db.get_bind(), current_user.organization_id, header),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": 'attachment; filename="hse-backup.ndjson"'}
+        )
     
     # 1. Fetch Projecs
     projects = db.query(Project).filter(Project.organization_id == current_user.organization_id).all()
@@ -54,7 +122,7 @@ def export_all_data(
             # 3. Logs
             logs = db.query(DailyLog).filter(DailyLog.candidate_id == cand.id).all()
             for log in logs:
-                log_dict = {c.name: getattr(log, c.name) for c in log.__table__.columns}
+                log_dict = {name: getattr(log, name) for name in DAILY_LOG_FIELDS}
                 # Serialize dates/times
                 for k, v in log_dict.items():
                     if isinstance(v, (date, time)):
@@ -75,3 +143,144 @@ def export_all_data(
         export_data["projects"].append(proj_data)
         
     return export_data
+
+# ==================== PER-TABLE CSV EXPORT ====================
+
+def table_statements(organization_id: int):
+    """(file name, SELECT) pairs for the flat per-table export, scoped to one organization"""
+    org_projects = select(Project.id).where(Project.organization_id == organization_id)
+    org_candidates = select(Candidate.id).where(Candidate.project_id.in_(org_projects))
+    org_sections = select(Section.id).where(Section.project_id.in_(org_projects))
+    return [
+        ("projects.csv", select(
+            Project.id, Project.name, Project.location, Project.company, Project.hse_lead_name,
+            Project.manpower, Project.man_hours, Project.new_inductions
+        ).where(Project.organization_id == organization_id).order_by(Project.id)),
+        ("candidates.csv", select(
+            Candidate.id, Candidate.project_id, Candidate.name, Candidate.role, Candidate.display_order
+        ).where(Candidate.project_id.in_(org_projects)).order_by(Candidate.id)),
+        ("sections.csv", select(
+            Section.id, Section.project_id, Section.name, Section.description, Section.display_order
+        ).where(Section.project_id.in_(org_projects)).order_by(Section.id)),
+        ("candidate_sections.csv", select(
+            CandidateSection.candidate_id, CandidateSection.section_id
+        ).where(CandidateSection.section_id.in_(org_sections)).order_by(CandidateSection.id)),
+        ("daily_logs.csv", select(*daily_log_columns())
+            .where(DailyLog.candidate_id.in_(org_candidates)).order_by(DailyLog.id)),
+        ("monthly_kpis.csv", select(MonthlyKPI.__table__)
+            .where(MonthlyKPI.candidate_id.in_(org_candidates)).order_by(MonthlyKPI.id)),
+    ]
+
+def copy_table_csv(conn, statement, out):
+    """Write the result of `statement` as CSV (with header) into the binary file `out`.
+
+    On PostgreSQL (psycopg2 or psycopg 3) the server renders the CSV itself via
+    COPY TO STDOUT. Elsewhere rows are streamed through a server-side cursor
+    into csv.writer as plain tuples.
+    """
+    if conn.dialect.name == "postgresql" and conn.dialect.driver in ("psycopg2", "psycopg"):
+        sql = statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+        copy_sql = f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER)"
+        cursor = conn.connection.cursor()
+        try:
+            if conn.dialect.driver == "psycopg2":
+                cursor.copy_expert(copy_sql, out)
+            else:
+                with cursor.copy(copy_sql) as copy:
+                    for data in copy:
+                        out.write(data)
+        finally:
+            cursor.close()
+        return
+
+    text_out = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    writer = csv.writer(text_out)
+    result = conn.execute(statement.execution_options(yield_per=STREAM_BATCH_SIZE))
+    writer.writerow(result.keys())
+    for rows in result.partitions():
+        writer.writerows(rows)
+    text_out.flush()
+    text_out.detach()
+
+class ExportCancelled(Exception):
+    """The client went away while the ZIP was being produced"""
+
+class _QueueWriter(io.RawIOBase):
+    """Unseekable file object that hands fixed-size chunks to a bounded queue"""
+
+    def __init__(self, chunks: queue.Queue, cancelled: threading.Event):
+        self.chunks = chunks
+        self.cancelled = cancelled
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        if len(self.buffer) >= ZIP_CHUNK_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self.buffer:
+            put_chunk(self.chunks, bytes(self.buffer), self.cancelled)
+            self.buffer.clear()
+
+def put_chunk(chunks: queue.Queue, item, cancelled: threading.Event):
+    """Blocking put that gives up once the consumer has gone away"""
+    while not cancelled.is_set():
+        try:
+            chunks.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+    raise ExportCancelled()
+
+def stream_tables_zip(bind, organization_id: int):
+    """Yield a ZIP with one CSV per table while a worker thread writes it"""
+    chunks = queue.Queue(maxsize=ZIP_QUEUE_CHUNKS)
+    cancelled = threading.Event()
+
+    def produce():
+        try:
+            sink = _QueueWriter(chunks, cancelled)
+            with bind.connect() as conn:
+                with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                    for name, statement in table_statements(organization_id):
+                        with archive.open(name, "w", force_zip64=True) as entry:
+                            copy_table_csv(conn, statement, entry)
+            sink.flush()
+            put_chunk(chunks, None, cancelled)
+        except ExportCancelled:
+            pass
+        except Exception as e:
+            try:
+                put_chunk(chunks, e, cancelled)
+            except ExportCancelled:
+                pass
+
+    worker = threading.Thread(target=produce, name="tables-zip-export", daemon=True)
+    worker.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        cancelled.set()
+
+@router.get("/tables.zip")
+def export_tables_zip(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Export one CSV per table (projects, candidates, sections, daily logs, KPIs) in a ZIP"""
+    return StreamingResponse(
+        stream_tables_zip(db.get_bind(), current_user.organization_id),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="hse-tables.zip"'}
+    )
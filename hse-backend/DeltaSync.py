@@ -0,0 +1,102 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from database import get_db
+from models import Candidate, CandidateSection, ChangeTombstone, DailyLog, MonthlyKPI, Section, User
+from auth import get_current_active_user
+from serializers import serialize_daily_log_change, serialize_monthly_kpi_change
+from access import verify_project_access
+from versioning import project_change_window
+
+router = APIRouter(prefix="/api/projects", tags=["Sync"])
+
+@router.get("/{project_id}/changes")
+def get_project_changes(
+    project_id: int,
+    since: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Everything written to a project after the `since` cursor.
+
+    Returns the rows created or updated since then plus tombstones for deleted
+    ones, and the new cursor to send next time. Without `since`, or when the
+    cursor is ahead of the server (e.g. after a restore), the full project is
+    returned with "reset": true and the client should replace its copy. So is
+    it when the cursor is older than the project's tombstone_horizon, since
+    tombstones of deletions after it may have been pruned.
+    Deleting a candidate or section also removes its logs, KPIs and
+    assignments; only the parent's tombstone is reported for those.
+    """
+    return project_changes(db, project_id, since, current_user)
+
+def project_changes(db: Session, project_id: int, since: Optional[int], current_user: User) -> dict:
+    verify_project_access(project_id, current_user, db)
+    cursor, horizon = project_change_window(db, project_id)
+    reset = since is None or since > cursor or since < horizon
+
+    def changed(query, model):
+        if reset:
+            return query
+        return query.filter(model.change_version > since)
+
+    candidates = changed(db.query(Candidate).filter(
+        Candidate.project_id == project_id
+    ), Candidate).order_by(Candidate.display_order).all()
+
+    sections = changed(db.query(Section).filter(
+        Section.project_id == project_id
+    ), Section).order_by(Section.display_order).all()
+
+    assignments = changed(db.query(CandidateSection).join(
+        Candidate, Candidate.id == CandidateSection.candidate_id
+    ).filter(Candidate.project_id == project_id), CandidateSection).all()
+
+    logs = changed(db.query(*serialize_daily_log_change.columns).join(
+        Candidate, Candidate.id == DailyLog.candidate_id
+    ).filter(Candidate.project_id == project_id), DailyLog).order_by(DailyLog.log_date).all()
+
+    kpis = changed(db.query(*serialize_monthly_kpi_change.columns).join(
+        Candidate, Candidate.id == MonthlyKPI.candidate_id
+    ).filter(Candidate.project_id == project_id), MonthlyKPI).order_by(MonthlyKPI.month).all()
+
+    deleted = []
+    if not reset:
+        deleted = db.query(ChangeTombstone).filter(
+            ChangeTombstone.project_id == project_id,
+            ChangeTombstone.change_version > since
+        ).order_by(ChangeTombstone.change_version, ChangeTombstone.id).all()
+
+    return {
+        "cursor": cursor,
+        "reset": reset,
+        "candidates": [
+            {
+                "id": c.id,
+                "name": c.name,
+                "photo": c.photo,
+                "role": c.role,
+                "displayOrder": c.display_order
+            }
+            for c in candidates
+        ],
+        "sections": [
+            {
+                "id": s.id,
+                "name": s.name,
+                "description": s.description,
+                "displayOrder": s.display_order
+            }
+            for s in sections
+        ],
+        "sectionAssignments": [
+            {"id": cs.id, "candidateId": cs.candidate_id, "sectionId": cs.section_id}
+            for cs in assignments
+        ],
+        "dailyLogs": [serialize_daily_log_change(log) for log in logs],
+        "monthlyKPIs": [serialize_monthly_kpi_change(kpi) for kpi in kpis],
+        "deleted": [
+            dict(t.details or {}, entity=t.entity, id=t.entity_id)
+            for t in deleted
+        ]
+    }
@@ -0,0 +1,34 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException
+from models import User
+from auth import get_current_active_user, principal_cache
+from access import access_index
+from password_hashing import password_hasher
+from database import engine, pool_metrics
+
+router = APIRouter(prefix="/api/ops", tags=["Operations"])
+
+def require_admin(current_user: User = Depends(get_current_active_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view operational metrics")
+    return current_user
+
+@router.get("/principal-cache")
+def get_principal_cache_stats(current_user: User = Depends(require_admin)):
+    """Hit/miss counters of this worker's authenticated-principal cache"""
+    return principal_cache.stats()
+
+@router.get("/access-index")
+def get_access_index_stats(current_user: User = Depends(require_admin)):
+    """Size and hit/miss counters of this worker's project authorization index"""
+    return access_index.stats()
+
+@router.get("/password-hashing")
+def get_password_hashing_stats(current_user: User = Depends(require_admin)):
+    """Queue depth, rejections and latency histograms of this worker's bcrypt pool"""
+    return password_hasher.stats()
+
+@router.get("/db-pool")
+def get_db_pool_stats(current_user: User = Depends(require_admin)):
+    """Checked-out connections, overflow, checkout waits and connection churn of this worker's pool"""
+    return {"worker_pid": os.getpid(), "pool": pool_metrics.stats(engine)}
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from typing import Optional
+from models import User
+from auth import create_photo_key, get_current_active_user, verify_photo_key
+from photo_store import MAX_PHOTO_BYTES, THUMBNAIL_SIZES, load_photo, photo_url, save_photo
+from versioning import etag_matches
+
+router = APIRouter(prefix="/api/photos", tags=["Photos"])
+
+# Photo URLs change with their content, so a cached copy never goes stale; but
+# they are employee photos, so only the browser may keep them, and not for long
+CACHE_CONTROL = "private, max-age=86400"
+
+@router.post("")
+def upload_photo(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Store an image and return the URL to save in `photo` / `hse_lead_photo`"""
+    if current_user.role == "viewer":
+        raise HTTPException(status_code=403, detail="Viewers cannot upload photos")
+
+    data = file.file.read(MAX_PHOTO_BYTES + 1)
+    try:
+        digest = save_photo(data)
+    except ValueError as e:
+        status = 413 if len(data) > MAX_PHOTO_BYTES else 400
+        raise HTTPException(status_code=status, detail=str(e))
+    return {"hash": digest, "url": photo_url(digest)}
+
+@router.get("/key")
+def get_photo_key(current_user: User = Depends(get_current_active_user)):
+    """Key to add to photo URLs as ?key=..., since <img> tags can't send the token"""
+    key, expires = create_photo_key(current_user.id)
+    return {"key": key, "expires_at": expires}
+
+@router.get("/{digest}")
+def get_photo(
+    digest: str,
+    request: Request,
+    key: Optional[str] = Query(None, description="Photo key from GET /api/photos/key"),
+    size: Optional[int] = Query(None, description=f"Thumbnail size in px, one of {THUMBNAIL_SIZES}")
+):
+    """Serve a stored photo or its thumbnail to holders of a current photo key"""
+    if not verify_photo_key(key):
+        raise HTTPException(status_code=401, detail="Invalid or expired photo key")
+    if size is not None and size not in THUMBNAIL_SIZES:
+        raise HTTPException(status_code=400, detail=f"size must be one of {', '.join(map(str, THUMBNAIL_SIZES))}")
+
+    etag = f'"{digest}-{size}"' if size else f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    photo = load_photo(digest, size)
+    if photo is None:
+        raise HTTPException(status_code=404, detail="Photo not found")
+    data, content_type = photo
+    return Response(content=data, media_type=content_type, headers=headers)
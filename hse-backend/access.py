@@ -0,0 +1,211 @@
+"""Shared project authorization.
+
+Admins see every project of their organization; leads and viewers only the
+projects they are assigned to (project_users). Instead of an EXISTS query
+per request, the set of visible project ids is built once per user and
+kept in memory, and candidates are mapped to their (never changing)
+project, so access checks are set lookups.
+
+Writes that change visibility invalidate the index: assignment changes,
+project lead edits and project create/delete bump the organization's
+access_version, and user deletion drops the user's entries. Each worker
+process has its own index and reloads the access versions every
+ACCESS_VERSIONS_REFRESH_SECONDS (one small query), so a change made on
+another worker is seen within that interval; entries also expire after a
+TTL.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, Optional
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from models import Candidate, Organization, Project, ProjectUser, User
+
+class AccessIndex:
+    def __init__(self, max_users: int, max_candidates: int, ttl_seconds: float, refresh_seconds: float):
+        self.max_users = max_users
+        self.max_candidates = max_candidates
+        self.ttl_seconds = ttl_seconds
+        self.refresh_seconds = refresh_seconds
+        # (user id, role, organization id) -> (expires at, organization id, access version, project ids)
+        self._projects = OrderedDict()
+        # organization id -> access version, as of the last reload or local change
+        self._versions: Dict[int, int] = {}
+        self._versions_loaded_at: Optional[float] = None
+        # candidate id -> project id
+        self._candidates = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def visible_project_ids(self, user: User, db: Session) -> FrozenSet[int]:
+        # Role and organization are part of the key, so a role change is a miss
+        key = (user.id, user.role, user.organization_id)
+        # Read before the projects, so a change committed in between leaves the entry stale
+        version = self.access_version(user.organization_id, db)
+        with self._lock:
+            entry = self._projects.get(key)
+            if entry is not None and entry[0] > time.monotonic() and entry[2] == version:
+                self._projects.move_to_end(key)
+                self.hits += 1
+                return entry[3]
+            self.misses += 1
+
+        query = db.query(Project.id).filter(Project.organization_id == user.organization_id)
+        if user.role != "admin":
+            query = query.join(ProjectUser, ProjectUser.project_id == Project.id).filter(
+                ProjectUser.user_id == user.id
+            )
+        project_ids = frozenset(pid for (pid,) in query.all())
+
+        with self._lock:
+            self._projects[key] = (time.monotonic() + self.ttl_seconds, user.organization_id, version, project_ids)
+            self._projects.move_to_end(key)
+            while len(self._projects) > self.max_users:
+                self._projects.popitem(last=False)
+        return project_ids
+
+    def access_version(self, organization_id: int, db: Session) -> int:
+        with self._lock:
+            fresh = (
+                self._versions_loaded_at is not None
+                and time.monotonic() - self._versions_loaded_at < self.refresh_seconds
+            )
+        if not fresh:
+            rows = db.query(Organization.id, Organization.access_version).all()
+            with self._lock:
+                # Versions only go up; a reload that started before a local change must not undo it
+                self._versions = {
+                    org_id: max(version, self._versions.get(org_id, 0)) for org_id, version in rows
+                }
+                self._versions_loaded_at = time.monotonic()
+        with self._lock:
+            return self._versions.get(organization_id, 0)
+
+    def candidate_project_id(self, candidate_id: int, db: Session) -> Optional[int]:
+        with self._lock:
+            project_id = self._candidates.get(candidate_id)
+            if project_id is not None:
+                self._candidates.move_to_end(candidate_id)
+                return project_id
+
+        row = db.query(Candidate.project_id).filter(Candidate.id == candidate_id).first()
+        if row is None:
+            return None
+        self.remember_candidate(candidate_id, row[0])
+        return row[0]
+
+    def candidate_project_ids(self, candidate_ids: Iterable[int], db: Session) -> Dict[int, int]:
+        """candidate_project_id for many candidates, with one query for the uncached ones"""
+        found, missing = {}, []
+        with self._lock:
+            for candidate_id in set(candidate_ids):
+                project_id = self._candidates.get(candidate_id)
+                if project_id is None:
+                    missing.append(candidate_id)
+                else:
+                    self._candidates.move_to_end(candidate_id)
+                    found[candidate_id] = project_id
+
+        if missing:
+            for candidate_id, project_id in db.query(Candidate.id, Candidate.project_id).filter(
+                Candidate.id.in_(missing)
+            ).all():
+                self.remember_candidate(candidate_id, project_id)
+                found[candidate_id] = project_id
+        return found
+
+    def remember_candidate(self, candidate_id: int, project_id: int):
+        with self._lock:
+            self._candidates[candidate_id] = project_id
+            self._candidates.move_to_end(candidate_id)
+            while len(self._candidates) > self.max_candidates:
+                self._candidates.popitem(last=False)
+
+    def forget_candidate(self, candidate_id: int):
+        with self._lock:
+            self._candidates.pop(candidate_id, None)
+
+    def forget_project(self, project_id: int):
+        """Drop the candidates of a deleted project"""
+        with self._lock:
+            for candidate_id in [c for c, p in self._candidates.items() if p == project_id]:
+                del self._candidates[candidate_id]
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for key in [k for k in self._projects if k[0] == user_id]:
+                del self._projects[key]
+
+    def invalidate_organization(self, organization_id: int, access_version: int):
+        """Apply a committed bump_access_version in this worker without waiting for the next reload"""
+        with self._lock:
+            self._versions[organization_id] = max(access_version, self._versions.get(organization_id, 0))
+            for key in [k for k, entry in self._projects.items() if entry[1] == organization_id]:
+                del self._projects[key]
+
+    def clear(self):
+        with self._lock:
+            self._projects.clear()
+            self._candidates.clear()
+            self._versions = {}
+            self._versions_loaded_at = None
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._projects),
+                "candidates": len(self._candidates),
+                "ttl_seconds": self.ttl_seconds,
+                "refresh_seconds": self.refresh_seconds,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+access_index = AccessIndex(
+    max_users=int(os.getenv("ACCESS_INDEX_USERS", "1024")),
+    max_candidates=int(os.getenv("ACCESS_INDEX_CANDIDATES", "100000")),
+    ttl_seconds=float(os.getenv("ACCESS_INDEX_TTL_SECONDS", "60")),
+    refresh_seconds=float(os.getenv("ACCESS_VERSIONS_REFRESH_SECONDS", "5"))
+)
+
+def bump_access_version(db: Session, organization_id: int) -> int:
+    """Make every worker rebuild the organization's access sets, for changes
+    that can affect anyone in it (assignments, lead lists, projects).
+
+    The caller commits, then passes the result to access_index.invalidate_organization.
+    """
+    return db.execute(
+        update(Organization)
+        .where(Organization.id == organization_id)
+        .values(access_version=Organization.access_version + 1)
+        .returning(Organization.access_version)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
+def can_access_project(project_id: int, user: User, db: Session) -> bool:
+    return project_id in access_index.visible_project_ids(user, db)
+
+def verify_project_access(project_id: int, user: User, db: Session):
+    """Ensure the project is in the user's organization and, for non-admins, assigned to them"""
+    if not can_access_project(project_id, user, db):
+        raise HTTPException(status_code=403, detail="Not authorized to access this project")
+
+def verify_candidate_access(candidate_id: int, user: User, db: Session) -> int:
+    """Ensure the user can access the candidate's project; returns that project's id"""
+    project_id = access_index.candidate_project_id(candidate_id, db)
+    if project_id is None or not can_access_project(project_id, user, db):
+        raise HTTPException(status_code=403, detail="Not authorized for this candidate")
+    return project_id
+
+def accessible_candidates(candidate_ids: Iterable[int], user: User, db: Session) -> Dict[int, int]:
+    """{candidate id: project id} for the candidates the user can access; others are left out"""
+    visible = access_index.visible_project_ids(user, db)
+    return {
+        candidate_id: project_id
+        for candidate_id, project_id in access_index.candidate_project_ids(candidate_ids, db).items()
+        if project_id in visible
+    }
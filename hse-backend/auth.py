@@ -1,9 +1,16 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, NamedTuple, Optional, Set, Tuple
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from database import get_db
 import models
@@ -39,11 +46,8 @@ def verify_token(token: str) -> Optional[dict]:
     except JWTError:
         return None
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> models.User:
-    token = credentials.credentials
+def token_payload(token: str) -> dict:
+    """Claims of a valid token that names a user, 401 otherwise"""
     payload = verify_token(token)
     
     if payload is None:
@@ -59,6 +63,16 @@ def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token payload",
         )
+    return payload
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> models.User:
+    """The full User row, for routes that change the user or need its relationships"""
+    payload = token_payload(credentials.credentials)
+    user_id = payload["user_id"]
+    check_token_version(payload, db)
     
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if user is None:
@@ -69,8 +83,255 @@ def get_current_user(
     
     return user
 
-# Alias or active check for future implementation
-get_current_active_user = get_current_user
+# ==================== PRINCIPAL CACHE ====================
+# Most routes only need who the caller is: id, role and organization.
+# Those are cached per (user id, token) so a request doesn't have to
+# SELECT from users. AuthRoutes invalidates a user's entries when their
+# role, password or existence changes; the TTL bounds staleness across
+# worker processes, which each have their own cache.
+
+class Principal(NamedTuple):
+    """The cached identity of an authenticated user (duck-types the User fields routes read)"""
+    id: int
+    username: str
+    role: str
+    organization_id: Optional[int]
+
+class PrincipalCache:
+    """Thread-safe LRU cache with a TTL, plus hit/miss counters"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[float, Principal]]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[Tuple[int, str]]] = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, user_id: int, token: str) -> Optional[Principal]:
+        key = (user_id, token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def put(self, token: str, principal: Principal):
+        key = (principal.id, token)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(principal.id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        """Drop every cached token of a user. Call after the change is committed."""
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+            self.invalidations += 1
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+principal_cache = PrincipalCache(
+    max_size=int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+)
+
+# ==================== TOKEN CLAIMS ====================
+# Tokens carry org_id, role and the user's token_version ("tv"), so a
+# request can be authorized from the token alone. When a user's role,
+# password or existence changes, their token_version is bumped and a row in
+# token_revocations records it. Every worker keeps that (small) table in
+# memory, reloading it every TOKEN_VERSIONS_REFRESH_SECONDS, and only falls
+# back to the users table for tokens it marks stale.
+
+TOKEN_FORMAT = 2
+
+def create_user_token(user: models.User) -> str:
+    """Access token with the claims get_current_active_user needs"""
+    return create_access_token(
+        data={
+            "fmt": TOKEN_FORMAT,
+            "user_id": user.id,
+            "username": user.username,
+            "org_id": user.organization_id,
+            "role": user.role,
+            "tv": user.token_version or 0
+        },
+        expires_delta=timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
+    )
+
+# <img> tags can't send the bearer token, so photo URLs carry a short-lived
+# key instead (?key=...). Expiries are rounded to PHOTO_KEY_TTL_SECONDS, so a
+# user keeps the same key, and the browser its cached photos, for a while;
+# each key is valid for one to two periods.
+PHOTO_KEY_TTL_SECONDS = int(os.getenv("PHOTO_KEY_TTL_SECONDS", str(12 * 3600)))
+
+def _photo_key_signature(user_id, expires: int) -> str:
+    message = f"photos:{user_id}:{expires}".encode("utf-8")
+    return hmac.new(SECRET_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()[:32]
+
+def create_photo_key(user_id: int, now: Optional[float] = None) -> Tuple[str, int]:
+    """(key, expiry as a Unix time) for the user's photo URLs"""
+    now = time.time() if now is None else now
+    expires = (int(now) // PHOTO_KEY_TTL_SECONDS + 2) * PHOTO_KEY_TTL_SECONDS
+    return f"{user_id}.{expires}.{_photo_key_signature(user_id, expires)}", expires
+
+def verify_photo_key(key: Optional[str]) -> bool:
+    try:
+        user_id, expires, signature = (key or "").split(".")
+        expires = int(expires)
+    except ValueError:
+        return False
+    return expires > time.time() and hmac.compare_digest(signature, _photo_key_signature(user_id, expires))
+
+class TokenVersions:
+    """In-memory copy of token_revocations: {user_id: (token_version, revoked_below)}"""
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._versions: Dict[int, Tuple[int, int]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, db: Session) -> Optional[Tuple[int, int]]:
+        with self._lock:
+            fresh = self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds
+        if not fresh:
+            rows = db.query(
+                models.TokenRevocation.user_id,
+                models.TokenRevocation.token_version,
+                models.TokenRevocation.revoked_below
+            ).all()
+            with self._lock:
+                self._versions = {user_id: (version, revoked_below) for user_id, version, revoked_below in rows}
+                self._loaded_at = time.monotonic()
+        with self._lock:
+            return self._versions.get(user_id)
+
+    def note(self, user_id: int, token_version: int, revoked_below: int):
+        """Apply a committed change in this worker without waiting for the next reload"""
+        with self._lock:
+            self._versions[user_id] = (token_version, revoked_below)
+
+    def clear(self):
+        with self._lock:
+            self._versions = {}
+            self._loaded_at = None
+
+token_versions = TokenVersions(
+    refresh_seconds=float(os.getenv("TOKEN_VERSIONS_REFRESH_SECONDS", "5"))
+)
+
+def check_token_version(payload: dict, db: Session) -> bool:
+    """True if the token's claims are current; 401 if the token was revoked.
+
+    Tokens without "tv" (minted before claims were added) count as version 0.
+    """
+    entry = token_versions.get(payload["user_id"], db)
+    if entry is None:
+        return True
+    token_version, revoked_below = entry
+    tv = payload.get("tv", 0)
+    if tv < revoked_below:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return tv >= token_version
+
+def bump_token_version(db: Session, user_id: int, revoke: bool = False) -> Tuple[int, int]:
+    """Make the user's existing tokens stale (or, with revoke=True, invalid).
+
+    Returns (token_version, revoked_below). The caller commits, then passes
+    the result to token_versions.note.
+    """
+    token_version = db.execute(
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(token_version=models.User.token_version + 1)
+        .returning(models.User.token_version)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    revocation = db.get(models.TokenRevocation, user_id)
+    if revocation is None:
+        revocation = models.TokenRevocation(user_id=user_id, revoked_below=0)
+        db.add(revocation)
+    revocation.token_version = token_version
+    if revoke:
+        revocation.revoked_below = token_version
+    return token_version, revocation.revoked_below
+
+def get_current_active_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """The caller's Principal: from the token's claims when they are current,
+    else from the principal cache or the users table.
+
+    The rare queries share the route's own get_db session.
+    """
+    token = credentials.credentials
+    return resolve_principal(token, token_payload(token), db)
+
+def resolve_principal(token: str, payload: dict, db: Session) -> Principal:
+    user_id = payload["user_id"]
+    
+    if check_token_version(payload, db) and payload.get("fmt") == TOKEN_FORMAT:
+        return Principal(user_id, payload["username"], payload["role"], payload["org_id"])
+    
+    principal = principal_cache.get(user_id, token)
+    if principal is not None:
+        return principal
+    
+    row = db.query(
+        models.User.id, models.User.username, models.User.role, models.User.organization_id
+    ).filter(models.User.id == user_id).first()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+        )
+    
+    principal = Principal(*row)
+    principal_cache.put(token, principal)
+    return principal
 
 def authenticate_user(db: Session, username: str, password: str) -> Optional[models.User]:
     user = db.query(models.User).filter(models.User.username == username).first()
@@ -0,0 +1,94 @@
+"""
+Concurrency benchmark
+HSE Performance Tracker
+
+Drives the hot read and write endpoints of a running server with a fixed
+number of concurrent clients and reports throughput and p50/p99 latency per
+endpoint. Run it against the production layout from the Procfile on two
+builds (e.g. before and after a change to a hot query, the pool sizes
+or the worker count) with the same settings:
+
+    pip install -r requirements-dev.txt
+    uvicorn main:app --port 8000 --workers 4
+    python bench_concurrency.py --username admin --password admin123 --project 1
+
+Raise --concurrency until the p99 of the older build climbs. An endpoint
+that blocks the event loop shows up as a p99 rise on every endpoint, not
+just its own. Use a local database, never production: the write mix saves
+daily logs for the project's first candidate (today's date, a couple of
+fields answered "yes").
+"""
+
+import argparse
+import asyncio
+import datetime
+import statistics
+import time
+from collections import defaultdict
+
+import httpx
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+async def client_loop(client, requests, deadline, results):
+    i = 0
+    while time.perf_counter() < deadline:
+        name, method, path, body = requests[i % len(requests)]
+        i += 1
+        started = time.perf_counter()
+        resp = await client.request(method, path, json=body)
+        results[name].append((resp.status_code, time.perf_counter() - started))
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        resp = await client.post("/api/auth/login", json={"username": args.username, "password": args.password})
+        resp.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {resp.json()['access_token']}"
+
+        candidates = (await client.get(f"/api/candidates/project/{args.project}")).json()
+        requests = [
+            ("projects", "GET", "/api/projects", None),
+            ("sections", "GET", f"/api/sections/project/{args.project}", None),
+            ("candidates", "GET", f"/api/candidates/project/{args.project}", None),
+            ("changes", "GET", f"/api/projects/{args.project}/changes", None),
+        ]
+        if candidates and args.writes:
+            requests.append(("daily-log", "POST", "/api/daily-logs", {
+                "candidate_id": candidates[0]["id"],
+                "log_date": datetime.date.today().isoformat(),
+                "time_in": "07:00",
+                "time_out": "17:00",
+                "task_briefing": True,
+                "tbt_conducted": True
+            }))
+
+        results = defaultdict(list)
+        deadline = time.perf_counter() + args.seconds
+        await asyncio.gather(*(
+            # Offset each client so the mix is spread over the endpoints
+            client_loop(client, requests[i % len(requests):] + requests[:i % len(requests)], deadline, results)
+            for i in range(args.concurrency)
+        ))
+
+    total = sum(len(r) for r in results.values())
+    print(f"{args.concurrency} clients, {args.seconds}s: {total} requests, {total / args.seconds:.1f} req/s")
+    for name, timings in results.items():
+        ok = [t for status, t in timings if status < 400]
+        print(f"  {name:<11} {len(ok)}/{len(timings)} ok, "
+              f"p50 {statistics.median(ok) * 1000 if ok else float('nan'):.0f} ms, "
+              f"p99 {percentile(ok, 0.99) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--project", type=int, required=True)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--seconds", type=int, default=30)
+    parser.add_argument("--writes", action=argparse.BooleanOptionalAction, default=True)
+    asyncio.run(run(parser.parse_args()))
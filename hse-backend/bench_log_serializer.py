@@ -0,0 +1,126 @@
+"""
+Daily log serializer benchmark
+HSE Performance Tracker
+
+Loads the same daily logs two ways and reports rows per second:
+
+    orm       db.query(DailyLog) and the old attribute-by-attribute serializer
+    core      select(*serialize_daily_log.columns) and serialize_daily_log
+
+Seeds a temporary SQLite database by default; pass --database-url to use a
+local scratch database instead (never production: it is seeded first).
+
+    python bench_log_serializer.py --rows 100000
+"""
+
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from migrations import migrate
+from models import Candidate, DailyLog, Project
+from serializers import serialize_daily_log
+
+def orm_serialize_daily_log(log: DailyLog) -> dict:
+    """The hand-written serializer the candidates endpoint used before"""
+    return {
+        "timeIn": str(log.time_in) if log.time_in else None,
+        "timeOut": str(log.time_out) if log.time_out else None,
+        "taskBriefing": log.task_briefing,
+        "tbtConducted": log.tbt_conducted,
+        "violationBriefing": log.violation_briefing,
+        "checklistSubmitted": log.checklist_submitted,
+        "inductionsCovered": log.inductions_covered,
+        "barcodeImplemented": log.barcode_implemented,
+        "attendanceVerified": log.attendance_verified,
+        "safetyObservationsRecorded": log.safety_observations_recorded,
+        "sorNcrClosed": log.sor_ncr_closed,
+        "mockDrillParticipated": log.mock_drill_participated,
+        "campaignParticipated": log.campaign_participated,
+        "monthlyInspectionsCompleted": log.monthly_inspections_completed,
+        "nearMissReported": log.near_miss_reported,
+        "weeklyTrainingBriefed": log.weekly_training_briefed,
+        "dailyReportsFollowup": log.daily_reports_followup,
+        "msraCommunicated": log.msra_communicated,
+        "consultantResponses": log.consultant_responses,
+        "weeklyTbtFullParticipation": log.weekly_tbt_full_participation,
+        "welfareFacilitiesMonitored": log.welfare_facilities_monitored,
+        "mondayNcrShared": log.monday_ncr_shared,
+        "safetyWalksConducted": log.safety_walks_conducted,
+        "trainingSessionsConducted": log.training_sessions_conducted,
+        "barcodeSystem100": log.barcode_system_100,
+        "taskBriefingsParticipating": log.task_briefings_participating,
+        "comment": log.comment,
+        "description": log.description
+    }
+
+def seed(engine, rows: int, candidates: int):
+    days = -(-rows // candidates)
+    first_day = datetime.date(2020, 1, 1)
+    random.seed(7)
+    with engine.begin() as conn:
+        project_id = conn.execute(insert(Project).values(name="Serializer bench").returning(Project.id)).scalar()
+        candidate_ids = [
+            conn.execute(insert(Candidate).values(project_id=project_id, name=f"Candidate {c}").returning(Candidate.id)).scalar()
+            for c in range(candidates)
+        ]
+        logs = []
+        for candidate_id in candidate_ids:
+            for d in range(days):
+                answered = random.getrandbits(24)
+                logs.append({
+                    "candidate_id": candidate_id,
+                    "log_date": first_day + datetime.timedelta(days=d),
+                    "time_in": datetime.time(7, 0),
+                    "time_out": datetime.time(16, 30),
+                    "checklist_answered": answered,
+                    "checklist_yes": answered & random.getrandbits(24),
+                    "comment": "ok" if d % 5 == 0 else None
+                })
+        conn.execute(insert(DailyLog), logs[:rows])
+
+def orm_path(engine):
+    with Session(engine) as db:
+        return [orm_serialize_daily_log(log) for log in db.query(DailyLog).order_by(DailyLog.log_date)]
+
+def core_path(engine):
+    with Session(engine) as db:
+        rows = db.execute(select(*serialize_daily_log.columns).order_by(DailyLog.log_date))
+        return [serialize_daily_log(row) for row in rows]
+
+def best_of(path, engine, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        payloads = path(engine)
+        timings.append(time.perf_counter() - started)
+    return min(timings), payloads
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="local scratch database (default: a temporary SQLite file)")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--candidates", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'serializer.db')}"
+    engine = create_engine(url)
+    migrate(engine)
+    print(f"Seeding {args.rows} daily logs...")
+    seed(engine, args.rows, args.candidates)
+
+    results = {}
+    for name, path in (("orm", orm_path), ("core", core_path)):
+        elapsed, payloads = best_of(path, engine, args.repeat)
+        results[name] = (elapsed, payloads)
+        print(f"{name:<9} {len(payloads)} rows in {elapsed:.2f}s: {len(payloads) / elapsed:,.0f} rows/s")
+
+    assert results["orm"][1] == results["core"][1], "payloads differ"
+    print(f"Speed-up: {results['orm'][0] / results['core'][0]:.1f}x (same payloads)")
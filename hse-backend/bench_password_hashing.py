@@ -0,0 +1,83 @@
+"""
+Login throughput benchmark
+HSE Performance Tracker
+
+Fires a burst of concurrent logins at a running server while a second set of
+clients keeps reading the dashboard, then reports logins per second and the
+dashboard read latency during the burst. Run it against a single worker to
+get the per-worker figure:
+
+    pip install -r requirements-dev.txt
+    PASSWORD_HASH_WORKERS=2 uvicorn main:app --workers 1 --port 8000
+    python bench_password_hashing.py --username admin --password admin123
+
+Use a local database, never production. The login route is rate limited per
+client address (10/minute), so start the server with RATELIMIT_ENABLED=0 or
+run this from several addresses.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+async def login(client, username, password, results):
+    started = time.perf_counter()
+    resp = await client.post("/api/auth/login", json={"username": username, "password": password})
+    results.append((resp.status_code, time.perf_counter() - started))
+
+async def read_dashboard(client, headers, stop, latencies):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/api/projects", headers=headers)
+        latencies.append(time.perf_counter() - started)
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        resp = await client.post("/api/auth/login", json={"username": args.username, "password": args.password})
+        resp.raise_for_status()
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+        stop = asyncio.Event()
+        read_latencies = []
+        readers = [asyncio.create_task(read_dashboard(client, headers, stop, read_latencies)) for _ in range(args.readers)]
+
+        results = []
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def limited():
+            async with semaphore:
+                await login(client, args.username, args.password, results)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(limited() for _ in range(args.logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*readers)
+
+    ok = [t for status, t in results if status == 200]
+    busy = sum(1 for status, _ in results if status == 503)
+    print(f"Logins: {len(ok)}/{len(results)} ok, {busy} rejected as busy, in {elapsed:.2f}s")
+    print(f"Throughput: {len(ok) / elapsed:.1f} logins/s")
+    if ok:
+        print(f"Login latency: p50 {statistics.median(ok) * 1000:.0f} ms, p99 {percentile(ok, 0.99) * 1000:.0f} ms")
+    print(f"Dashboard reads during burst: {len(read_latencies)}, "
+          f"p50 {percentile(read_latencies, 0.5) * 1000:.0f} ms, p99 {percentile(read_latencies, 0.99) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--readers", type=int, default=10)
+    asyncio.run(run(parser.parse_args()))
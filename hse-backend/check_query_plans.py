@@ -0,0 +1,182 @@
+"""
+Query plan check
+HSE Performance Tracker
+
+Runs EXPLAIN on the hot queries of each router and fails (exit code 1) if
+any of them reads a table with a sequential scan instead of an index.
+
+By default it builds a throwaway SQLite database seeded at benchmark volumes.
+To check PostgreSQL, point it at an empty local scratch database and let it
+seed that (never production: --seed writes thousands of rows):
+
+    python check_query_plans.py
+    python check_query_plans.py --database-url postgresql://localhost/hse_plans --seed
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+from typing import List, NamedTuple
+
+from sqlalchemy import create_engine, func, insert, select, text
+
+from migrations import migrate
+from models import (
+    Candidate, CandidateSection, DailyLog, MonthlyKPI, Organization, Project, ProjectUser, Section, User
+)
+
+class Check(NamedTuple):
+    router: str
+    description: str
+    table: str  # Must not be scanned
+    statement: object
+
+def seed(engine, projects: int, candidates: int, days: int):
+    """One organization with `projects` x `candidates` candidates, each with `days` of logs"""
+    first_day = datetime.date.today() - datetime.timedelta(days=days)
+    with engine.begin() as conn:
+        org_id = conn.execute(insert(Organization).values(name="Plan check").returning(Organization.id)).scalar()
+        lead_ids = [
+            conn.execute(insert(User).values(
+                username=f"plan-lead-{i}", password_hash="x", role="lead", organization_id=org_id
+            ).returning(User.id)).scalar()
+            for i in range(10)
+        ]
+        for p in range(projects):
+            project_id = conn.execute(insert(Project).values(
+                name=f"Project {p}", organization_id=org_id
+            ).returning(Project.id)).scalar()
+            conn.execute(insert(ProjectUser), [{"user_id": lead_ids[p % 10], "project_id": project_id}])
+            section_ids = [
+                conn.execute(insert(Section).values(
+                    project_id=project_id, name=f"Section {s}", display_order=s
+                ).returning(Section.id)).scalar()
+                for s in range(5)
+            ]
+            candidate_ids = [
+                conn.execute(insert(Candidate).values(
+                    project_id=project_id, name=f"Candidate {c}", display_order=c
+                ).returning(Candidate.id)).scalar()
+                for c in range(candidates)
+            ]
+            conn.execute(insert(CandidateSection), [
+                {"candidate_id": cid, "section_id": section_ids[i % 5]} for i, cid in enumerate(candidate_ids)
+            ])
+            conn.execute(insert(DailyLog), [
+                {"candidate_id": cid, "log_date": first_day + datetime.timedelta(days=d),
+                 "checklist_answered": 0b11, "checklist_yes": 0b10 | d % 2}
+                for cid in candidate_ids for d in range(days)
+            ])
+            conn.execute(insert(MonthlyKPI), [
+                {"candidate_id": cid, "month": datetime.date(first_day.year, first_day.month, 1)}
+                for cid in candidate_ids
+            ])
+        conn.execute(text("ANALYZE"))
+
+def hot_queries(conn) -> List[Check]:
+    """The filters the routers run on every request, with ids from the database"""
+    project_id, org_id = conn.execute(select(Project.id, Project.organization_id).limit(1)).one()
+    candidate_ids = conn.execute(
+        select(Candidate.id).where(Candidate.project_id == project_id)
+    ).scalars().all()
+    candidate_id = candidate_ids[0]
+    section_id = conn.execute(select(Section.id).where(Section.project_id == project_id).limit(1)).scalar()
+    user_id = conn.execute(select(ProjectUser.user_id).limit(1)).scalar()
+    today = datetime.date.today()
+    window = (today.replace(day=1) - datetime.timedelta(days=31), today)
+
+    return [
+        Check("AddingProjects", "projects of an organization", "projects",
+              select(Project.id).where(Project.organization_id == org_id)),
+        Check("AddingProjects", "candidate counts of listed projects", "candidates",
+              select(Candidate.project_id, func.count()).where(Candidate.project_id.in_(
+                  select(Project.id).where(Project.organization_id == org_id))
+              ).group_by(Candidate.project_id)),
+        Check("AddingProjects", "leads of listed projects", "project_users",
+              select(ProjectUser.user_id).where(ProjectUser.project_id.in_([project_id]))),
+        Check("access", "projects assigned to a lead", "project_users",
+              select(Project.id).join(ProjectUser, ProjectUser.project_id == Project.id).where(
+                  Project.organization_id == org_id, ProjectUser.user_id == user_id)),
+        Check("AddingCandidates", "candidates of a project in order", "candidates",
+              select(Candidate).where(Candidate.project_id == project_id).order_by(Candidate.display_order)),
+        Check("AddingCandidates", "logs of a project's candidates in the window", "daily_logs",
+              select(DailyLog).where(DailyLog.candidate_id.in_(candidate_ids),
+                                     DailyLog.log_date.between(*window))),
+        Check("AddingCandidates", "KPIs of a project's candidates", "monthly_kpis",
+              select(MonthlyKPI).where(MonthlyKPI.candidate_id.in_(candidate_ids))),
+        Check("AddingCandidates", "section assignments of a project's candidates", "candidate_sections",
+              select(CandidateSection).where(CandidateSection.candidate_id.in_(candidate_ids))),
+        Check("AddingDailyLogs", "logs of a candidate, newest first", "daily_logs",
+              select(DailyLog).where(DailyLog.candidate_id == candidate_id).order_by(DailyLog.log_date.desc())),
+        Check("AddingDailyLogs", "log of a candidate on a day", "daily_logs",
+              select(DailyLog).where(DailyLog.candidate_id == candidate_id, DailyLog.log_date == today)),
+        Check("AddingDailyLogs", "KPI of a candidate for a month", "monthly_kpis",
+              select(MonthlyKPI).where(MonthlyKPI.candidate_id == candidate_id,
+                                       MonthlyKPI.month == today.replace(day=1))),
+        Check("AddingSections", "sections of a project in order", "sections",
+              select(Section).where(Section.project_id == project_id).order_by(Section.display_order)),
+        Check("AddingSections", "members of a section", "candidate_sections",
+              select(CandidateSection.candidate_id).where(CandidateSection.section_id == section_id)),
+        Check("scoring", "checklist counts of a project", "daily_logs",
+              select(DailyLog.candidate_id, func.count()).join(Candidate, Candidate.id == DailyLog.candidate_id)
+              .where(Candidate.project_id == project_id, DailyLog.log_date.between(*window))
+              .group_by(DailyLog.candidate_id)),
+    ]
+
+def sequential_scans(conn, statement) -> List[str]:
+    """Tables read with a full scan in the plan of `statement`"""
+    compiled = statement.compile(conn, compile_kwargs={"literal_binds": True})
+    if conn.dialect.name == "postgresql":
+        plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        scanned, nodes = [], [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            if node["Node Type"] == "Seq Scan":
+                scanned.append(node["Relation Name"])
+            nodes.extend(node.get("Plans", []))
+        return scanned
+    # SQLite: "SCAN <table>" is a full scan, "SEARCH <table> USING INDEX" is not
+    rows = conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+    return [row[3].split()[1] for row in rows if row[3].startswith("SCAN ")]
+
+def check_plans(engine, verbose: bool = True) -> List[Check]:
+    """Returns the checks whose table is scanned"""
+    failures = []
+    with engine.connect() as conn:
+        for check in hot_queries(conn):
+            scanned = sequential_scans(conn, check.statement)
+            ok = check.table not in scanned
+            if not ok:
+                failures.append(check)
+            if verbose:
+                print(f"{'ok  ' if ok else 'SCAN'} {check.router:<16} {check.description}")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="database to check (default: a temporary SQLite file)")
+    parser.add_argument("--seed", action="store_true", help="migrate and seed the database first")
+    parser.add_argument("--projects", type=int, default=30)
+    parser.add_argument("--candidates", type=int, default=40)
+    parser.add_argument("--days", type=int, default=120)
+    args = parser.parse_args()
+
+    url = args.database_url
+    if url is None:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plans.db')}"
+        args.seed = True
+    engine = create_engine(url)
+    if args.seed:
+        migrate(engine)
+        print(f"Seeding {args.projects} projects x {args.candidates} candidates x {args.days} days...")
+        seed(engine, args.projects, args.candidates, args.days)
+
+    failures = check_plans(engine)
+    if failures:
+        print(f"\n{len(failures)} hot quer{'y' if len(failures) == 1 else 'ies'} use a sequential scan")
+        sys.exit(1)
+    print("\nAll hot queries use indexes")
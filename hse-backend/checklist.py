@@ -0,0 +1,72 @@
+"""Registry of the daily log's Yes/No checklist questions.
+
+A log stores its answers as two bit masks, `checklist_answered` (Yes or No
+was given) and `checklist_yes` (the answer is Yes), with one bit per
+question. Bits are part of the stored data: new questions take the next
+free bit, and a bit is never reused or renumbered.
+"""
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+
+class ChecklistField(NamedTuple):
+    column: str  # DailyLog attribute and API field (snake_case)
+    key: str     # Frontend key (camelCase)
+    bit: int     # Position in the answer masks
+
+    @property
+    def mask(self) -> int:
+        return 1 << self.bit
+
+# The Yes/No questions of the daily log, in the order the frontend shows them
+CHECKLIST_FIELDS = (
+    ChecklistField("task_briefing", "taskBriefing", 0),
+    ChecklistField("tbt_conducted", "tbtConducted", 1),
+    ChecklistField("violation_briefing", "violationBriefing", 2),
+    ChecklistField("checklist_submitted", "checklistSubmitted", 3),
+    ChecklistField("inductions_covered", "inductionsCovered", 4),
+    ChecklistField("barcode_implemented", "barcodeImplemented", 5),
+    ChecklistField("attendance_verified", "attendanceVerified", 6),
+    ChecklistField("safety_observations_recorded", "safetyObservationsRecorded", 7),
+    ChecklistField("sor_ncr_closed", "sorNcrClosed", 8),
+    ChecklistField("mock_drill_participated", "mockDrillParticipated", 9),
+    ChecklistField("campaign_participated", "campaignParticipated", 10),
+    ChecklistField("monthly_inspections_completed", "monthlyInspectionsCompleted", 11),
+    ChecklistField("near_miss_reported", "nearMissReported", 12),
+    ChecklistField("weekly_training_briefed", "weeklyTrainingBriefed", 13),
+    ChecklistField("daily_reports_followup", "dailyReportsFollowup", 14),
+    ChecklistField("msra_communicated", "msraCommunicated", 15),
+    ChecklistField("consultant_responses", "consultantResponses", 16),
+    ChecklistField("weekly_tbt_full_participation", "weeklyTbtFullParticipation", 17),
+    ChecklistField("welfare_facilities_monitored", "welfareFacilitiesMonitored", 18),
+    ChecklistField("monday_ncr_shared", "mondayNcrShared", 19),
+    ChecklistField("safety_walks_conducted", "safetyWalksConducted", 20),
+    ChecklistField("training_sessions_conducted", "trainingSessionsConducted", 21),
+    ChecklistField("barcode_system_100", "barcodeSystem100", 22),
+    ChecklistField("task_briefings_participating", "taskBriefingsParticipating", 23),
+)
+
+CHECKLIST_COLUMNS = {field.column: field for field in CHECKLIST_FIELDS}
+
+def pack_answers(answers: Mapping[str, Optional[bool]]) -> Tuple[int, int, int]:
+    """(given, answered, yes) masks of the checklist answers in `answers`.
+
+    Keys that aren't checklist columns are ignored; `given` has the bits of
+    the questions present in `answers`, including those set to None.
+    """
+    given = answered = yes = 0
+    for column, value in answers.items():
+        field = CHECKLIST_COLUMNS.get(column)
+        if field is None:
+            continue
+        given |= field.mask
+        if value is not None:
+            answered |= field.mask
+            if value:
+                yes |= field.mask
+    return given, answered, yes
+
+def unpack_answers(answered: int, yes: int) -> Dict[str, Optional[bool]]:
+    """{column: True / False / None} of every checklist question"""
+    return {
+        field.column: bool(yes & field.mask) if answered & field.mask else None
+        for field in CHECKLIST_FIELDS
+    }
@@ -0,0 +1,117 @@
+import os
+
+# Never let the test suite touch the database configured in .env
+os.environ["DATABASE_URL"] = "sqlite://"
+# Photos go to a temporary directory per test (test_photos.py)
+os.environ["PHOTO_STORE_EPHEMERAL"] = "1"
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from fastapi.testclient import TestClient
+
+from main import app
+from database import get_db, Base
+from models import Organization, User, Project, Candidate
+from auth import create_access_token, principal_cache, token_versions
+from access import access_index
+
+
+@pytest.fixture(autouse=True)
+def clear_auth_caches():
+    """Ids and tokens repeat across tests, so cached principals and access sets must not"""
+    principal_cache.clear()
+    access_index.clear()
+    token_versions.clear()
+    yield
+    principal_cache.clear()
+    access_index.clear()
+    token_versions.clear()
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    # A file, not :memory:, so every connection of the pool sees the same data
+    return tmp_path / "test.db"
+
+
+@pytest.fixture
+def engine(database_path):
+    engine = create_engine(
+        f"sqlite:///{database_path}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(engine):
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        session = TestingSessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def admin(db):
+    """An organization admin plus the auth headers to act as them"""
+    org = Organization(name="Test Org")
+    db.add(org)
+    db.commit()
+    user = User(
+        username="admin",
+        password_hash="x",
+        is_admin=True,
+        role="admin",
+        organization_id=org.id,
+    )
+    db.add(user)
+    db.commit()
+    token = create_access_token({"user_id": user.id, "username": user.username})
+    return {"user": user, "headers": {"Authorization": f"Bearer {token}"}}
+
+
+@pytest.fixture
+def make_project(db, admin):
+    """Create a project in the admin's organization with `n` candidates"""
+    def _make_project(n_candidates=0, name="Project"):
+        project = Project(name=name, organization_id=admin["user"].organization_id)
+        db.add(project)
+        db.commit()
+        for i in range(n_candidates):
+            db.add(Candidate(project_id=project.id, name=f"Candidate {i}", display_order=i))
+        db.commit()
+        return project
+    return _make_project
+
+
+@pytest.fixture
+def query_counter(engine):
+    """Count the SQL statements executed against the test engine"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
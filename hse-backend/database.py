@@ -2,7 +2,9 @@ import os
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
+from db_pool import PoolMetrics, pool_options
 
 load_dotenv()
 
@@ -13,7 +15,18 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-engine = create_engine(DATABASE_URL)
+# Pool sizing and metrics: see db_pool.py
+pool_metrics = PoolMetrics()
+
+def create_pooled_engine(url: str, metrics: PoolMetrics):
+    options = pool_options(url)
+    if options:
+        options["poolclass"] = metrics.pool_class(QueuePool)
+    engine = create_engine(url, **options)
+    metrics.instrument(engine)
+    return engine
+
+engine = create_pooled_engine(DATABASE_URL, pool_metrics)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -22,4 +35,12 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def insert_for(db):
+    """Dialect specific INSERT so ON CONFLICT works on PostgreSQL and SQLite"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
@@ -0,0 +1,119 @@
+"""Connection pool settings and metrics.
+
+Each uvicorn worker has one engine, and its pool keeps DB_POOL_SIZE
+connections open plus up to DB_MAX_OVERFLOW more under load. The
+connections the app can hold on the database server are therefore
+
+    workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW)    = 4 x (5 + 10) = 60 by default
+
+which must stay below the server's max_connections (100 on a stock
+PostgreSQL) minus what migrations, consoles and other clients need. Raise
+the budget only together with max_connections, or lower it when adding
+workers or replicas.
+
+Settings come from the environment:
+
+    DB_POOL_SIZE            connections kept open per worker (default 5, at least 1)
+    DB_MAX_OVERFLOW         extra connections per worker under load (default 10, at least 0)
+    DB_POOL_TIMEOUT         seconds to wait for a free connection before failing (default 30)
+    DB_POOL_PRE_PING        "1" to test connections on checkout (default), "0" to skip
+    DB_POOL_RECYCLE         seconds after which a connection is replaced (default 1800);
+                            Railway's proxy drops idle connections, so keep this short
+
+PoolMetrics counts what the pool does (checkouts, connections opened and
+closed, invalidations, timeouts) and how long callers waited for a
+connection, for /api/ops/db-pool. SQLite keeps SQLAlchemy's own pooling.
+"""
+import os
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from metrics import Histogram
+
+# Upper bounds (seconds) of the checkout wait histogram; the last bucket is open-ended
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+def pool_options(url: str) -> dict:
+    """create_engine keyword arguments for the engine's pool"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        # A pool_size of 0 would mean no limit at all
+        "pool_size": max(1, int(os.getenv("DB_POOL_SIZE", "5"))),
+        "max_overflow": max(0, int(os.getenv("DB_MAX_OVERFLOW", "10"))),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") != "0",
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    }
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = self.checkins = 0
+        self.opened = self.closed = self.invalidated = 0
+        self.timeouts = 0
+        self.wait = Histogram(WAIT_BUCKETS)  # Time to get a connection, including pre-ping
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def observe_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.wait.observe(seconds)
+
+    def pool_class(self, base):
+        """Subclass of the pool class `base` that reports checkout waits here"""
+        metrics = self
+
+        class MeteredPool(base):
+            def connect(self):
+                started = time.perf_counter()
+                try:
+                    connection = super().connect()
+                except exc.TimeoutError:
+                    metrics.observe_wait(time.perf_counter() - started, timed_out=True)
+                    raise
+                metrics.observe_wait(time.perf_counter() - started)
+                return connection
+
+        MeteredPool.__name__ = f"Metered{base.__name__}"
+        return MeteredPool
+
+    def instrument(self, engine):
+        """Count pool events of a (sync) engine; survives engine.dispose()"""
+        event.listen(engine, "checkout", lambda *args: self._count("checkouts"))
+        event.listen(engine, "checkin", lambda *args: self._count("checkins"))
+        event.listen(engine, "connect", lambda *args: self._count("opened"))
+        event.listen(engine, "close", lambda *args: self._count("closed"))
+        event.listen(engine, "close_detached", lambda *args: self._count("closed"))
+        event.listen(engine, "invalidate", lambda *args: self._count("invalidated"))
+        event.listen(engine, "soft_invalidate", lambda *args: self._count("invalidated"))
+
+    def stats(self, engine) -> dict:
+        pool = engine.pool
+        current = {"pool": type(pool).__name__}
+        # Only queue pools have a size and overflow to report
+        if hasattr(pool, "overflow"):
+            current.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "timeout_seconds": pool.timeout()
+            })
+        with self._lock:
+            return dict(current, **{
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "timeouts": self.timeouts,
+                "connections_opened": self.opened,
+                "connections_closed": self.closed,
+                "invalidated": self.invalidated,
+                "wait": self.wait.snapshot()
+            })
@@ -4,6 +4,7 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from models import Project, Candidate, DailyLog, MonthlyKPI, Section, CandidateSection, Base, User
 from database import DATABASE_URL
+from serializers import parse_daily_log, parse_monthly_kpi
 from datetime import datetime
 
 REMOTE_API_BASE = "https://hse-backend.up.railway.app/api"
@@ -63,7 +64,8 @@ def import_data():
         
         # 2. Fetch Candidates
         print(f"     📥 Fetching candidates for project {p_data['name']}...")
-        c_resp = requests.get(f"{REMOTE_API_BASE}/candidates/project/{p_data['id']}")
+        # Ask for the full log history; the endpoint defaults to recent months only
+        c_resp = requests.get(f"{REMOTE_API_BASE}/candidates/project/{p_data['id']}", params={"from": "2000-01-01"})
         if c_resp.status_code == 200:
             candidates = c_resp.json()
             for c_data in candidates:
@@ -101,34 +103,7 @@ def import_data():
                         new_log = DailyLog(
                             candidate_id=local_candidate_id,
                             log_date=date_str,
-                            time_in=l_data.get('timeIn'),
-                            time_out=l_data.get('timeOut'),
-                            task_briefing=l_data.get('taskBriefing', False),
-                            tbt_conducted=l_data.get('tbtConducted', False),
-                            violation_briefing=l_data.get('violationBriefing', False),
-                            checklist_submitted=l_data.get('checklistSubmitted', False),
-                            inductions_covered=l_data.get('inductionsCovered', False),
-                            barcode_implemented=l_data.get('barcodeImplemented', False),
-                            attendance_verified=l_data.get('attendanceVerified', False),
-                            safety_observations_recorded=l_data.get('safetyObservationsRecorded', False),
-                            sor_ncr_closed=l_data.get('sorNcrClosed', False),
-                            mock_drill_participated=l_data.get('mockDrillParticipated', False),
-                            campaign_participated=l_data.get('campaignParticipated', False),
-                            monthly_inspections_completed=l_data.get('monthlyInspectionsCompleted', False),
-                            near_miss_reported=l_data.get('nearMissReported', False),
-                            weekly_training_briefed=l_data.get('weeklyTrainingBriefed', False),
-                            daily_reports_followup=l_data.get('dailyReportsFollowup', False),
-                            msra_communicated=l_data.get('msraCommunicated', False),
-                            consultant_responses=l_data.get('consultantResponses', False),
-                            weekly_tbt_full_participation=l_data.get('weeklyTbtFullParticipation', False),
-                            welfare_facilities_monitored=l_data.get('welfareFacilitiesMonitored', False),
-                            monday_ncr_shared=l_data.get('mondayNcrShared', False),
-                            safety_walks_conducted=l_data.get('safetyWalksConducted', False),
-                            training_sessions_conducted=l_data.get('trainingSessionsConducted', False),
-                            barcode_system_100=l_data.get('barcodeSystem100', False),
-                            task_briefings_participating=l_data.get('taskBriefingsParticipating', False),
-                            comment=l_data.get('comment'),
-                            description=l_data.get('description')
+                            **parse_daily_log(l_data)
                         )
                         db.add(new_log)
                 
@@ -149,13 +124,7 @@ def import_data():
                         new_kpi = MonthlyKPI(
                             candidate_id=local_candidate_id,
                             month=month_str,
-                            observations_open=k_data.get('observationsOpen', 0),
-                            observations_closed=k_data.get('observationsClosed', 0),
-                            violations=k_data.get('violations', 0),
-                            ncrs_open=k_data.get('ncrsOpen', 0),
-                            ncrs_closed=k_data.get('ncrsClosed', 0),
-                            weekly_reports_open=k_data.get('weeklyReportsOpen', 0),
-                            weekly_reports_closed=k_data.get('weeklyReportsClosed', 0)
+                            **parse_monthly_kpi(k_data)
                         )
                         db.add(new_kpi)
                 
@@ -0,0 +1,150 @@
+"""Project-wide monthly KPI import.
+
+HSE managers paste a whole project's month-end numbers from a spreadsheet,
+either as JSON rows or as CSV (comma, semicolon or tab separated, with a
+header row). Each row names its candidate by `candidate_id` or by name
+(`candidate` / `name` column) and carries the KPI columns; blank cells count
+as 0, and KPI columns missing from the whole import are left untouched on
+existing rows.
+
+All candidates are resolved with one query, and the valid rows are written
+with a single multi-row INSERT ... ON CONFLICT (candidate_id, month) DO
+UPDATE, in one transaction. Invalid rows are reported, not written.
+"""
+import csv
+import io
+import json
+import re
+from datetime import date
+from typing import List
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from database import insert_for
+from models import Candidate, MonthlyKPI, User
+from schemas import MonthlyKPIImportReport, MonthlyKPIImportResult, MonthlyKPIImportRow
+from access import verify_project_access
+from versioning import bump_project_version
+from serializers import KPI_FIELDS
+
+MAX_IMPORT_ROWS = 2000
+# Column names of the KPI counters, from the one registry in serializers.py
+KPI_COLUMNS = frozenset(column for column, _ in KPI_FIELDS)
+
+def column_name(header: str) -> str:
+    """'Observations Open' / 'observationsOpen' -> 'observations_open'; 'name' -> 'candidate'"""
+    name = re.sub(r"(?<=[a-z])(?=[A-Z])", "_", header.strip())
+    name = re.sub(r"[\s-]+", "_", name).lower()
+    return "candidate" if name in ("name", "candidate_name") else name
+
+def parse_rows(body: bytes, content_type: str) -> List[dict]:
+    """Rows of a JSON (list, or {"rows": [...]}) or CSV request body"""
+    if content_type.startswith("application/json"):
+        try:
+            rows = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body is not valid JSON")
+        if isinstance(rows, dict):
+            rows = rows.get("rows")
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise HTTPException(status_code=400, detail="Expected a list of KPI rows")
+        return rows
+
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8 encoded")
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(io.StringIO(text), dialect=dialect)
+    return [
+        {column_name(header): value.strip() for header, value in row.items()
+         if header and isinstance(value, str) and value.strip()}
+        for row in reader
+    ]
+
+async def request_rows(request: Request) -> List[dict]:
+    """parse_rows of the request body, as a dependency so the import route can stay sync"""
+    return parse_rows(await request.body(), request.headers.get("content-type", ""))
+
+def import_monthly_kpis(db: Session, project_id: int, month: date, rows: List[dict],
+                        current_user: User) -> MonthlyKPIImportReport:
+    if len(rows) > MAX_IMPORT_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_IMPORT_ROWS} rows per import")
+    verify_project_access(project_id, current_user, db)
+
+    candidate_ids, by_name = set(), {}
+    for candidate_id, name in db.query(Candidate.id, Candidate.name).filter(Candidate.project_id == project_id):
+        candidate_ids.add(candidate_id)
+        by_name.setdefault((name or "").strip().lower(), []).append(candidate_id)
+
+    outcomes, valid, columns = [], {}, set()  # outcomes: (row number, candidate id, error)
+    for number, raw in enumerate(rows, start=1):
+        try:
+            row = MonthlyKPIImportRow.model_validate(raw)
+        except ValidationError as e:
+            error = e.errors()[0]
+            field = ".".join(str(part) for part in error["loc"])
+            outcomes.append((number, None, f"{field}: {error['msg']}"))
+            continue
+
+        error = None
+        if row.candidate_id is not None:
+            candidate_id = row.candidate_id
+            if candidate_id not in candidate_ids:
+                error = "Candidate is not in this project"
+        elif row.candidate:
+            matches = by_name.get(row.candidate.strip().lower(), [])
+            candidate_id = matches[0] if len(matches) == 1 else None
+            if not matches:
+                error = f"No candidate named '{row.candidate}' in this project"
+            elif len(matches) > 1:
+                error = f"Several candidates are named '{row.candidate}', use candidate_id"
+        else:
+            candidate_id, error = None, "Row needs a candidate_id or candidate name"
+        if error is None and candidate_id in valid:
+            error = "Duplicate row for this candidate"
+
+        outcomes.append((number, candidate_id, error))
+        if error is None:
+            valid[candidate_id] = row
+            columns.update(row.model_fields_set & KPI_COLUMNS)
+
+    existing = set()
+    if valid:
+        # The bump locks the project until commit, so `existing` can't go stale
+        version = bump_project_version(db, project_id)
+        existing = {candidate_id for (candidate_id,) in db.query(MonthlyKPI.candidate_id).filter(
+            MonthlyKPI.candidate_id.in_(valid),
+            MonthlyKPI.month == month
+        )}
+        table = MonthlyKPI.__table__
+        statement = insert_for(db)(table).values([
+            dict(row.model_dump(include=KPI_COLUMNS), candidate_id=candidate_id,
+                 month=month, change_version=version)
+            for candidate_id, row in valid.items()
+        ])
+        set_ = {column: statement.excluded[column] for column in columns}
+        set_["change_version"] = statement.excluded.change_version
+        db.execute(statement.on_conflict_do_update(index_elements=["candidate_id", "month"], set_=set_))
+        db.commit()
+
+    results = [
+        MonthlyKPIImportResult(
+            row=number,
+            candidate_id=candidate_id,
+            status="error" if error else "updated" if candidate_id in existing else "created",
+            error=error
+        )
+        for number, candidate_id, error in outcomes
+    ]
+    statuses = [result.status for result in results]
+    return MonthlyKPIImportReport(
+        month=month,
+        created=statuses.count("created"),
+        updated=statuses.count("updated"),
+        failed=statuses.count("error"),
+        rows=results
+    )
@@ -0,0 +1,49 @@
+from datetime import date, timedelta
+from typing import Optional, Tuple
+from fastapi import HTTPException, Query
+
+# Date range applied to DailyLog.log_date when serving candidate payloads
+LogWindow = Tuple[date, date]
+
+def month_bounds(day: date) -> LogWindow:
+    """First and last day of the month containing `day`"""
+    first = day.replace(day=1)
+    next_month = (first + timedelta(days=32)).replace(day=1)
+    return first, next_month - timedelta(days=1)
+
+def default_log_window(today: Optional[date] = None) -> LogWindow:
+    """Previous and current calendar month, so 7/30 day charts are always covered"""
+    today = today or date.today()
+    current_start, current_end = month_bounds(today)
+    previous_start, _ = month_bounds(current_start - timedelta(days=1))
+    return previous_start, current_end
+
+def parse_month(value: str) -> date:
+    """Accept YYYY-MM or any YYYY-MM-DD inside the month"""
+    try:
+        if len(value) == 7:
+            return date.fromisoformat(f"{value}-01")
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="month must be YYYY-MM or YYYY-MM-DD")
+
+def log_window(
+    date_from: Optional[date] = Query(None, alias="from", description="First log date to include"),
+    date_to: Optional[date] = Query(None, alias="to", description="Last log date to include"),
+    month: Optional[str] = Query(None, description="Only include logs from this month (YYYY-MM)")
+) -> LogWindow:
+    """Dependency resolving ?from=&to= or ?month= into an inclusive date range"""
+    if month:
+        if date_from or date_to:
+            raise HTTPException(status_code=400, detail="Use either month or from/to, not both")
+        return month_bounds(parse_month(month))
+
+    if date_from is None and date_to is None:
+        return default_log_window()
+
+    _, default_end = default_log_window()
+    start = date_from or date.min
+    end = date_to or max(default_end, start)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    return start, end
@@ -1,22 +1,21 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
+from database import engine
 import AddingProjects
 import AddingCandidates
 import AddingSections
 import AddingDailyLogs
 import AuthRoutes
 
-from migrate_db import migrate
+from migrations import migrate
+from photo_store import check_photo_store
 
-# Run migrations for existing tables
-try:
-    migrate()
-except Exception as e:
-    print(f"Migration warning: {e}")
+# Photos are written to disk: refuse to start where a redeploy would lose them
+check_photo_store()
 
-# Create new database tables
-Base.metadata.create_all(bind=engine)
+# Apply pending schema migrations (a single version check when already at head,
+# as it is once the pre-deploy `python migrations.py` has run)
+migrate(engine)
 
 app = FastAPI(
     title="HSE Performance Tracker API",
@@ -55,6 +54,12 @@ app.include_router(AddingSections.router)
 app.include_router(AddingDailyLogs.router)  # ✅ ADDED DAILY LOGS ROUTER
 import DataExport
 app.include_router(DataExport.router)
+import DeltaSync
+app.include_router(DeltaSync.router)
+import PhotoRoutes
+app.include_router(PhotoRoutes.router)
+import OpsRoutes
+app.include_router(OpsRoutes.router)
 
 @app.get("/")
 def root():
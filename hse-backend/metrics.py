@@ -0,0 +1,28 @@
+"""Small in-process metrics shared by the /api/ops endpoints"""
+from bisect import bisect_left
+
+class Histogram:
+    """Latency histogram; `buckets` are upper bounds in seconds, the last bucket is open-ended.
+
+    Not thread safe on its own: callers observe and snapshot under their lock.
+    """
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def snapshot(self) -> dict:
+        count = sum(self.counts)
+        labels = [f"le_{b}" for b in self.buckets] + ["inf"]
+        return {
+            "count": count,
+            "mean_seconds": round(self.total / count, 4) if count else None,
+            "max_seconds": round(self.max, 4),
+            "buckets": dict(zip(labels, self.counts))
+        }
@@ -0,0 +1,73 @@
+"""
+Move inline base64 photos into the photo store
+HSE Performance Tracker
+
+Candidate.photo and Project.hse_lead_photo used to hold JPEG data URLs.
+This writes each one to the content-addressed store (PHOTO_STORE_DIR) and
+replaces the column value with its /api/photos/<hash> URL. Safe to re-run:
+rows that already hold a URL are skipped.
+
+The inline data is dropped, so this only runs against a persistent store:
+PHOTO_STORE_DIR set to a mounted volume (or a Railway volume attached), the
+same storage the deployed workers use. PHOTO_STORE_EPHEMERAL is not enough.
+"""
+import os
+import sys
+
+from database import SessionLocal
+from models import Candidate, Project
+from photo_store import RAILWAY_VOLUME, photo_store_problem, store_data_url
+from versioning import stamp_changes, bump_project_version
+
+BATCH_SIZE = 50
+
+def migrate_column(db, model, column, project_id_of, on_change):
+    """Convert one column, loading a single row's photo at a time. Returns (moved, failed)."""
+    ids = [row_id for (row_id,) in db.query(model.id).filter(getattr(model, column).like("data:%")).all()]
+    moved = failed = 0
+    for i, row_id in enumerate(ids, 1):
+        row = db.get(model, row_id)
+        try:
+            setattr(row, column, store_data_url(getattr(row, column)))
+        except ValueError as e:
+            print(f"⚠️  {model.__tablename__} #{row_id}: {e}, left inline")
+            failed += 1
+            continue
+        on_change(db, project_id_of(row), row)
+        moved += 1
+        if i % BATCH_SIZE == 0:
+            db.commit()
+            db.expunge_all()  # Don't keep every decoded photo in memory
+    db.commit()
+    return moved, failed
+
+def run():
+    problem = photo_store_problem()
+    if problem is None and not (os.getenv("PHOTO_STORE_DIR") or RAILWAY_VOLUME):
+        problem = "PHOTO_STORE_DIR is not set"
+    if problem:
+        sys.exit(f"❌ Refusing to move photos out of the database: {problem}")
+
+    db = SessionLocal()
+    try:
+        print("🔄 Moving candidate photos to the photo store...")
+        moved, failed = migrate_column(
+            db, Candidate, "photo", lambda c: c.project_id, stamp_changes
+        )
+        print(f"✅ Candidates: {moved} moved, {failed} left inline")
+
+        print("🔄 Moving HSE lead photos to the photo store...")
+        moved, failed = migrate_column(
+            db, Project, "hse_lead_photo", lambda p: p.id,
+            lambda db, project_id, row: bump_project_version(db, project_id)
+        )
+        print(f"✅ Projects: {moved} moved, {failed} left inline")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,366 @@
+"""
+Versioned schema migrations
+HSE Performance Tracker
+
+The database records the migrations it has applied in `schema_version`.
+On start-up each worker reads the latest version in one query and, when it
+is already at head, carries on serving. Otherwise the pending migrations run
+in order inside a single transaction; on PostgreSQL the transaction first
+takes an advisory lock, so when several workers boot at once one of them
+migrates and the others wait and then find nothing left to do.
+
+Migrations marked @online (index builds with CONCURRENTLY) can't run in a
+transaction on PostgreSQL: the runner commits the migrations before them and
+runs them on an autocommit connection under a session-level advisory lock.
+
+Migrations must be idempotent: a database that predates this table starts
+at version 0 and replays all of them over whatever the old migrate_db.py
+and one-off scripts had already done. They must not use models.py either:
+version 1 creates the tables of the frozen schema_v1.py, and every change
+to the models after that needs its own migration appended to MIGRATIONS,
+written in SQL (or Core over its own tables) against the schema as it is at
+that point.
+
+    python migrations.py            # migrate the DATABASE_URL database, then prune old tombstones
+    python migrations.py --status   # show the current and head versions
+
+The deploy runs `python migrations.py` once before starting the workers
+(railway.json preDeployCommand), so pruning doesn't happen on every
+worker boot; see also prune_tombstones.py.
+"""
+import argparse
+import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, bindparam, func, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+import schema_v1
+from schema_v1 import CHECKLIST_BOOLEAN_COLUMNS
+
+# Arbitrary key for pg_advisory_xact_lock, shared by every worker
+ADVISORY_LOCK_KEY = 7305_2024
+
+schema_version = Table(
+    "schema_version", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False)
+)
+
+# ==================== HELPERS ====================
+
+def has_column(conn, table: str, column: str) -> bool:
+    return column in {c["name"] for c in inspect(conn).get_columns(table)}
+
+def add_column(conn, table: str, column: str, ddl: str):
+    """ALTER TABLE ... ADD COLUMN unless the column is already there"""
+    if not has_column(conn, table, column):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+def is_postgres(conn) -> bool:
+    return conn.dialect.name == "postgresql"
+
+def online(step):
+    """Mark a migration that must run outside a transaction on PostgreSQL
+    (CREATE INDEX CONCURRENTLY); it gets an autocommit connection"""
+    step.online = True
+    return step
+
+def create_index(conn, name: str, table: str, columns: str):
+    """CREATE INDEX IF NOT EXISTS, without blocking writes on PostgreSQL"""
+    if not is_postgres(conn):
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+        return
+    # An interrupted concurrent build leaves an invalid index behind; rebuild it
+    invalid = conn.execute(text(
+        "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid"
+        " WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).first()
+    if invalid:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})"))
+
+# ==================== MIGRATIONS ====================
+
+def create_tables(conn):
+    schema_v1.metadata.create_all(bind=conn)
+
+def add_organizations(conn):
+    add_column(conn, "users", "organization_id", "INTEGER REFERENCES organizations(id)")
+    add_column(conn, "projects", "organization_id", "INTEGER REFERENCES organizations(id)")
+    # Data created before multitenancy belongs to a default organization
+    orphans = conn.execute(text(
+        "SELECT (SELECT COUNT(*) FROM users WHERE organization_id IS NULL)"
+        " + (SELECT COUNT(*) FROM projects WHERE organization_id IS NULL)"
+    )).scalar()
+    if orphans:
+        conn.execute(text(
+            "INSERT INTO organizations (name) VALUES ('Default Company') ON CONFLICT (name) DO NOTHING"
+        ))
+        for table in ["users", "projects"]:
+            conn.execute(text(
+                f"UPDATE {table} SET organization_id = (SELECT id FROM organizations WHERE name = 'Default Company')"
+                " WHERE organization_id IS NULL"
+            ))
+
+def add_user_profile(conn):
+    if not has_column(conn, "users", "role"):
+        add_column(conn, "users", "role", "VARCHAR DEFAULT 'viewer'")
+        conn.execute(text("UPDATE users SET role = 'admin' WHERE is_admin = TRUE"))
+    add_column(conn, "users", "email", "VARCHAR")
+    add_column(conn, "users", "full_name", "VARCHAR")
+
+def add_project_settings(conn):
+    add_column(conn, "projects", "delete_pin", "VARCHAR")
+    add_column(conn, "projects", "high_risk", "JSONB DEFAULT '[]'::jsonb" if is_postgres(conn) else "JSON DEFAULT '[]'")
+
+def add_candidate_order(conn):
+    if not has_column(conn, "candidates", "display_order"):
+        add_column(conn, "candidates", "display_order", "INTEGER DEFAULT 0")
+        # Keep the existing (creation) order
+        conn.execute(text("UPDATE candidates SET display_order = id"))
+
+def add_daily_log_fields(conn):
+    for field in CHECKLIST_BOOLEAN_COLUMNS:
+        add_column(conn, "daily_logs", field, "BOOLEAN DEFAULT FALSE")
+    add_column(conn, "daily_logs", "comment", "VARCHAR(255)")
+    add_column(conn, "daily_logs", "description", "VARCHAR")
+
+def add_section_indexes(conn):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_sections_project_id ON sections (project_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_candidate_sections_candidate_id ON candidate_sections (candidate_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_candidate_sections_section_id ON candidate_sections (section_id)"))
+
+def add_versioning(conn):
+    add_column(conn, "users", "token_version", "INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, "projects", "data_version", "INTEGER NOT NULL DEFAULT 0")
+    # Change tracking for GET /api/projects/{id}/changes
+    for table in ["candidates", "daily_logs", "monthly_kpis", "sections", "candidate_sections"]:
+        add_column(conn, table, "change_version", "INTEGER NOT NULL DEFAULT 0")
+
+def drop_duplicates(conn, table: str, key: str, entity: str):
+    """Delete rows repeating another row's (candidate_id, key), leaving tombstones.
+
+    The create-or-update endpoints used to update whichever row they found
+    first, i.e. the oldest, so that one is kept.
+    """
+    duplicates = conn.execute(text(
+        f"SELECT d.id, d.candidate_id, d.{key} AS key, c.project_id FROM {table} d"
+        " LEFT JOIN candidates c ON c.id = d.candidate_id"
+        f" WHERE EXISTS (SELECT 1 FROM {table} older WHERE older.candidate_id = d.candidate_id"
+        f" AND older.{key} = d.{key} AND older.id < d.id)"
+    )).fetchall()
+    if not duplicates:
+        return
+
+    project_ids = sorted({d.project_id for d in duplicates if d.project_id})
+    versions = dict(conn.execute(text(
+        "UPDATE projects SET data_version = data_version + 1 WHERE id IN :ids RETURNING id, data_version"
+    ).bindparams(bindparam("ids", expanding=True)), {"ids": project_ids}).all()) if project_ids else {}
+    tombstones = [
+        {"project_id": d.project_id, "entity": entity, "entity_id": d.id,
+         "details": {"candidate_id": d.candidate_id, key: d.key if isinstance(d.key, int) else str(d.key)},
+         "change_version": versions[d.project_id]}
+        for d in duplicates if d.project_id in versions
+    ]
+    if tombstones:
+        conn.execute(schema_v1.metadata.tables["change_tombstones"].insert(), tombstones)
+    conn.execute(text(f"DELETE FROM {table} WHERE id IN :ids").bindparams(
+        bindparam("ids", expanding=True)), {"ids": [d.id for d in duplicates]})
+
+def unique_daily_logs(conn):
+    # Rollups of the affected candidates are rebuilt by version 13
+    drop_duplicates(conn, "daily_logs", "log_date", "daily_log")
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_daily_logs_candidate_date ON daily_logs (candidate_id, log_date)"
+    ))
+
+def unique_monthly_kpis(conn):
+    drop_duplicates(conn, "monthly_kpis", "month", "monthly_kpi")
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_monthly_kpis_candidate_month ON monthly_kpis (candidate_id, month)"
+    ))
+
+@online
+def add_hot_path_indexes(conn):
+    create_index(conn, "ix_project_users_user_project", "project_users", "user_id, project_id")
+    create_index(conn, "ix_project_users_project_id", "project_users", "project_id")
+    create_index(conn, "ix_candidates_project_order", "candidates", "project_id, display_order")
+    create_index(conn, "ix_sections_project_order", "sections", "project_id, display_order")
+    create_index(conn, "ix_projects_organization_id", "projects", "organization_id")
+    create_index(conn, "idx_candidate_sections_candidate_id", "candidate_sections", "candidate_id")
+    create_index(conn, "idx_candidate_sections_section_id", "candidate_sections", "section_id")
+    # Covered by ix_sections_project_order
+    concurrently = "CONCURRENTLY " if is_postgres(conn) else ""
+    conn.execute(text(f"DROP INDEX {concurrently}IF EXISTS idx_sections_project_id"))
+
+def pack_checklist_answers(conn):
+    """Replace the 24 boolean checklist columns with the two bit masks.
+
+    Question n of CHECKLIST_BOOLEAN_COLUMNS gets bit n, as in checklist.py.
+    """
+    add_column(conn, "daily_logs", "checklist_answered", "INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, "daily_logs", "checklist_yes", "INTEGER NOT NULL DEFAULT 0")
+    columns = [(name, 1 << bit) for bit, name in enumerate(CHECKLIST_BOOLEAN_COLUMNS)
+               if has_column(conn, "daily_logs", name)]
+    if not columns:
+        return
+    answered = " + ".join(f"(CASE WHEN {name} IS NOT NULL THEN {mask} ELSE 0 END)" for name, mask in columns)
+    yes = " + ".join(f"(CASE WHEN {name} THEN {mask} ELSE 0 END)" for name, mask in columns)
+    conn.execute(text(f"UPDATE daily_logs SET checklist_answered = {answered}, checklist_yes = {yes}"))
+    if is_postgres(conn):
+        conn.execute(text("ALTER TABLE daily_logs " + ", ".join(f"DROP COLUMN {name}" for name, _ in columns)))
+    else:
+        for name, _ in columns:
+            conn.execute(text(f"ALTER TABLE daily_logs DROP COLUMN {name}"))
+
+def backfill_rollups(conn):
+    """Rebuild candidate_monthly_rollups from daily_logs in one INSERT ... SELECT.
+
+    Same totals as rollups.rebuild_rollups, computed by the database from
+    the version 12 masks so the migration doesn't depend on today's models.
+    """
+    if is_postgres(conn):
+        month = "CAST(date_trunc('month', log_date) AS DATE)"
+        seconds = "EXTRACT(EPOCH FROM (time_out - time_in))"
+    else:
+        month = "date(log_date, 'start of month')"
+        seconds = "(strftime('%s', time_out) - strftime('%s', time_in))"
+    counters = {
+        "days_logged": "COUNT(*)",
+        "time_in_count": "COUNT(time_in)",
+        "time_out_count": "COUNT(time_out)",
+        "minutes_on_site": f"COALESCE(SUM(CASE WHEN time_out > time_in THEN CAST(FLOOR({seconds} / 60) AS INTEGER) ELSE 0 END), 0)",
+    }
+    for bit, name in enumerate(CHECKLIST_BOOLEAN_COLUMNS):
+        counters[f"{name}_answered"] = f"SUM((checklist_answered >> {bit}) & 1)"
+        counters[f"{name}_yes"] = f"SUM((checklist_yes >> {bit}) & 1)"
+    counters["answered"] = " + ".join(counters[f"{name}_answered"] for name in CHECKLIST_BOOLEAN_COLUMNS)
+    counters["yes"] = " + ".join(counters[f"{name}_yes"] for name in CHECKLIST_BOOLEAN_COLUMNS)
+
+    conn.execute(text("DELETE FROM candidate_monthly_rollups"))
+    conn.execute(text(
+        f"INSERT INTO candidate_monthly_rollups (candidate_id, month, {', '.join(counters)})"
+        f" SELECT candidate_id, {month}, {', '.join(counters.values())}"
+        f" FROM daily_logs WHERE candidate_id IS NOT NULL GROUP BY candidate_id, {month}"
+    ))
+
+def unique_section_assignments(conn):
+    drop_duplicates(conn, "candidate_sections", "section_id", "section_assignment")
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_candidate_sections_section_candidate"
+        " ON candidate_sections (section_id, candidate_id)"
+    ))
+    # Covered by the unique index
+    conn.execute(text("DROP INDEX IF EXISTS idx_candidate_sections_section_id"))
+
+def add_tombstone_retention(conn):
+    add_column(conn, "change_tombstones", "created_at", "TIMESTAMP")
+    # Existing tombstones start their retention period now
+    conn.execute(text("UPDATE change_tombstones SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_change_tombstones_created_at ON change_tombstones (created_at)"
+    ))
+    add_column(conn, "projects", "tombstone_horizon", "INTEGER NOT NULL DEFAULT 0")
+
+def add_access_versions(conn):
+    add_column(conn, "organizations", "access_version", "INTEGER NOT NULL DEFAULT 0")
+
+# (version, name, function(conn)); append only, never renumber or edit an applied migration
+MIGRATIONS = [
+    (1, "create tables", create_tables),
+    (2, "organizations", add_organizations),
+    (3, "user role and profile", add_user_profile),
+    (4, "project delete pin and high risk", add_project_settings),
+    (5, "candidate display order", add_candidate_order),
+    (6, "daily log checklist fields", add_daily_log_fields),
+    (7, "section indexes", add_section_indexes),
+    (8, "token and change versions", add_versioning),
+    (9, "unique daily log per candidate and date", unique_daily_logs),
+    (10, "unique monthly KPI per candidate and month", unique_monthly_kpis),
+    (11, "hot path indexes", add_hot_path_indexes),
+    (12, "daily log checklist bit masks", pack_checklist_answers),
+    (13, "backfill monthly rollups", backfill_rollups),
+    (14, "unique section membership per candidate", unique_section_assignments),
+    (15, "tombstone retention", add_tombstone_retention),
+    (16, "organization access versions", add_access_versions),
+]
+
+HEAD = MIGRATIONS[-1][0]
+
+# ==================== RUNNER ====================
+
+def current_version(conn) -> int:
+    """Latest applied version; 0 for a database without schema_version"""
+    try:
+        return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    except DBAPIError:
+        conn.rollback()
+        return 0
+
+def record_version(conn, number: int, name: str):
+    conn.execute(schema_version.insert().values(
+        version=number, name=name, applied_at=datetime.datetime.utcnow()
+    ))
+
+def migrate(engine, verbose: bool = False) -> int:
+    """Bring the schema to HEAD; returns the number of migrations applied"""
+    with engine.connect() as conn:
+        if current_version(conn) >= HEAD:
+            return 0
+
+    applied = 0
+    while True:
+        online_step = None
+        with engine.begin() as conn:
+            if is_postgres(conn):
+                # Held until commit; a worker that waited here re-reads the version below
+                conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            schema_version.create(conn, checkfirst=True)
+            version = current_version(conn)
+
+            for number, name, step in MIGRATIONS:
+                if number <= version:
+                    continue
+                if getattr(step, "online", False) and is_postgres(conn):
+                    # Commit what ran so far, then run this one on its own
+                    online_step = (number, name, step)
+                    break
+                if verbose:
+                    print(f"Applying {number}: {name}...")
+                step(conn)
+                record_version(conn, number, name)
+                applied += 1
+
+        if online_step is None:
+            return applied
+        applied += _run_online(engine, *online_step, verbose=verbose)
+
+def _run_online(engine, number: int, name: str, step, verbose: bool = False) -> int:
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # Session-level lock: there is no transaction to hold it
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        try:
+            if current_version(conn) >= number:
+                return 0  # Another worker got here first
+            if verbose:
+                print(f"Applying {number}: {name} (online)...")
+            step(conn)
+            record_version(conn, number, name)
+            return 1
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--status", action="store_true", help="only print the current and head versions")
+    args = parser.parse_args()
+
+    from database import engine
+    if args.status:
+        with engine.connect() as conn:
+            print(f"Schema version {current_version(conn)}, head {HEAD}")
+    else:
+        applied = migrate(engine, verbose=True)
+        print(f"Applied {applied} migration(s); schema is at version {HEAD}.")
+
+        from prune_tombstones import run as prune_tombstones
+        prune_tombstones()
@@ -1,12 +1,16 @@
-from sqlalchemy import Column, Integer, String, Boolean, JSON, Date, Time, ForeignKey
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Boolean, JSON, Date, DateTime, Time, ForeignKey, Index, UniqueConstraint, case, null
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from database import Base
+from checklist import CHECKLIST_FIELDS
 
 class Organization(Base):
     __tablename__ = "organizations"
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, nullable=False)
+    access_version = Column(Integer, default=0, server_default="0", nullable=False)  # Bumped when project visibility changes (see access.py)
     # subscription_plan = Column(String, default="free") 
     
     # Relationships
@@ -16,6 +20,10 @@ class Organization(Base):
 # Many-to-Many relationship for Project Isolation (Approach A)
 class ProjectUser(Base):
     __tablename__ = "project_users"
+    __table_args__ = (
+        Index("ix_project_users_user_project", "user_id", "project_id"),  # Access checks
+        Index("ix_project_users_project_id", "project_id"),               # Project lead lists
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
@@ -32,6 +40,7 @@ class User(Base):
     password_hash = Column(String, nullable=False)
     is_admin = Column(Boolean, default=False) # System level admin (legacy)
     role = Column(String, default="viewer") # SaaS Roles: admin, lead, viewer
+    token_version = Column(Integer, default=0, server_default="0", nullable=False) # Copied into tokens as "tv"
     
     # Relationship
     organization = relationship("Organization", back_populates="users")
@@ -39,6 +48,7 @@ class User(Base):
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (Index("ix_projects_organization_id", "organization_id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=True) # Multitenancy link
@@ -58,18 +68,23 @@ class Project(Base):
     new_inductions = Column(Integer, default=0)
     high_risk = Column(JSON, default=[])
     delete_pin = Column(String, nullable=True)  # PIN required to delete project
+    data_version = Column(Integer, default=0, server_default="0", nullable=False)  # Bumped on every change to the project's data (see versioning.py)
+    tombstone_horizon = Column(Integer, default=0, server_default="0", nullable=False)  # Newest version of a pruned tombstone
 
 class Section(Base):
     __tablename__ = "sections"
+    __table_args__ = (Index("ix_sections_project_order", "project_id", "display_order"),)
     
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
     display_order = Column(Integer, default=0)
+    change_version = Column(Integer, default=0, server_default="0", nullable=False)  # Project data_version of the last write
 
 class Candidate(Base):
     __tablename__ = "candidates"
+    __table_args__ = (Index("ix_candidates_project_order", "project_id", "display_order"),)
     
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
@@ -77,16 +92,25 @@ class Candidate(Base):
     photo = Column(String)
     role = Column(String)
     display_order = Column(Integer, default=0)
+    change_version = Column(Integer, default=0, server_default="0", nullable=False)
 
 class CandidateSection(Base):
     __tablename__ = "candidate_sections"
+    __table_args__ = (
+        Index("idx_candidate_sections_candidate_id", "candidate_id"),
+        # One membership per section and candidate; also serves lookups by section
+        Index("uq_candidate_sections_section_candidate", "section_id", "candidate_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"))
     section_id = Column(Integer, ForeignKey("sections.id", ondelete="CASCADE"))
+    change_version = Column(Integer, default=0, server_default="0", nullable=False)
 
 class DailyLog(Base):
     __tablename__ = "daily_logs"
+    # One log per candidate and day; the target of the upserts' ON CONFLICT
+    __table_args__ = (Index("uq_daily_logs_candidate_date", "candidate_id", "log_date", unique=True),)
     
     id = Column(Integer, primary_key=True, index=True)
     candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"))
@@ -94,42 +118,71 @@ class DailyLog(Base):
     time_in = Column(Time)
     time_out = Column(Time)
     
-    # Original fields (now nullable for Yes/No/Empty)
-    task_briefing = Column(Boolean, nullable=True)
-    tbt_conducted = Column(Boolean, nullable=True)
-    violation_briefing = Column(Boolean, nullable=True)
-    checklist_submitted = Column(Boolean, nullable=True)
-    
-    # New fields
-    inductions_covered = Column(Boolean, nullable=True)           # New inductions covered this week?
-    barcode_implemented = Column(Boolean, nullable=True)          # Bar code implemented 100%?
-    attendance_verified = Column(Boolean, nullable=True)          # Time IN/OUT verified?
-    safety_observations_recorded = Column(Boolean, nullable=True) # At least 2 safety observations today?
-    sor_ncr_closed = Column(Boolean, nullable=True)               # Closed 90% SOR/NCRs this week?
-    mock_drill_participated = Column(Boolean, nullable=True)      # Participated in mock drill this month?
-    campaign_participated = Column(Boolean, nullable=True)        # Participated in campaign this month?
-    monthly_inspections_completed = Column(Boolean, nullable=True)# Monthly inspections 100% completed?
-    near_miss_reported = Column(Boolean, nullable=True)           # Near miss reported this month?
-    weekly_training_briefed = Column(Boolean, nullable=True)      # Weekly training briefed to workers?
-    
-    # Additional 10 new fields
-    daily_reports_followup = Column(Boolean, nullable=True)       # Daily reports follow-up & coordination done?
-    msra_communicated = Column(Boolean, nullable=True)            # MSRA communicated to all key personnel?
-    consultant_responses = Column(Boolean, nullable=True)         # Immediate responses provided to consultant?
-    weekly_tbt_full_participation = Column(Boolean, nullable=True)# Weekly mass TBT with full participation?
-    welfare_facilities_monitored = Column(Boolean, nullable=True) # Workforce welfare facilities monitored?
-    monday_ncr_shared = Column(Boolean, nullable=True)            # Monday shared all pending NCRs/SORs?
-    safety_walks_conducted = Column(Boolean, nullable=True)       # Two site safety walks daily (7AM & 2PM)?
-    training_sessions_conducted = Column(Boolean, nullable=True)  # Minimum 2 HSE training sessions per month?
-    barcode_system_100 = Column(Boolean, nullable=True)           # Bar code system 100% for Plant/Equipment/PTW?
-    task_briefings_participating = Column(Boolean, nullable=True) # Engineers participating task briefings & verifying?
+    # Yes/No/empty checklist answers, one bit per question of checklist.py;
+    # each question is also an attribute, e.g. log.task_briefing (see below)
+    checklist_answered = Column(Integer, default=0, server_default="0", nullable=False)
+    checklist_yes = Column(Integer, default=0, server_default="0", nullable=False)
     
     # Comment and description
     comment = Column(String(255), nullable=True)
     description = Column(String, nullable=True)
+    
+    change_version = Column(Integer, default=0, server_default="0", nullable=False)
+
+def _checklist_answer(mask: int) -> hybrid_property:
+    """True/False/None attribute backed by one bit of the answer masks"""
+    def answer(self):
+        if not (self.checklist_answered or 0) & mask:
+            return None
+        return bool(self.checklist_yes & mask)
+
+    def set_answer(self, value):
+        answered, yes = self.checklist_answered or 0, self.checklist_yes or 0
+        self.checklist_answered = answered | mask if value is not None else answered & ~mask
+        self.checklist_yes = yes | mask if value else yes & ~mask
+
+    def expression(cls):
+        return case(
+            (cls.checklist_answered.bitwise_and(mask) == 0, null()),
+            else_=cls.checklist_yes.bitwise_and(mask) != 0
+        )
+
+    return hybrid_property(answer, set_answer, expr=expression)
+
+# log.task_briefing etc. read and write their bit, in Python and in queries
+for _field in CHECKLIST_FIELDS:
+    setattr(DailyLog, _field.column, _checklist_answer(_field.mask))
+
+# A daily log's fields as the API and exports show them, answers in place of the masks
+DAILY_LOG_FIELDS = (
+    ["id", "candidate_id", "log_date", "time_in", "time_out"]
+    + [field.column for field in CHECKLIST_FIELDS]
+    + ["comment", "description", "change_version"]
+)
+
+class CandidateMonthlyRollup(Base):
+    """Per candidate and month totals of daily_logs, kept up to date by rollups.py"""
+    __tablename__ = "candidate_monthly_rollups"
+    __table_args__ = (UniqueConstraint("candidate_id", "month"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"), nullable=False)
+    month = Column(Date, nullable=False)  # First day of the month
+    days_logged = Column(Integer, default=0, server_default="0", nullable=False)
+    answered = Column(Integer, default=0, server_default="0", nullable=False)
+    yes = Column(Integer, default=0, server_default="0", nullable=False)
+    time_in_count = Column(Integer, default=0, server_default="0", nullable=False)
+    time_out_count = Column(Integer, default=0, server_default="0", nullable=False)
+    minutes_on_site = Column(Integer, default=0, server_default="0", nullable=False)
+
+# Answered/yes counts per checklist question, e.g. task_briefing_answered / task_briefing_yes
+for _field in CHECKLIST_FIELDS:
+    setattr(CandidateMonthlyRollup, f"{_field.column}_answered", Column(Integer, default=0, server_default="0", nullable=False))
+    setattr(CandidateMonthlyRollup, f"{_field.column}_yes", Column(Integer, default=0, server_default="0", nullable=False))
 
 class MonthlyKPI(Base):
     __tablename__ = "monthly_kpis"
+    __table_args__ = (Index("uq_monthly_kpis_candidate_month", "candidate_id", "month", unique=True),)
     
     id = Column(Integer, primary_key=True, index=True)
     candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"))
@@ -141,6 +194,33 @@ class MonthlyKPI(Base):
     ncrs_closed = Column(Integer, default=0)
     weekly_reports_open = Column(Integer, default=0)
     weekly_reports_closed = Column(Integer, default=0)
+    change_version = Column(Integer, default=0, server_default="0", nullable=False)
+
+class ChangeTombstone(Base):
+    """Records a deleted row so GET /api/projects/{id}/changes can report it"""
+    __tablename__ = "change_tombstones"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    entity = Column(String, nullable=False)  # candidate, daily_log, monthly_kpi, section, section_assignment
+    entity_id = Column(Integer, nullable=False)
+    details = Column(JSON, nullable=True)  # Natural keys, e.g. candidate_id + log_date
+    change_version = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # Pruned after TOMBSTONE_RETENTION_DAYS
+
+class TokenRevocation(Base):
+    """Token versions of users whose tokens went out of date.
+
+    Only users whose role, password or existence changed have a row, so the
+    whole table is small enough to keep in memory (see auth.token_versions).
+    Tokens with tv < token_version carry stale claims; tokens with
+    tv < revoked_below are rejected. No foreign key: rows outlive deleted users.
+    """
+    __tablename__ = "token_revocations"
+    
+    user_id = Column(Integer, primary_key=True)
+    token_version = Column(Integer, nullable=False)
+    revoked_below = Column(Integer, nullable=False, default=0)
 
 class MonthlyActivity(Base):
     __tablename__ = "monthly_activities"
@@ -0,0 +1,104 @@
+"""Sparse display_order keys for candidates and sections.
+
+Orders are spaced ORDER_GAP apart, so an item can be moved between two
+neighbours by giving it a key in the gap: reordering a list after a
+drag-and-drop changes only the rows that actually moved. When a gap is used
+up the whole list is renumbered. Changes are written with one set-based
+UPDATE ... SET display_order = CASE id ... END restricted to the project.
+"""
+from bisect import bisect_left
+from typing import Dict, List, Optional
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session
+from versioning import bump_project_version, lock_project
+
+ORDER_GAP = 1024
+
+def next_display_order(db: Session, model, project_id: int) -> int:
+    """Key for an item appended to the end of a project's list"""
+    last = db.query(func.max(model.display_order)).filter(model.project_id == project_id).scalar()
+    return (last or 0) + ORDER_GAP
+
+def _kept_positions(keys: List[int]) -> set:
+    """Positions of a longest strictly increasing subsequence of `keys`"""
+    tails, tail_positions, previous = [], [], [None] * len(keys)
+    for position, key in enumerate(keys):
+        i = bisect_left(tails, key)
+        if i == len(tails):
+            tails.append(key)
+            tail_positions.append(position)
+        else:
+            tails[i] = key
+            tail_positions[i] = position
+        previous[position] = tail_positions[i - 1] if i else None
+
+    kept = set()
+    position = tail_positions[-1] if tail_positions else None
+    while position is not None:
+        kept.add(position)
+        position = previous[position]
+    return kept
+
+def sparse_orders(ids: List[int], current: Dict[int, Optional[int]]) -> Dict[int, int]:
+    """New keys for the ids that must change so that `ids` ends up in ascending order.
+
+    `current` maps each id to its present key. The longest run of ids that
+    are already in order keeps its keys; the others get keys spaced out in
+    the gaps around them, or everything is renumbered if a gap is too small.
+    """
+    keys = [current[i] if current[i] is not None else 0 for i in ids]
+    kept = _kept_positions(keys)
+
+    orders = {}
+    position = 0
+    while position < len(ids):
+        if position in kept:
+            position += 1
+            continue
+        end = position
+        while end < len(ids) and end not in kept:
+            end += 1
+        low = keys[position - 1] if position else None
+        high = keys[end] if end < len(ids) else None
+        count = end - position
+        if low is None and high is None:
+            start, step = ORDER_GAP, ORDER_GAP
+        elif low is None:
+            start, step = high - count * ORDER_GAP, ORDER_GAP
+        elif high is None:
+            start, step = low + ORDER_GAP, ORDER_GAP
+        else:
+            step = (high - low) // (count + 1)
+            if step < 1:
+                # No room left between the neighbours: renumber everything
+                orders = {i: (n + 1) * ORDER_GAP for n, i in enumerate(ids)}
+                return {i: key for i, key in orders.items() if key != current[i]}
+            start = low + step
+        for n in range(count):
+            orders[ids[position + n]] = start + n * step
+        position = end
+    return orders
+
+def reorder_rows(db: Session, model, project_id: int, ids: List[int]) -> int:
+    """Put the project's `ids` (of `model`) in the given order; ids from other
+    projects are ignored. Returns the number of rows changed. The caller commits."""
+    # Lock first, so a concurrent reorder can't change the keys read below
+    lock_project(db, project_id)
+    current = dict(db.query(model.id, model.display_order).filter(
+        model.project_id == project_id,
+        model.id.in_(ids)
+    ).all())
+    # Keep the first occurrence of each id
+    ids = list(dict.fromkeys(i for i in ids if i in current))
+    orders = sparse_orders(ids, current)
+    if not orders:
+        return 0
+
+    version = bump_project_version(db, project_id)
+    db.execute(
+        update(model)
+        .where(model.project_id == project_id, model.id.in_(orders))
+        .values(display_order=case(orders, value=model.id), change_version=version)
+        .execution_options(synchronize_session=False)
+    )
+    return len(orders)
@@ -0,0 +1,129 @@
+"""Bounded worker pool for bcrypt.
+
+bcrypt is deliberately slow (~0.25s per call). Run inline in sync route
+handlers it holds one of AnyIO's threadpool slots for the whole time, so a
+burst of logins at shift start can starve every other sync endpoint. Here
+it runs on its own small pool instead, with a cap on queued work: when the
+cap is reached new requests fail fast with PasswordHashingBusy (a 503)
+rather than piling up.
+
+Configured with PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE and
+PASSWORD_HASH_EXECUTOR ("thread", the default, or "process"). bcrypt
+releases the GIL, so threads already use several cores.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException
+from auth import get_password_hash, verify_password
+from metrics import Histogram
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class PasswordHashingBusy(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            detail="Too many sign-ins in progress, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+class PasswordHasher:
+    def __init__(self, workers: int, max_queue: int, kind: str = "thread"):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0  # Queued + running
+        self.completed = self.rejected = self.failed = 0
+        self.wait = Histogram(LATENCY_BUCKETS)  # Time spent queued
+        self.run = Histogram(LATENCY_BUCKETS)   # Time spent hashing
+
+    def _get_executor(self):
+        # Created lazily so importing the app (and forking workers) doesn't start processes
+        if self._executor is None:
+            executor_class = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+            self._executor = executor_class(max_workers=self.workers)
+        return self._executor
+
+    def submit(self, fn, *args) -> Future:
+        """Queue fn(*args) on the pool; raises PasswordHashingBusy when the queue is full"""
+        with self._lock:
+            if self.pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PasswordHashingBusy()
+            self.pending += 1
+            executor = self._get_executor()
+        future = executor.submit(_timed, fn, time.perf_counter(), *args)
+        return _unwrap(future, self._record)
+
+    def _record(self, waited: float, ran: float, ok: bool):
+        with self._lock:
+            self.pending -= 1
+            if ok:
+                self.completed += 1
+                self.wait.observe(waited)
+                self.run.observe(ran)
+            else:
+                self.failed += 1
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.wrap_future(self.submit(get_password_hash, password))
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await asyncio.wrap_future(self.submit(verify_password, password, hashed))
+
+    def hash_sync(self, password: str) -> str:
+        """For sync routes: still bounded by the pool, though the caller's thread waits"""
+        return self.submit(get_password_hash, password).result()
+
+    def verify_sync(self, password: str, hashed: str) -> bool:
+        return self.submit(verify_password, password, hashed).result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "executor": self.kind,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": min(self.pending, self.workers),
+                "queue_depth": max(self.pending - self.workers, 0),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "wait": self.wait.snapshot(),
+                "run": self.run.snapshot()
+            }
+
+def _timed(fn, submitted_at: float, *args):
+    """Runs on the pool (module level so process pools can pickle it)"""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, started - submitted_at, time.perf_counter() - started
+
+def _unwrap(future: Future, record) -> Future:
+    """A future for fn's result alone, recording the timings when it settles"""
+    outer = Future()
+
+    def done(f: Future):
+        error = f.exception()
+        if error is not None:
+            record(0.0, 0.0, False)
+            outer.set_exception(error)
+            return
+        result, waited, ran = f.result()
+        record(waited, ran, True)
+        outer.set_result(result)
+
+    future.add_done_callback(done)
+    return outer
+
+password_hasher = PasswordHasher(
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", "2")),
+    max_queue=int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32")),
+    kind=os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+)
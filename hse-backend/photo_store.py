@@ -0,0 +1,187 @@
+"""Content-addressed photo storage.
+
+Photos are stored once per distinct content under PHOTO_STORE_DIR, keyed by
+the SHA-256 of their bytes, and rows keep a short URL (/api/photos/<hash>)
+instead of an inline base64 data URL. Because the URL changes whenever the
+content does, a cached copy never goes stale.
+
+PHOTO_STORE_DIR must be persistent storage shared by all workers (a Railway
+volume, or a mounted disk); check_photo_store() refuses to start otherwise.
+Set PHOTO_STORE_EPHEMERAL=1 to use the default directory next to the code,
+for local development only.
+"""
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import tempfile
+from typing import Optional, Tuple
+from fastapi import HTTPException
+
+try:
+    from PIL import Image
+except ImportError:  # Thumbnails fall back to the original photo
+    Image = None
+
+# The store must outlive deploys: container filesystems (Railway included) are
+# wiped on every redeploy, so in a deployment it has to be on a volume. On
+# Railway the attached volume is used when PHOTO_STORE_DIR isn't set.
+RAILWAY_VOLUME = os.getenv("RAILWAY_VOLUME_MOUNT_PATH")
+PHOTO_STORE_DIR = os.getenv("PHOTO_STORE_DIR") or (
+    os.path.join(RAILWAY_VOLUME, "photos") if RAILWAY_VOLUME
+    else os.path.join(os.path.dirname(os.path.abspath(__file__)), "photo_store")
+)
+PHOTO_URL_PREFIX = "/api/photos/"
+MAX_PHOTO_BYTES = 5 * 1024 * 1024
+# A few MB of PNG can decode to gigabytes of pixels; refuse those at upload
+MAX_PHOTO_PIXELS = 50_000_000
+THUMBNAIL_SIZES = (48, 64, 96, 128, 150, 256)
+
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+_DATA_URL = re.compile(r"^data:image/[\w.+-]+;base64,", re.IGNORECASE)
+
+def photo_store_problem() -> Optional[str]:
+    """Why photos written to PHOTO_STORE_DIR may not survive a redeploy; None if configured"""
+    on_railway = any(os.getenv(name) for name in ("RAILWAY_ENVIRONMENT", "RAILWAY_PROJECT_ID"))
+    if on_railway:
+        if not RAILWAY_VOLUME:
+            return "no Railway volume is attached to the service"
+        volume = os.path.realpath(RAILWAY_VOLUME)
+        if os.path.commonpath([volume, os.path.realpath(PHOTO_STORE_DIR)]) != volume:
+            return f"PHOTO_STORE_DIR ({PHOTO_STORE_DIR}) is not on the Railway volume ({RAILWAY_VOLUME})"
+        return None
+    if not (os.getenv("PHOTO_STORE_DIR") or os.getenv("PHOTO_STORE_EPHEMERAL") == "1"):
+        return "PHOTO_STORE_DIR is not set"
+    return None
+
+def check_photo_store():
+    """Raise RuntimeError unless the photo store is on persistent storage"""
+    problem = photo_store_problem()
+    if problem:
+        raise RuntimeError(
+            f"Photo store is not persistent: {problem}. Mount a volume and point PHOTO_STORE_DIR at it "
+            "(on Railway, attaching a volume is enough), or set PHOTO_STORE_EPHEMERAL=1 for local development."
+        )
+
+def sniff_content_type(data: bytes) -> Optional[str]:
+    """Image type from the file signature, None if it isn't a supported image"""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return None
+
+def is_digest(value: str) -> bool:
+    return bool(_DIGEST.match(value))
+
+def photo_url(digest: str) -> str:
+    return f"{PHOTO_URL_PREFIX}{digest}"
+
+def _path(digest: str, size: Optional[int] = None) -> str:
+    parts = [PHOTO_STORE_DIR] + ([f"thumbs/{size}"] if size else []) + [digest[:2], digest]
+    return os.path.join(*parts)
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def save_photo(data: bytes) -> str:
+    """Store image bytes and return their hash. Raises ValueError for non-images or oversized files."""
+    if len(data) > MAX_PHOTO_BYTES:
+        raise ValueError(f"Photo is larger than {MAX_PHOTO_BYTES // (1024 * 1024)} MB")
+    if sniff_content_type(data) is None:
+        raise ValueError("Photo must be a JPEG, PNG, WebP or GIF image")
+    if Image is not None:
+        _check_dimensions(data)
+    digest = hashlib.sha256(data).hexdigest()
+    path = _path(digest)
+    if not os.path.exists(path):
+        _write_atomic(path, data)
+    return digest
+
+def _check_dimensions(data: bytes):
+    """Raise ValueError for images with more than MAX_PHOTO_PIXELS pixels (reads the header only)"""
+    too_large = ValueError(f"Photo is larger than {MAX_PHOTO_PIXELS // 1_000_000} megapixels")
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+    except Image.DecompressionBombError:
+        raise too_large
+    except OSError:  # Not decodable by Pillow: stored and served as is
+        return
+    if width * height > MAX_PHOTO_PIXELS:
+        raise too_large
+
+def load_photo(digest: str, size: Optional[int] = None) -> Optional[Tuple[bytes, str]]:
+    """(bytes, content type) of a stored photo, or of its `size` px thumbnail; None if unknown"""
+    if not is_digest(digest):
+        return None
+    try:
+        with open(_path(digest), "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if size and Image is not None:
+        data = _thumbnail(digest, data, size)
+    return data, sniff_content_type(data)
+
+def _thumbnail(digest: str, data: bytes, size: int) -> bytes:
+    """Thumbnail no larger than size x size, generated on first request and kept on disk"""
+    path = _path(digest, size)
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if max(image.size) <= size or image.size[0] * image.size[1] > MAX_PHOTO_PIXELS:
+                return data
+            fmt = image.format
+            image.thumbnail((size, size))
+            if fmt == "JPEG" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            out = io.BytesIO()
+            image.save(out, format=fmt if fmt in ("JPEG", "PNG", "WEBP", "GIF") else "PNG")
+    except (OSError, Image.DecompressionBombError):  # Not decodable, or stored before the size check
+        return data
+    thumb = out.getvalue()
+    _write_atomic(path, thumb)
+    return thumb
+
+def store_data_url(value: Optional[str]) -> Optional[str]:
+    """Replace an inline base64 data URL with a photo store URL.
+
+    Anything else (None, URLs, avatar links) is returned unchanged.
+    """
+    if not value:
+        return value
+    match = _DATA_URL.match(value)
+    if not match:
+        return value
+    try:
+        data = base64.b64decode(value[match.end():], validate=False)
+    except (binascii.Error, ValueError):
+        raise ValueError("Photo is not valid base64")
+    return photo_url(save_photo(data))
+
+def photo_field(value: Optional[str]) -> Optional[str]:
+    """store_data_url for request bodies: bad photos are a 400"""
+    try:
+        return store_data_url(value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
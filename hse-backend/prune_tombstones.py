@@ -0,0 +1,30 @@
+"""
+Prune old change tombstones
+HSE Performance Tracker
+
+Deletes tombstones older than TOMBSTONE_RETENTION_DAYS (default 30). Each
+deploy prunes once, from `python migrations.py`; schedule this too (e.g. as
+a daily Railway cron job) so long-running deployments don't keep them
+forever. Clients whose /changes cursor predates a pruned tombstone get a
+full resync.
+"""
+
+from database import SessionLocal
+from versioning import TOMBSTONE_RETENTION_DAYS, prune_tombstones
+
+def run():
+    db = SessionLocal()
+    try:
+        print(f"🔄 Pruning tombstones older than {TOMBSTONE_RETENTION_DAYS} days...")
+        count = prune_tombstones(db)
+        db.commit()
+        print(f"✅ Deleted {count} tombstones")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    run()
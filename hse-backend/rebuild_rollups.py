@@ -0,0 +1,30 @@
+"""
+Backfill candidate_monthly_rollups from existing daily_logs
+HSE Performance Tracker
+
+Migration 13 fills the rollups when the app is first deployed with them; run
+this any time they are suspected to have drifted (e.g. after editing
+daily_logs by hand).
+"""
+
+from database import SessionLocal, engine
+from models import CandidateMonthlyRollup
+from rollups import rebuild_rollups
+
+def run():
+    CandidateMonthlyRollup.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        print("🔄 Rebuilding monthly rollups from daily_logs...")
+        count = rebuild_rollups(db)
+        db.commit()
+        print(f"✅ Wrote {count} candidate-month rollups")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,142 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import insert_for
+from models import Candidate, CandidateMonthlyRollup, DailyLog
+from checklist import CHECKLIST_FIELDS
+from log_window import LogWindow
+from scoring import FieldCounts
+
+# (candidate_id, first day of month, {counter column: value})
+Contribution = Tuple[int, date, Dict[str, int]]
+
+COUNTER_COLUMNS = (
+    ["days_logged", "answered", "yes", "time_in_count", "time_out_count", "minutes_on_site"]
+    + [f"{field.column}_answered" for field in CHECKLIST_FIELDS]
+    + [f"{field.column}_yes" for field in CHECKLIST_FIELDS]
+)
+
+ROLLUP_UPSERT_CHUNK = 500
+
+def log_contribution(log: Optional[DailyLog]) -> Optional[Contribution]:
+    """What a single daily log adds to its candidate's monthly rollup"""
+    if log is None:
+        return None
+
+    answered, yes = log.checklist_answered or 0, log.checklist_yes or 0
+    counters = {"days_logged": 1, "answered": bin(answered).count("1"), "yes": bin(yes).count("1")}
+    for field in CHECKLIST_FIELDS:
+        counters[f"{field.column}_answered"] = (answered >> field.bit) & 1
+        counters[f"{field.column}_yes"] = (yes >> field.bit) & 1
+
+    counters["time_in_count"] = int(log.time_in is not None)
+    counters["time_out_count"] = int(log.time_out is not None)
+    minutes = 0
+    if log.time_in and log.time_out and log.time_out > log.time_in:
+        on_site = datetime.combine(log.log_date, log.time_out) - datetime.combine(log.log_date, log.time_in)
+        minutes = int(on_site.total_seconds() // 60)
+    counters["minutes_on_site"] = minutes
+
+    return log.candidate_id, log.log_date.replace(day=1), counters
+
+def apply_rollup_delta(db: Session, before: Optional[Contribution], after: Optional[Contribution]):
+    """Replace a log's old contribution (`before`) with its new one (`after`).
+
+    Pass before=None for a new log and after=None for a deleted one. The
+    caller commits.
+    """
+    apply_rollup_deltas(db, [(before, after)])
+
+def apply_rollup_deltas(db: Session, changes: Iterable[Tuple[Optional[Contribution], Optional[Contribution]]]):
+    """apply_rollup_delta for many logs at once, in a single statement.
+
+    Counters are changed with `col = col + delta` in an upsert, so concurrent
+    writers don't lose updates. The caller commits.
+    """
+    deltas = defaultdict(lambda: dict.fromkeys(COUNTER_COLUMNS, 0))
+    for before, after in changes:
+        for contribution, sign in ((before, -1), (after, 1)):
+            if contribution is None:
+                continue
+            candidate_id, month, counters = contribution
+            bucket = deltas[(candidate_id, month)]
+            for column, value in counters.items():
+                bucket[column] += sign * value
+
+    rows = [
+        dict(counters, candidate_id=candidate_id, month=month)
+        for (candidate_id, month), counters in deltas.items()
+        if any(counters.values())
+    ]
+    table = CandidateMonthlyRollup.__table__
+    insert = insert_for(db)
+    # Chunked to stay under the bind parameter limit (~60 per row)
+    for start in range(0, len(rows), ROLLUP_UPSERT_CHUNK):
+        statement = insert(table).values(rows[start:start + ROLLUP_UPSERT_CHUNK])
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["candidate_id", "month"],
+            set_={column: table.c[column] + statement.excluded[column] for column in COUNTER_COLUMNS}
+        ))
+
+def rebuild_rollups(db: Session, candidate_ids: Optional[Iterable[int]] = None) -> int:
+    """Recompute rollups from daily_logs, for all candidates or only `candidate_ids`.
+
+    Returns the number of candidate-months written. The caller commits.
+    """
+    rollups = db.query(CandidateMonthlyRollup)
+    logs = db.query(DailyLog)
+    if candidate_ids is not None:
+        candidate_ids = list(candidate_ids)
+        rollups = rollups.filter(CandidateMonthlyRollup.candidate_id.in_(candidate_ids))
+        logs = logs.filter(DailyLog.candidate_id.in_(candidate_ids))
+    rollups.delete(synchronize_session=False)
+
+    totals = defaultdict(lambda: dict.fromkeys(COUNTER_COLUMNS, 0))
+    for log in logs.yield_per(1000):
+        candidate_id, month, counters = log_contribution(log)
+        bucket = totals[(candidate_id, month)]
+        for column, value in counters.items():
+            bucket[column] += value
+
+    rows = [
+        dict(counters, candidate_id=candidate_id, month=month)
+        for (candidate_id, month), counters in totals.items()
+    ]
+    if rows:
+        db.execute(CandidateMonthlyRollup.__table__.insert(), rows)
+    return len(rows)
+
+def covers_whole_months(window: LogWindow) -> bool:
+    """True when the window starts on a 1st and ends on a month's last day"""
+    start, end = window
+    if start.day != 1 or end == date.max:
+        return False
+    return (end + timedelta(days=1)).day == 1
+
+def rollup_field_counts(db: Session, project_id: int, window: LogWindow) -> FieldCounts:
+    """Same result as scoring.daily_log_field_counts, read from the rollups.
+
+    Cost depends on candidates x months in the window, not on the number of
+    logs. Only valid for windows made of whole months.
+    """
+    aggregates = []
+    for field in CHECKLIST_FIELDS:
+        aggregates.append(func.sum(getattr(CandidateMonthlyRollup, f"{field.column}_answered")))
+        aggregates.append(func.sum(getattr(CandidateMonthlyRollup, f"{field.column}_yes")))
+
+    rows = db.query(CandidateMonthlyRollup.candidate_id, *aggregates).join(
+        Candidate, Candidate.id == CandidateMonthlyRollup.candidate_id
+    ).filter(
+        Candidate.project_id == project_id,
+        CandidateMonthlyRollup.month.between(*window)
+    ).group_by(CandidateMonthlyRollup.candidate_id).all()
+
+    counts = {}
+    for candidate_id, *values in rows:
+        counts[candidate_id] = {
+            field.key: (int(values[2 * i] or 0), int(values[2 * i + 1] or 0))
+            for i, field in enumerate(CHECKLIST_FIELDS)
+        }
+    return counts
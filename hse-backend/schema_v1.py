@@ -0,0 +1,158 @@
+"""Tables as migration 1 creates them.
+
+A frozen copy of models.py at the time the migration runner was added, so
+migration 1 builds the same schema whatever the models look like today.
+Never edit it: changes to the models go into a new migration in
+migrations.py, which brings both new and old databases up to date.
+"""
+from sqlalchemy import Boolean, Column, Date, ForeignKey, Integer, JSON, MetaData, String, Table, Time, UniqueConstraint
+
+# The Yes/No questions of the daily log when they were one column each
+CHECKLIST_BOOLEAN_COLUMNS = [
+    "task_briefing", "tbt_conducted", "violation_briefing", "checklist_submitted",
+    "inductions_covered", "barcode_implemented", "attendance_verified",
+    "safety_observations_recorded", "sor_ncr_closed", "mock_drill_participated",
+    "campaign_participated", "monthly_inspections_completed", "near_miss_reported",
+    "weekly_training_briefed", "daily_reports_followup", "msra_communicated",
+    "consultant_responses", "weekly_tbt_full_participation", "welfare_facilities_monitored",
+    "monday_ncr_shared", "safety_walks_conducted", "training_sessions_conducted",
+    "barcode_system_100", "task_briefings_participating"
+]
+
+def _id():
+    return Column("id", Integer, primary_key=True, index=True)
+
+def _version():
+    return Column("change_version", Integer, default=0, server_default="0", nullable=False)
+
+def _counter(name: str):
+    return Column(name, Integer, default=0, server_default="0", nullable=False)
+
+metadata = MetaData()
+
+Table(
+    "organizations", metadata, _id(),
+    Column("name", String, unique=True, nullable=False)
+)
+
+Table(
+    "project_users", metadata, _id(),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE")),
+    Column("project_id", Integer, ForeignKey("projects.id", ondelete="CASCADE"))
+)
+
+Table(
+    "users", metadata, _id(),
+    Column("organization_id", Integer, ForeignKey("organizations.id"), nullable=True),
+    Column("username", String, unique=True, nullable=False),
+    Column("email", String, unique=True, nullable=True),
+    Column("full_name", String, nullable=True),
+    Column("password_hash", String, nullable=False),
+    Column("is_admin", Boolean, default=False),
+    Column("role", String, default="viewer"),
+    Column("token_version", Integer, default=0, server_default="0", nullable=False)
+)
+
+Table(
+    "projects", metadata, _id(),
+    Column("organization_id", Integer, ForeignKey("organizations.id"), nullable=True),
+    Column("name", String, nullable=False),
+    Column("location", String),
+    Column("company", String),
+    Column("hse_lead_name", String),
+    Column("hse_lead_photo", String),
+    Column("manpower", Integer, default=0),
+    Column("man_hours", Integer, default=0),
+    Column("new_inductions", Integer, default=0),
+    Column("high_risk", JSON, default=[]),
+    Column("delete_pin", String, nullable=True),
+    Column("data_version", Integer, default=0, server_default="0", nullable=False)
+)
+
+Table(
+    "sections", metadata, _id(),
+    Column("project_id", Integer, ForeignKey("projects.id", ondelete="CASCADE")),
+    Column("name", String, nullable=False),
+    Column("description", String, nullable=True),
+    Column("display_order", Integer, default=0),
+    _version()
+)
+
+Table(
+    "candidates", metadata, _id(),
+    Column("project_id", Integer, ForeignKey("projects.id", ondelete="CASCADE")),
+    Column("name", String, nullable=False),
+    Column("photo", String),
+    Column("role", String),
+    Column("display_order", Integer, default=0),
+    _version()
+)
+
+Table(
+    "candidate_sections", metadata, _id(),
+    Column("candidate_id", Integer, ForeignKey("candidates.id", ondelete="CASCADE")),
+    Column("section_id", Integer, ForeignKey("sections.id", ondelete="CASCADE")),
+    _version()
+)
+
+Table(
+    "daily_logs", metadata, _id(),
+    Column("candidate_id", Integer, ForeignKey("candidates.id", ondelete="CASCADE")),
+    Column("log_date", Date, nullable=False),
+    Column("time_in", Time),
+    Column("time_out", Time),
+    *[Column(name, Boolean, nullable=True) for name in CHECKLIST_BOOLEAN_COLUMNS],
+    Column("comment", String(255), nullable=True),
+    Column("description", String, nullable=True),
+    _version()
+)
+
+Table(
+    "candidate_monthly_rollups", metadata, _id(),
+    Column("candidate_id", Integer, ForeignKey("candidates.id", ondelete="CASCADE"), nullable=False),
+    Column("month", Date, nullable=False),
+    *[_counter(name) for name in ["days_logged", "answered", "yes", "time_in_count", "time_out_count", "minutes_on_site"]],
+    *[_counter(f"{name}_answered") for name in CHECKLIST_BOOLEAN_COLUMNS],
+    *[_counter(f"{name}_yes") for name in CHECKLIST_BOOLEAN_COLUMNS],
+    UniqueConstraint("candidate_id", "month")
+)
+
+Table(
+    "monthly_kpis", metadata, _id(),
+    Column("candidate_id", Integer, ForeignKey("candidates.id", ondelete="CASCADE")),
+    Column("month", Date, nullable=False),
+    *[Column(name, Integer, default=0) for name in [
+        "observations_open", "observations_closed", "violations", "ncrs_open", "ncrs_closed",
+        "weekly_reports_open", "weekly_reports_closed"
+    ]],
+    _version()
+)
+
+Table(
+    "change_tombstones", metadata, _id(),
+    Column("project_id", Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True),
+    Column("entity", String, nullable=False),
+    Column("entity_id", Integer, nullable=False),
+    Column("details", JSON, nullable=True),
+    Column("change_version", Integer, nullable=False)
+)
+
+Table(
+    "token_revocations", metadata,
+    Column("user_id", Integer, primary_key=True),
+    Column("token_version", Integer, nullable=False),
+    Column("revoked_below", Integer, nullable=False, default=0)
+)
+
+Table(
+    "monthly_activities", metadata, _id(),
+    Column("project_id", Integer, ForeignKey("projects.id", ondelete="CASCADE")),
+    Column("month", Date, nullable=False),
+    Column("mock_drill", Boolean, default=False),
+    Column("campaign_type", String),
+    Column("campaign_completed", Boolean, default=False),
+    Column("inspection_power_tools", Boolean, default=False),
+    Column("inspection_plant_equipment", Boolean, default=False),
+    Column("inspection_tools_accessories", Boolean, default=False),
+    Column("near_miss_recorded", Boolean, default=False)
+)
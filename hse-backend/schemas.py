@@ -80,6 +80,25 @@ class ProjectResponse(ProjectBase):
     class Config:
         from_attributes = True
 
+class LeadSummary(BaseModel):
+    id: int
+    username: str
+    full_name: Optional[str] = None
+    role: str
+    
+    class Config:
+        from_attributes = True
+
+class ProjectSummary(BaseModel):
+    """Project picker row: no photo, high-risk list or PIN"""
+    id: int
+    name: str
+    location: Optional[str] = None
+    company: Optional[str] = None
+    hse_lead_name: Optional[str] = None
+    candidate_count: int = 0
+    assigned_leads: List[LeadSummary] = []
+
 # Candidate Schemas
 class CandidateBase(BaseModel):
     name: str
@@ -156,6 +175,14 @@ class DailyLogResponse(DailyLogBase):
     class Config:
         from_attributes = True
 
+class DailyLogBulkResult(BaseModel):
+    """Outcome of one row of POST /api/daily-logs/bulk, in request order"""
+    index: int
+    candidate_id: int
+    log_date: date
+    status: str  # "created", "updated" or "forbidden"
+    log: Optional[DailyLogResponse] = None
+
 # Monthly KPI Schemas
 class MonthlyKPIBase(BaseModel):
     month: date
@@ -170,6 +197,31 @@ class MonthlyKPIBase(BaseModel):
 class MonthlyKPICreate(MonthlyKPIBase):
     candidate_id: int
 
+class MonthlyKPIImportRow(BaseModel):
+    """One row of a project KPI import; the candidate is given by id or by name"""
+    candidate_id: Optional[int] = None
+    candidate: Optional[str] = None
+    observations_open: int = 0
+    observations_closed: int = 0
+    violations: int = 0
+    ncrs_open: int = 0
+    ncrs_closed: int = 0
+    weekly_reports_open: int = 0
+    weekly_reports_closed: int = 0
+
+class MonthlyKPIImportResult(BaseModel):
+    row: int  # 1-based, not counting a CSV header
+    candidate_id: Optional[int] = None
+    status: str  # "created", "updated" or "error"
+    error: Optional[str] = None
+
+class MonthlyKPIImportReport(BaseModel):
+    month: date
+    created: int
+    updated: int
+    failed: int
+    rows: List[MonthlyKPIImportResult]
+
 class MonthlyKPIResponse(MonthlyKPIBase):
     id: int
     candidate_id: int
@@ -0,0 +1,109 @@
+"""Server-side compliance scoring.
+
+Mirrors utils/performance.js#getOverallPerformance. A checklist answer
+counts as "answered" when it is Yes or No, and as "yes" when it is Yes,
+i.e. when its bit is set in the log's answered / yes mask. A score is the
+rounded percentage of yes over answered.
+"""
+import math
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import Candidate, CandidateSection, DailyLog, Section
+from checklist import CHECKLIST_FIELDS
+from log_window import LogWindow
+
+# {candidate_id: {field key: (answered, yes)}}
+FieldCounts = Dict[int, Dict[str, Tuple[int, int]]]
+
+def percentage(yes: int, answered: int) -> int:
+    """Rounded like Math.round in the frontend, 0 when nothing was answered"""
+    return math.floor(yes * 100 / answered + 0.5) if answered else 0
+
+def daily_log_field_counts(db: Session, project_id: int, window: LogWindow) -> FieldCounts:
+    """Answered/yes counts per candidate and checklist field in one grouped aggregate"""
+    aggregates = []
+    for field in CHECKLIST_FIELDS:
+        # Sums of the question's bit in the answer masks
+        for mask in (DailyLog.checklist_answered, DailyLog.checklist_yes):
+            aggregates.append(func.coalesce(func.sum(mask.bitwise_rshift(field.bit).bitwise_and(1)), 0))
+
+    rows = db.query(DailyLog.candidate_id, *aggregates).join(
+        Candidate, Candidate.id == DailyLog.candidate_id
+    ).filter(
+        Candidate.project_id == project_id,
+        DailyLog.log_date.between(*window)
+    ).group_by(DailyLog.candidate_id).all()
+
+    counts = {}
+    for candidate_id, *values in rows:
+        counts[candidate_id] = {
+            field.key: (int(values[2 * i]), int(values[2 * i + 1]))
+            for i, field in enumerate(CHECKLIST_FIELDS)
+        }
+    return counts
+
+def summarize(answered: int, yes: int) -> dict:
+    return {"answered": answered, "yes": yes, "score": percentage(yes, answered)}
+
+def summarize_group(candidate_scores: List[dict]) -> dict:
+    """Pooled counts plus the mean candidate score the dashboard gauges show"""
+    answered = sum(c["answered"] for c in candidate_scores)
+    yes = sum(c["yes"] for c in candidate_scores)
+    summary = summarize(answered, yes)
+    summary["candidateCount"] = len(candidate_scores)
+    summary["averageScore"] = (
+        math.floor(sum(c["score"] for c in candidate_scores) / len(candidate_scores) + 0.5)
+        if candidate_scores else 0
+    )
+    return summary
+
+def project_scores(db: Session, project_id: int, window: LogWindow, counts: FieldCounts = None) -> dict:
+    """Scores per candidate, section and for the whole project.
+
+    `counts` defaults to aggregating daily_logs over `window`.
+    """
+    if counts is None:
+        counts = daily_log_field_counts(db, project_id, window)
+
+    candidate_ids = [
+        cid for (cid,) in db.query(Candidate.id).filter(
+            Candidate.project_id == project_id
+        ).order_by(Candidate.display_order).all()
+    ]
+
+    candidate_scores = {}
+    for cid in candidate_ids:
+        fields = counts.get(cid, {})
+        answered = sum(a for a, _ in fields.values())
+        yes = sum(y for _, y in fields.values())
+        score = summarize(answered, yes)
+        score["id"] = cid
+        score["fields"] = {
+            field.key: summarize(*fields.get(field.key, (0, 0)))
+            for field in CHECKLIST_FIELDS
+        }
+        candidate_scores[cid] = score
+
+    members = defaultdict(list)
+    memberships = db.query(CandidateSection.section_id, CandidateSection.candidate_id).join(
+        Section, Section.id == CandidateSection.section_id
+    ).filter(Section.project_id == project_id).all()
+    for section_id, cid in memberships:
+        if cid in candidate_scores:
+            members[section_id].append(candidate_scores[cid])
+
+    section_ids = [
+        sid for (sid,) in db.query(Section.id).filter(
+            Section.project_id == project_id
+        ).order_by(Section.display_order).all()
+    ]
+
+    return {
+        "from": str(window[0]),
+        "to": str(window[1]),
+        "project": summarize_group(list(candidate_scores.values())),
+        "sections": [dict(summarize_group(members[sid]), id=sid) for sid in section_ids],
+        "candidates": list(candidate_scores.values())
+    }
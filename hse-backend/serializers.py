@@ -0,0 +1,107 @@
+"""Frontend (camelCase) payloads of daily logs and monthly KPIs.
+
+The mapping between columns and payload keys is declared once, in the
+checklist registry and KPI_FIELDS below. From it each serializer gets its
+(payload key, decoder) pairs, built once at import, and turns a Core row of
+`select(*serializer.columns)` into the payload: no ORM objects, no lookups
+by column name.
+
+parse_daily_log and parse_monthly_kpi go the other way, from a payload to
+column values.
+"""
+from operator import itemgetter
+from typing import Callable, Sequence, Tuple
+from models import DailyLog, MonthlyKPI
+from checklist import CHECKLIST_FIELDS, pack_answers
+
+# (column, key) of the monthly KPI counters, in payload order
+KPI_FIELDS = (
+    ("observations_open", "observationsOpen"),
+    ("observations_closed", "observationsClosed"),
+    ("violations", "violations"),
+    ("ncrs_open", "ncrsOpen"),
+    ("ncrs_closed", "ncrsClosed"),
+    ("weekly_reports_open", "weeklyReportsOpen"),
+    ("weekly_reports_closed", "weeklyReportsClosed"),
+)
+
+def make_serializer(columns: Sequence, fields: Sequence[Tuple[str, Callable]]):
+    """Function(row) -> dict for rows of select(*columns).
+
+    `fields` are (payload key, decoder) pairs, a decoder taking the row and
+    returning the value. The function gets a `columns` attribute to build
+    its SELECT from.
+    """
+    pairs = tuple(fields)
+
+    def serializer(row):
+        return {key: decode(row) for key, decode in pairs}
+
+    serializer.columns = tuple(columns)
+    return serializer
+
+def _positions(columns: Sequence) -> dict:
+    return {column.key: position for position, column in enumerate(columns)}
+
+def _optional_str(position: int) -> Callable:
+    def decode(row):
+        value = row[position]
+        return str(value) if value is not None else None
+    return decode
+
+def _answer(answered: int, yes: int, mask: int) -> Callable:
+    """True / False / None (unanswered) of one checklist question"""
+    def decode(row):
+        return (row[yes] & mask != 0) if row[answered] & mask else None
+    return decode
+
+_DAILY_LOG_COLUMNS = (
+    DailyLog.id, DailyLog.candidate_id, DailyLog.log_date, DailyLog.time_in, DailyLog.time_out,
+    DailyLog.checklist_answered, DailyLog.checklist_yes, DailyLog.comment, DailyLog.description
+)
+_KPI_COLUMNS = (MonthlyKPI.id, MonthlyKPI.candidate_id, MonthlyKPI.month) + tuple(
+    getattr(MonthlyKPI, column) for column, _ in KPI_FIELDS
+)
+
+_LOG = _positions(_DAILY_LOG_COLUMNS)
+_KPI = _positions(_KPI_COLUMNS)
+
+_DAILY_LOG_FIELDS = (
+    [("timeIn", _optional_str(_LOG["time_in"])), ("timeOut", _optional_str(_LOG["time_out"]))]
+    + [
+        (field.key, _answer(_LOG["checklist_answered"], _LOG["checklist_yes"], field.mask))
+        for field in CHECKLIST_FIELDS
+    ]
+    + [("comment", itemgetter(_LOG["comment"])), ("description", itemgetter(_LOG["description"]))]
+)
+_KPI_FIELDS = [(key, itemgetter(_KPI[column])) for column, key in KPI_FIELDS]
+
+# A log / KPI as nested under its candidate and date / month
+serialize_daily_log = make_serializer(_DAILY_LOG_COLUMNS, _DAILY_LOG_FIELDS)
+serialize_monthly_kpi = make_serializer(_KPI_COLUMNS, _KPI_FIELDS)
+
+# The same, standalone, as GET /api/projects/{id}/changes lists them
+serialize_daily_log_change = make_serializer(_DAILY_LOG_COLUMNS, _DAILY_LOG_FIELDS + [
+    ("id", itemgetter(_LOG["id"])), ("candidateId", itemgetter(_LOG["candidate_id"])),
+    ("date", _optional_str(_LOG["log_date"]))
+])
+serialize_monthly_kpi_change = make_serializer(_KPI_COLUMNS, _KPI_FIELDS + [
+    ("id", itemgetter(_KPI["id"])), ("candidateId", itemgetter(_KPI["candidate_id"])),
+    ("month", _optional_str(_KPI["month"]))
+])
+
+def parse_daily_log(payload: dict) -> dict:
+    """DailyLog column values of a serialized log; missing answers are empty"""
+    _, answered, yes = pack_answers({field.column: payload.get(field.key) for field in CHECKLIST_FIELDS})
+    return {
+        "time_in": payload.get("timeIn"),
+        "time_out": payload.get("timeOut"),
+        "checklist_answered": answered,
+        "checklist_yes": yes,
+        "comment": payload.get("comment"),
+        "description": payload.get("description")
+    }
+
+def parse_monthly_kpi(payload: dict) -> dict:
+    """MonthlyKPI column values of a serialized KPI; missing counters are 0"""
+    return {column: payload.get(key, 0) for column, key in KPI_FIELDS}
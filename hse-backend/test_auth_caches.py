@@ -0,0 +1,129 @@
+from sqlalchemy import event
+from models import Candidate, User
+from auth import create_access_token, create_user_token, get_password_hash, principal_cache
+from access import AccessIndex
+
+
+def test_principal_is_cached_until_the_user_changes(client, db, admin, make_project, query_counter):
+    project = make_project(0)
+    lead = User(username="lead", password_hash="x", role="lead", is_admin=False,
+                organization_id=admin["user"].organization_id)
+    db.add(lead)
+    db.commit()
+    lead_headers = {"Authorization": f"Bearer {create_access_token({'user_id': lead.id, 'username': 'lead'})}"}
+    url = f"/api/sections/project/{project.id}"
+
+    # A lead isn't assigned to the project yet
+    assert client.get(url, headers=lead_headers).status_code == 403
+    query_counter.clear()
+    assert client.get(url, headers=lead_headers).status_code == 403
+    assert not any("FROM users" in s and "WHERE users.id" in s for s in query_counter)
+    assert principal_cache.stats()["hits"] == 1
+
+    # Promoting the lead invalidates the cached role
+    resp = client.put(f"/api/auth/users/{lead.id}/role", json={"role": "admin"}, headers=admin["headers"])
+    assert resp.status_code == 200
+    assert client.get(url, headers=lead_headers).status_code == 200
+
+    stats = client.get("/api/ops/principal-cache", headers=admin["headers"]).json()
+    assert stats["invalidations"] == 1
+    assert stats["misses"] >= 2
+
+    # Deleted users are rejected at once, not after the TTL
+    client.delete(f"/api/auth/users/{lead.id}", headers=admin["headers"])
+    assert client.get(url, headers=lead_headers).status_code == 401
+
+
+def test_access_index_follows_assignment_changes(client, db, admin, make_project, query_counter):
+    project = make_project(1)
+    candidate = db.query(Candidate).filter(Candidate.project_id == project.id).one()
+    lead = User(username="lead", password_hash="x", role="lead", is_admin=False,
+                organization_id=admin["user"].organization_id)
+    db.add(lead)
+    db.commit()
+    lead_headers = {"Authorization": f"Bearer {create_access_token({'user_id': lead.id, 'username': 'lead'})}"}
+    logs_url = f"/api/daily-logs/candidate/{candidate.id}"
+
+    assert client.get(logs_url, headers=lead_headers).status_code == 403
+
+    client.put(f"/api/projects/user/{lead.id}/assignments", json=[project.id], headers=admin["headers"])
+    assert client.get(logs_url, headers=lead_headers).status_code == 200
+
+    # Warm: the access check needs no query at all
+    query_counter.clear()
+    assert client.get(logs_url, headers=lead_headers).status_code == 200
+    assert not any("project_users" in s or "FROM candidates" in s for s in query_counter)
+
+    client.put(f"/api/projects/user/{lead.id}/assignments", json=[], headers=admin["headers"])
+    assert client.get(logs_url, headers=lead_headers).status_code == 403
+
+
+
+def test_other_workers_see_access_changes_after_a_reload(client, db, admin, make_project):
+    project = make_project(0)
+    lead = User(username="lead", password_hash="x", role="lead", is_admin=False,
+                organization_id=admin["user"].organization_id)
+    db.add(lead)
+    db.commit()
+    client.put(f"/api/projects/user/{lead.id}/assignments", json=[project.id], headers=admin["headers"])
+
+    # Another worker's index, warm and well within its TTL
+    other = AccessIndex(max_users=8, max_candidates=8, ttl_seconds=3600, refresh_seconds=3600)
+    assert other.visible_project_ids(lead, db) == {project.id}
+
+    client.put(f"/api/projects/user/{lead.id}/assignments", json=[], headers=admin["headers"])
+    db.expire_all()
+    # Until its access versions are reloaded it still has the old set ...
+    assert other.visible_project_ids(lead, db) == {project.id}
+    # ... and the reload drops it
+    other.refresh_seconds = 0
+    assert other.visible_project_ids(lead, db) == frozenset()
+
+
+def test_tokens_carry_claims_and_go_stale_or_revoked(client, db, admin, make_project, query_counter):
+    project = make_project(0)
+    lead = User(username="lead", password_hash=get_password_hash("old-password"), role="lead",
+                is_admin=False, organization_id=admin["user"].organization_id)
+    db.add(lead)
+    db.commit()
+    lead_headers = {"Authorization": f"Bearer {create_user_token(lead)}"}
+    url = f"/api/sections/project/{project.id}"
+
+    assert client.get(url, headers=lead_headers).status_code == 403
+    # Claims are current: no users lookup, and the revocation table is already in memory
+    query_counter.clear()
+    assert client.get(url, headers=lead_headers).status_code == 403
+    assert not any("FROM users" in s or "token_revocations" in s for s in query_counter)
+
+    # A role change makes the token stale; it still works, with the role from the database
+    client.put(f"/api/auth/users/{lead.id}/role", json={"role": "admin"}, headers=admin["headers"])
+    assert client.get(url, headers=lead_headers).status_code == 200
+
+    # A password change revokes old tokens and hands out a new one
+    resp = client.post("/api/auth/change-password", headers=lead_headers,
+                       json={"current_password": "old-password", "new_password": "new-password"})
+    assert resp.status_code == 200
+    assert client.get(url, headers=lead_headers).status_code == 401
+    new_headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+    assert client.get(url, headers=new_headers).status_code == 200
+
+
+def test_authentication_shares_the_route_session(client, db, admin, make_project, engine):
+    project = make_project(2)
+    lead = User(username="lead", password_hash="x", role="lead", is_admin=False,
+                organization_id=admin["user"].organization_id)
+    db.add(lead)
+    db.commit()
+    # An old-format token needs the users table, read through the route's get_db session
+    lead_headers = {"Authorization": f"Bearer {create_access_token({'user_id': lead.id, 'username': 'lead'})}"}
+    checkouts = []
+
+    def checkout(dbapi_connection, record, proxy):
+        checkouts.append(record)
+
+    event.listen(engine, "checkout", checkout)
+    try:
+        assert client.get(f"/api/candidates/project/{project.id}", headers=lead_headers).status_code == 403
+        assert len(checkouts) == 1
+    finally:
+        event.remove(engine, "checkout", checkout)
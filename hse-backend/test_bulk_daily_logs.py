@@ -0,0 +1,59 @@
+from models import Candidate, DailyLog, Organization, Project
+from rollups import rebuild_rollups
+from test_rollups import rollup_rows
+
+
+def test_bulk_upsert_reports_each_row(client, db, admin, make_project, query_counter):
+    project = make_project(3)
+    candidates = db.query(Candidate).filter(Candidate.project_id == project.id).order_by(Candidate.id).all()
+    other_org = Organization(name="Other Org")
+    db.add(other_org)
+    db.commit()
+    foreign = Project(name="Foreign", organization_id=other_org.id)
+    db.add(foreign)
+    db.commit()
+    outsider = Candidate(project_id=foreign.id, name="Outsider")
+    db.add(outsider)
+    db.commit()
+    headers = admin["headers"]
+
+    client.post("/api/daily-logs", json={"candidate_id": candidates[0].id, "log_date": "2024-03-04",
+                                         "task_briefing": False, "comment": "kept"}, headers=headers)
+
+    rows = [
+        {"candidate_id": c.id, "log_date": day, "task_briefing": True, "time_in": "07:00:00"}
+        for day in ("2024-03-04", "2024-03-05") for c in candidates
+    ]
+    rows.append({"candidate_id": candidates[1].id, "log_date": "2024-03-05", "task_briefing": False,
+                 "time_in": "07:30:00"})
+    rows.append({"candidate_id": outsider.id, "log_date": "2024-03-04", "task_briefing": True})
+
+    query_counter.clear()
+    resp = client.post("/api/daily-logs/bulk", json=rows, headers=headers)
+    assert resp.status_code == 200
+    results = resp.json()
+    assert [r["status"] for r in results] == ["updated"] + ["created"] * 6 + ["forbidden"]
+    assert results[-1]["log"] is None
+    assert sum(s.startswith("INSERT INTO daily_logs") for s in query_counter) == 1
+
+    # Fields left out of a row are kept; duplicate rows are merged
+    first = db.query(DailyLog).filter(DailyLog.candidate_id == candidates[0].id,
+                                      DailyLog.log_date == "2024-03-04").one()
+    assert (first.task_briefing, first.comment) == (True, "kept")
+    assert results[4]["log"]["task_briefing"] is False
+    assert results[4]["log"]["id"] == results[6]["log"]["id"]
+    assert db.query(DailyLog).count() == 6
+
+    incremental = rollup_rows(db)
+    rebuild_rollups(db)
+    db.commit()
+    assert {k: v for k, v in incremental.items() if any(v.values())} == rollup_rows(db)
+
+    changes = client.get(f"/api/projects/{project.id}/changes", params={"since": 1}, headers=headers).json()
+    assert len(changes["dailyLogs"]) == 6
+
+
+def test_bulk_upsert_rejects_oversized_batches(client, admin, make_project):
+    project = make_project(1)
+    rows = [{"candidate_id": 1, "log_date": "2024-03-04"}] * 2001
+    assert client.post("/api/daily-logs/bulk", json=rows, headers=admin["headers"]).status_code == 400
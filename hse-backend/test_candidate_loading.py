@@ -0,0 +1,83 @@
+from datetime import date
+
+from log_window import default_log_window
+from models import Candidate, CandidateSection, DailyLog, MonthlyKPI, Section
+
+
+def add_history(db, project):
+    """Give every candidate in the project a section, two logs and two KPI months"""
+    section = Section(project_id=project.id, name="Civil")
+    db.add(section)
+    db.commit()
+    candidates = db.query(Candidate).filter(Candidate.project_id == project.id).all()
+    for c in candidates:
+        db.add(CandidateSection(candidate_id=c.id, section_id=section.id))
+        db.add(DailyLog(candidate_id=c.id, log_date=date(2024, 1, 1), task_briefing=True))
+        db.add(DailyLog(candidate_id=c.id, log_date=date(2024, 1, 2), task_briefing=False))
+        db.add(MonthlyKPI(candidate_id=c.id, month=date(2024, 1, 1), violations=1))
+        db.add(MonthlyKPI(candidate_id=c.id, month=date(2024, 2, 1), violations=2))
+    db.commit()
+    return section
+
+
+def count_project_queries(client, admin, project, query_counter):
+    url = f"/api/candidates/project/{project.id}?month=2024-01"
+    # Warm the principal cache and access index, which only query on a miss
+    client.get(url, headers=admin["headers"])
+    query_counter.clear()
+    resp = client.get(url, headers=admin["headers"])
+    assert resp.status_code == 200
+    return len(query_counter), resp.json()
+
+
+def test_project_candidates_query_count_is_constant(client, db, admin, make_project, query_counter):
+    small = make_project(2, name="Small")
+    large = make_project(25, name="Large")
+    add_history(db, small)
+    add_history(db, large)
+
+    small_count, small_data = count_project_queries(client, admin, small, query_counter)
+    large_count, large_data = count_project_queries(client, admin, large, query_counter)
+
+    assert len(small_data) == 2
+    assert len(large_data) == 25
+    assert small_count == large_count
+
+
+def test_project_candidates_payload_shape(client, db, admin, make_project):
+    project = make_project(1)
+    section = add_history(db, project)
+
+    data = client.get(f"/api/candidates/project/{project.id}?from=2024-01-01", headers=admin["headers"]).json()
+    candidate = data[0]
+
+    assert candidate["section_ids"] == [section.id]
+    assert set(candidate["dailyLogs"]) == {"2024-01-01", "2024-01-02"}
+    assert candidate["dailyLogs"]["2024-01-01"]["taskBriefing"] is True
+    assert candidate["dailyLogs"]["2024-01-02"]["taskBriefing"] is False
+    assert list(candidate["monthlyKPIs"]) == ["2024-02-01", "2024-01-01"]
+    assert candidate["monthlyKPIs"]["2024-02-01"]["violations"] == 2
+
+    single = client.get(f"/api/candidates/{candidate['id']}?from=2024-01-01", headers=admin["headers"]).json()
+    assert single == candidate
+
+
+def test_daily_logs_are_limited_to_the_requested_window(client, db, admin, make_project):
+    project = make_project(1)
+    add_history(db, project)
+    candidate = db.query(Candidate).filter(Candidate.project_id == project.id).first()
+    recent, _ = default_log_window()
+    db.add(DailyLog(candidate_id=candidate.id, log_date=recent, task_briefing=True))
+    db.commit()
+    url = f"/api/candidates/project/{project.id}"
+
+    default = client.get(url, headers=admin["headers"]).json()[0]
+    assert list(default["dailyLogs"]) == [str(recent)]
+
+    ranged = client.get(url + "?from=2024-01-02&to=2024-01-31", headers=admin["headers"]).json()[0]
+    assert list(ranged["dailyLogs"]) == ["2024-01-02"]
+    # KPIs are not windowed
+    assert len(ranged["monthlyKPIs"]) == 2
+
+    assert client.get(url + "?month=2024-13", headers=admin["headers"]).status_code == 400
+    assert client.get(url + "?from=2024-02-01&to=2024-01-01", headers=admin["headers"]).status_code == 400
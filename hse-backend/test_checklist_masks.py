@@ -0,0 +1,28 @@
+from checklist import CHECKLIST_FIELDS, pack_answers, unpack_answers
+from models import Candidate, DailyLog
+
+
+def test_answers_round_trip_through_the_masks():
+    answers = {field.column: (None, True, False)[field.bit % 3] for field in CHECKLIST_FIELDS}
+    given, answered, yes = pack_answers(dict(answers, comment="ignored"))
+    assert given == (1 << len(CHECKLIST_FIELDS)) - 1
+    assert unpack_answers(answered, yes) == answers
+
+
+def test_upsert_only_changes_the_answers_sent(client, db, admin, make_project):
+    project = make_project(1)
+    candidate = db.query(Candidate).filter(Candidate.project_id == project.id).one()
+    headers = admin["headers"]
+    log = {"candidate_id": candidate.id, "log_date": "2024-03-04"}
+    client.post("/api/daily-logs", json=dict(log, task_briefing=True, tbt_conducted=False, near_miss_reported=True),
+                headers=headers)
+    resp = client.post("/api/daily-logs/bulk", json=[dict(log, tbt_conducted=True, near_miss_reported=None)],
+                       headers=headers)
+    saved = resp.json()[0]["log"]
+    assert (saved["task_briefing"], saved["tbt_conducted"], saved["near_miss_reported"]) == (True, True, None)
+
+    stored = db.query(DailyLog).one()
+    assert (stored.checklist_answered, stored.checklist_yes) == (0b11, 0b11)
+    # The answers can be filtered on in SQL
+    assert db.query(DailyLog).filter(DailyLog.tbt_conducted.is_(True)).count() == 1
+    assert db.query(DailyLog).filter(DailyLog.near_miss_reported.is_(None)).count() == 1
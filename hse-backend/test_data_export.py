@@ -0,0 +1,80 @@
+import json
+from datetime import date, time
+
+from models import Candidate, DailyLog, MonthlyKPI, Organization, Project
+
+
+def seed(db, make_project):
+    project = make_project(2)
+    for c in db.query(Candidate).filter(Candidate.project_id == project.id):
+        db.add(DailyLog(candidate_id=c.id, log_date=date(2024, 1, 1), time_in=time(8, 0), task_briefing=True))
+        db.add(MonthlyKPI(candidate_id=c.id, month=date(2024, 1, 1), violations=3))
+    # Another tenant's data must never leak into the export
+    other = Organization(name="Other Org")
+    db.add(other)
+    db.commit()
+    foreign = Project(name="Foreign", organization_id=other.id)
+    db.add(foreign)
+    db.commit()
+    db.add(Candidate(project_id=foreign.id, name="Foreign Candidate"))
+    db.commit()
+    return project
+
+
+def test_ndjson_backup_streams_one_record_per_line(client, db, admin, make_project):
+    project = seed(db, make_project)
+
+    resp = client.get("/api/export/full-backup?format=ndjson", headers=admin["headers"])
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in resp.text.splitlines()]
+
+    assert records[0]["type"] == "backup"
+    assert records[0]["organization"] == "Test Org"
+    by_type = {}
+    for record in records[1:]:
+        by_type.setdefault(record["type"], []).append(record)
+
+    assert [p["name"] for p in by_type["project"]] == [project.name]
+    assert len(by_type["candidate"]) == 2
+    assert {c["project_id"] for c in by_type["candidate"]} == {project.id}
+    assert len(by_type["daily_log"]) == 2
+    assert by_type["daily_log"][0]["log_date"] == "2024-01-01"
+    assert by_type["daily_log"][0]["time_in"] == "08:00:00"
+    assert by_type["monthly_kpi"][0]["violations"] == 3
+
+    # Same content as the nested JSON backup
+    nested = client.get("/api/export/full-backup", headers=admin["headers"]).json()
+    nested_logs = [log for p in nested["projects"] for c in p["candidates"] for log in c["daily_logs"]]
+    assert sorted(nested_logs, key=lambda l: l["id"]) == sorted(
+        ({k: v for k, v in log.items() if k != "type"} for log in by_type["daily_log"]),
+        key=lambda l: l["id"]
+    )
+
+
+def test_tables_zip_has_one_csv_per_table(client, db, admin, make_project):
+    import csv
+    import io
+    import zipfile
+
+    project = seed(db, make_project)
+
+    resp = client.get("/api/export/tables.zip", headers=admin["headers"])
+    assert resp.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(resp.content))
+    assert set(archive.namelist()) == {
+        "projects.csv", "candidates.csv", "sections.csv", "candidate_sections.csv",
+        "daily_logs.csv", "monthly_kpis.csv"
+    }
+
+    def rows(name):
+        return list(csv.DictReader(io.TextIOWrapper(archive.open(name), encoding="utf-8")))
+
+    assert [p["name"] for p in rows("projects.csv")] == [project.name]
+    assert "delete_pin" not in rows("projects.csv")[0]
+    candidates = rows("candidates.csv")
+    assert {c["project_id"] for c in candidates} == {str(project.id)}
+    logs = rows("daily_logs.csv")
+    assert len(logs) == 2
+    assert logs[0]["log_date"] == "2024-01-01"
+    assert rows("monthly_kpis.csv")[0]["violations"] == "3"
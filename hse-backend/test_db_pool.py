@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+
+from db_pool import PoolMetrics, pool_options
+
+
+def test_pool_options_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "8")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "2")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "0")
+    url = "postgresql://user:pw@localhost/hse"
+    options = pool_options(url)
+    assert (options["pool_size"], options["max_overflow"], options["pool_pre_ping"]) == (8, 2, False)
+    assert options["pool_recycle"] == 1800
+    assert pool_options("sqlite://") == {}
+
+    # The smallest pool still works, and nothing below it turns into an unlimited one
+    monkeypatch.setenv("DB_POOL_SIZE", "1")
+    assert pool_options(url)["pool_size"] == 1
+    monkeypatch.setenv("DB_POOL_SIZE", "0")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "-1")
+    assert (pool_options(url)["pool_size"], pool_options(url)["max_overflow"]) == (1, 0)
+
+
+def test_default_budget_fits_stock_postgres(monkeypatch):
+    for name in ("DB_POOL_SIZE", "DB_MAX_OVERFLOW"):
+        monkeypatch.delenv(name, raising=False)
+    options = pool_options("postgresql://localhost/hse")
+    assert 4 * (options["pool_size"] + options["max_overflow"]) < 100  # --workers 4, max_connections = 100
+
+
+def test_metered_pool_reports_checkouts_waits_and_timeouts(tmp_path):
+    metrics = PoolMetrics()
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=metrics.pool_class(QueuePool),
+        pool_size=1, max_overflow=0, pool_timeout=0.05,
+    )
+    metrics.instrument(engine)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        busy = metrics.stats(engine)
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    with engine.connect():
+        pass
+    engine.dispose()
+
+    assert (busy["checked_out"], busy["overflow"]) == (1, 0)
+    stats = metrics.stats(engine)
+    assert (stats["checkouts"], stats["checkins"], stats["timeouts"]) == (2, 2, 1)
+    assert stats["wait"]["count"] == 2
+    assert stats["connections_opened"] == 1
+    assert stats["connections_closed"] == 1
+
+
+def test_db_pool_endpoint_is_admin_only(client, admin):
+    resp = client.get("/api/ops/db-pool", headers=admin["headers"])
+    assert resp.status_code == 200
+    assert {"worker_pid", "pool"} <= resp.json().keys()
+    assert client.get("/api/ops/db-pool").status_code in (401, 403)
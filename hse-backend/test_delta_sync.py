@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from models import Candidate, ChangeTombstone
+from versioning import prune_tombstones
+
+
+def test_changes_since_cursor(client, db, admin, make_project):
+    project = make_project(2)
+    headers = admin["headers"]
+    url = f"/api/projects/{project.id}/changes"
+    first, second = db.query(Candidate).filter(
+        Candidate.project_id == project.id
+    ).order_by(Candidate.display_order).all()
+    client.post("/api/daily-logs", json={"candidate_id": first.id, "log_date": "2024-05-01"}, headers=headers)
+
+    full = client.get(url, headers=headers).json()
+    assert full["reset"] is True
+    assert len(full["candidates"]) == 2
+    assert [log["date"] for log in full["dailyLogs"]] == ["2024-05-01"]
+    cursor = full["cursor"]
+
+    nothing = client.get(url, params={"since": cursor}, headers=headers).json()
+    assert nothing["cursor"] == cursor
+    assert nothing["candidates"] == nothing["dailyLogs"] == nothing["deleted"] == []
+
+    client.post("/api/daily-logs", json={"candidate_id": second.id, "log_date": "2024-05-02",
+                                         "task_briefing": True}, headers=headers)
+    client.put(f"/api/candidates/{first.id}", json={"name": "Renamed"}, headers=headers)
+    client.delete(f"/api/candidates/{second.id}", headers=headers)
+
+    delta = client.get(url, params={"since": cursor}, headers=headers).json()
+    assert delta["reset"] is False
+    assert delta["cursor"] > cursor
+    assert [c["name"] for c in delta["candidates"]] == ["Renamed"]
+    assert delta["dailyLogs"] == []  # The new log went away with its candidate
+    assert delta["deleted"] == [{"entity": "candidate", "id": second.id}]
+
+    ahead = client.get(url, params={"since": delta["cursor"] + 10}, headers=headers).json()
+    assert ahead["reset"] is True
+
+
+def test_pruned_tombstones_force_a_resync(client, db, admin, make_project):
+    project = make_project(3)
+    headers = admin["headers"]
+    url = f"/api/projects/{project.id}/changes"
+    first, second, third = [c.id for c in db.query(Candidate).filter(
+        Candidate.project_id == project.id
+    ).order_by(Candidate.display_order)]
+    stale_cursor = client.get(url, headers=headers).json()["cursor"]
+    client.delete(f"/api/candidates/{first}", headers=headers)
+    recent_cursor = client.get(url, headers=headers).json()["cursor"]
+
+    # The first deletion falls out of the retention window
+    db.query(ChangeTombstone).update({"created_at": datetime.utcnow() - timedelta(days=90)})
+    db.commit()
+    client.delete(f"/api/candidates/{second}", headers=headers)
+    assert prune_tombstones(db) == 1
+    db.commit()
+    assert [t.entity_id for t in db.query(ChangeTombstone)] == [second]
+
+    resync = client.get(url, params={"since": stale_cursor}, headers=headers).json()
+    assert resync["reset"] is True
+    assert [c["id"] for c in resync["candidates"]] == [third]
+
+    delta = client.get(url, params={"since": recent_cursor}, headers=headers).json()
+    assert delta["reset"] is False
+    assert delta["deleted"] == [{"entity": "candidate", "id": second}]
@@ -0,0 +1,47 @@
+from models import Candidate
+
+
+def test_candidates_list_answers_304_until_project_changes(client, db, admin, make_project, query_counter):
+    project = make_project(2)
+    url = f"/api/candidates/project/{project.id}"
+    headers = admin["headers"]
+
+    first = client.get(url, headers=headers)
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+
+    query_counter.clear()
+    cached = client.get(url, headers=dict(headers, **{"If-None-Match": etag}))
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert not any("daily_logs" in s for s in query_counter)
+
+    candidate = db.query(Candidate).filter(Candidate.project_id == project.id).first()
+    client.post("/api/daily-logs", json={"candidate_id": candidate.id, "log_date": "2024-05-01"}, headers=headers)
+
+    changed = client.get(url, headers=dict(headers, **{"If-None-Match": etag}))
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+    # A different date window is a different representation
+    other_window = client.get(url + "?month=2024-05", headers=dict(headers, **{"If-None-Match": changed.headers["etag"]}))
+    assert other_window.status_code == 200
+
+
+def test_sections_and_projects_lists_use_etags(client, db, admin, make_project):
+    project = make_project(0)
+    headers = admin["headers"]
+
+    sections = client.get(f"/api/sections/project/{project.id}", headers=headers)
+    projects = client.get("/api/projects", headers=headers)
+    assert client.get(f"/api/sections/project/{project.id}",
+                      headers=dict(headers, **{"If-None-Match": sections.headers["etag"]})).status_code == 304
+    assert client.get("/api/projects",
+                      headers=dict(headers, **{"If-None-Match": projects.headers["etag"]})).status_code == 304
+
+    client.post("/api/sections", json={"name": "Civil", "project_id": project.id}, headers=headers)
+
+    assert client.get(f"/api/sections/project/{project.id}",
+                      headers=dict(headers, **{"If-None-Match": sections.headers["etag"]})).status_code == 200
+    assert client.get("/api/projects",
+                      headers=dict(headers, **{"If-None-Match": projects.headers["etag"]})).status_code == 200
@@ -0,0 +1,54 @@
+from kpi_import import KPI_COLUMNS
+from models import Candidate, MonthlyKPI
+from schemas import MonthlyKPIImportRow
+
+
+def test_csv_import_resolves_names_and_reports_rows(client, db, admin, make_project, query_counter):
+    project = make_project(3)
+    candidates = db.query(Candidate).filter(Candidate.project_id == project.id).order_by(Candidate.id).all()
+    headers = admin["headers"]
+    client.post("/api/monthly-kpis", json={"candidate_id": candidates[0].id, "month": "2024-03-01",
+                                           "violations": 9, "ncrs_open": 4}, headers=headers)
+
+    csv_body = (
+        "Name\tViolations\tObservations Open\n"
+        "candidate 0\t1\t5\n"
+        "Candidate 1\t2\t\n"
+        "Nobody\t3\t1\n"
+        "Candidate 2\tmany\t1\n"
+        "Candidate 1\t4\t4\n"
+    )
+    query_counter.clear()
+    resp = client.post(f"/api/monthly-kpis/project/{project.id}/import", params={"month": "2024-03"},
+                       content=csv_body, headers=dict(headers, **{"Content-Type": "text/csv"}))
+    assert resp.status_code == 200
+    report = resp.json()
+    assert (report["created"], report["updated"], report["failed"]) == (1, 1, 3)
+    assert [r["status"] for r in report["rows"]] == ["updated", "created", "error", "error", "error"]
+    assert "candidate_id" not in report["rows"][2]
+    assert "Duplicate" in report["rows"][4]["error"]
+    assert sum(s.startswith("INSERT INTO monthly_kpis") for s in query_counter) == 1
+
+    # Columns that aren't in the import keep their values
+    db.expire_all()
+    first = db.query(MonthlyKPI).filter(MonthlyKPI.candidate_id == candidates[0].id).one()
+    assert (first.violations, first.observations_open, first.ncrs_open) == (1, 5, 4)
+
+
+def test_json_import_checks_project_membership(client, db, admin, make_project):
+    project = make_project(1)
+    other = make_project(1, name="Other")
+    mine = db.query(Candidate).filter(Candidate.project_id == project.id).one()
+    theirs = db.query(Candidate).filter(Candidate.project_id == other.id).one()
+
+    resp = client.post(f"/api/monthly-kpis/project/{project.id}/import", params={"month": "2024-03-01"},
+                       json={"rows": [{"candidate_id": mine.id, "violations": 2},
+                                      {"candidate_id": theirs.id, "violations": 2}]},
+                       headers=admin["headers"])
+    report = resp.json()
+    assert [r["status"] for r in report["rows"]] == ["created", "error"]
+    assert db.query(MonthlyKPI).filter(MonthlyKPI.candidate_id == theirs.id).count() == 0
+
+
+def test_import_rows_carry_every_registered_kpi():
+    assert set(MonthlyKPIImportRow.model_fields) - {"candidate_id", "candidate"} == KPI_COLUMNS
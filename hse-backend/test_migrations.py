@@ -0,0 +1,127 @@
+from sqlalchemy import create_engine, event, inspect, text
+
+from migrations import HEAD, migrate, schema_version
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_fresh_database_migrates_once_then_only_checks_the_version(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    assert migrate(engine) == HEAD
+    with engine.connect() as conn:
+        versions = conn.execute(schema_version.select()).fetchall()
+    assert [v.version for v in versions] == list(range(1, HEAD + 1))
+    assert "daily_logs" in inspect(engine).get_table_names()
+
+    statements = count_statements(engine)
+    assert migrate(engine) == 0
+    assert len(statements) == 1
+
+
+def test_legacy_database_is_brought_up_to_date(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR, password_hash VARCHAR, is_admin BOOLEAN)"))
+        conn.execute(text("CREATE TABLE projects (id INTEGER PRIMARY KEY, name VARCHAR, hse_lead_name VARCHAR)"))
+        conn.execute(text("CREATE TABLE candidates (id INTEGER PRIMARY KEY, project_id INTEGER, name VARCHAR)"))
+        conn.execute(text("INSERT INTO users VALUES (1, 'boss', 'x', 1), (2, 'lead', 'x', 0)"))
+        conn.execute(text("INSERT INTO projects VALUES (1, 'Tower', NULL)"))
+        conn.execute(text("CREATE TABLE daily_logs (id INTEGER PRIMARY KEY, candidate_id INTEGER, log_date DATE, time_in TIME, time_out TIME,"
+                          " task_briefing BOOLEAN, tbt_conducted BOOLEAN)"))
+        conn.execute(text("CREATE TABLE monthly_kpis (id INTEGER PRIMARY KEY, candidate_id INTEGER, month DATE, violations INTEGER)"))
+        conn.execute(text("INSERT INTO candidates VALUES (5, 1, 'A'), (9, 1, 'B')"))
+        conn.execute(text("CREATE TABLE sections (id INTEGER PRIMARY KEY, project_id INTEGER, name VARCHAR,"
+                          " description VARCHAR, display_order INTEGER)"))
+        conn.execute(text("CREATE TABLE candidate_sections (id INTEGER PRIMARY KEY, candidate_id INTEGER, section_id INTEGER)"))
+        conn.execute(text("INSERT INTO sections VALUES (3, 1, 'Crew', NULL, 0)"))
+        conn.execute(text("INSERT INTO candidate_sections VALUES (1, 5, 3), (2, 9, 3), (3, 5, 3)"))
+        conn.execute(text("INSERT INTO monthly_kpis VALUES (1, 5, '2024-03-01', 1), (2, 5, '2024-03-01', 4)"))
+        conn.execute(text("INSERT INTO daily_logs (id, candidate_id, log_date, task_briefing, tbt_conducted)"
+                          " VALUES (1, 5, '2024-03-04', 1, 0), (2, 5, '2024-03-04', 1, 1), (3, 9, '2024-03-04', NULL, 1)"))
+
+    assert migrate(engine) == HEAD
+
+    with engine.connect() as conn:
+        users = conn.execute(text("SELECT username, role, organization_id, token_version FROM users ORDER BY id")).fetchall()
+        orders = conn.execute(text("SELECT display_order FROM candidates ORDER BY id")).scalars().all()
+        org = conn.execute(text("SELECT id FROM organizations WHERE name = 'Default Company'")).scalar()
+        project_org = conn.execute(text("SELECT organization_id FROM projects")).scalar()
+    assert [(u.username, u.role, u.organization_id, u.token_version) for u in users] == [
+        ("boss", "admin", org, 0), ("lead", "viewer", org, 0)
+    ]
+    assert project_org == org
+    assert orders == [5, 9]
+
+    # Duplicate logs, KPIs and memberships are dropped (keeping the oldest) before the unique index is added
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id FROM daily_logs ORDER BY id")).scalars().all() == [1, 3]
+        assert conn.execute(text("SELECT violations FROM monthly_kpis")).scalars().all() == [1]
+        assert conn.execute(text("SELECT id FROM candidate_sections ORDER BY id")).scalars().all() == [1, 2]
+        assert conn.execute(text("SELECT entity, entity_id FROM change_tombstones ORDER BY id")).fetchall() == [
+            ("daily_log", 2), ("monthly_kpi", 2), ("section_assignment", 3)
+        ]
+    assert "change_version" in {c["name"] for c in inspect(engine).get_columns("daily_logs")}
+
+    # Checklist booleans are packed into the answer masks and dropped
+    with engine.connect() as conn:
+        masks = conn.execute(text("SELECT checklist_answered, checklist_yes FROM daily_logs ORDER BY id")).fetchall()
+    # (columns added by version 6 default to FALSE, i.e. answered No)
+    every = (1 << 24) - 1
+    assert [tuple(m) for m in masks] == [(every, 0b01), (every & ~0b01, 0b10)]
+    assert "task_briefing" not in {c["name"] for c in inspect(engine).get_columns("daily_logs")}
+
+    # Rollups are backfilled, so scores don't read an empty table
+    with engine.connect() as conn:
+        rollups = conn.execute(text(
+            "SELECT candidate_id, month, days_logged, tbt_conducted_yes FROM candidate_monthly_rollups ORDER BY candidate_id"
+        )).fetchall()
+    assert [tuple(r) for r in rollups] == [(5, "2024-03-01", 1, 0), (9, "2024-03-01", 1, 1)]
+
+
+def test_migrated_schema_matches_the_models(tmp_path):
+    from database import Base
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    migrate(engine)
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        assert {c["name"] for c in inspector.get_columns(table.name)} == set(table.columns.keys()), table.name
+        assert {i.name for i in table.indexes} <= {i["name"] for i in inspector.get_indexes(table.name)}, table.name
+
+
+def test_rollup_backfill_matches_rebuild_rollups(tmp_path):
+    from datetime import date, time
+    from sqlalchemy.orm import Session
+    from migrations import backfill_rollups
+    from models import CandidateMonthlyRollup, DailyLog
+    from rollups import COUNTER_COLUMNS, rebuild_rollups
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollups.db'}")
+    migrate(engine)
+    with Session(engine) as db:
+        db.add_all([
+            DailyLog(candidate_id=1, log_date=date(2024, 3, 4), time_in=time(7, 0), time_out=time(16, 30),
+                     task_briefing=True, tbt_conducted=False),
+            DailyLog(candidate_id=1, log_date=date(2024, 3, 5), time_in=time(9, 0), time_out=time(8, 0),
+                     barcode_system_100=True),
+            DailyLog(candidate_id=1, log_date=date(2024, 4, 1), time_in=time(7, 15)),
+            DailyLog(candidate_id=2, log_date=date(2024, 3, 31), near_miss_reported=False),
+        ])
+        db.flush()
+
+        def totals():
+            return {
+                (r.candidate_id, r.month): {column: getattr(r, column) for column in COUNTER_COLUMNS}
+                for r in db.query(CandidateMonthlyRollup)
+            }
+
+        rebuild_rollups(db)
+        expected = totals()
+        backfill_rollups(db.connection())
+        db.expire_all()
+        assert totals() == expected
+        assert expected[(1, date(2024, 3, 1))]["minutes_on_site"] == 570
@@ -0,0 +1,54 @@
+from models import Candidate, Section
+from ordering import ORDER_GAP, sparse_orders
+
+
+def test_moving_one_item_changes_one_key():
+    current = {i: (i + 1) * ORDER_GAP for i in range(1, 101)}
+    ids = list(current)
+    ids.insert(10, ids.pop(70))
+    orders = sparse_orders(ids, current)
+    assert list(orders) == [71]
+    merged = {**current, **orders}
+    assert sorted(ids, key=merged.get) == ids
+
+    # Adjacent keys leave no room, so the list is renumbered
+    assert sparse_orders([1, 3, 2], {1: 1, 2: 2, 3: 3}) == {1: ORDER_GAP, 2: 3 * ORDER_GAP, 3: 2 * ORDER_GAP}
+
+
+def test_reorder_is_one_update_scoped_to_the_project(client, db, admin, make_project, query_counter):
+    project = make_project(5)
+    other = make_project(1, name="Other")
+    ids = [c.id for c in db.query(Candidate).filter(Candidate.project_id == project.id).order_by(Candidate.display_order)]
+    outsider = db.query(Candidate).filter(Candidate.project_id == other.id).one()
+
+    query_counter.clear()
+    resp = client.put(f"/api/candidates/project/{project.id}/reorder",
+                      json={"candidate_ids": [ids[4]] + ids[:4] + [outsider.id]}, headers=admin["headers"])
+    assert resp.json()["moved"] == 1
+    assert sum(s.startswith("UPDATE candidates") for s in query_counter) == 1
+
+    db.expire_all()
+    ordered = [c.id for c in db.query(Candidate).filter(Candidate.project_id == project.id).order_by(Candidate.display_order)]
+    assert ordered == [ids[4]] + ids[:4]
+    assert db.get(Candidate, outsider.id).display_order == 0
+
+    # Sections use the same path, and new items go last
+    for name in ("A", "B", "C"):
+        client.post("/api/sections", json={"project_id": project.id, "name": name}, headers=admin["headers"])
+    sections = db.query(Section).filter(Section.project_id == project.id).order_by(Section.display_order).all()
+    assert [s.name for s in sections] == ["A", "B", "C"]
+    resp = client.put(f"/api/sections/project/{project.id}/reorder",
+                      json={"section_ids": [sections[0].id, sections[2].id, sections[1].id]}, headers=admin["headers"])
+    assert resp.json()["moved"] == 1
+
+
+def test_reorder_locks_the_project_before_reading_keys(client, db, admin, make_project, query_counter):
+    project = make_project(3)
+    ids = [c.id for c in db.query(Candidate).filter(Candidate.project_id == project.id).order_by(Candidate.display_order)]
+
+    query_counter.clear()
+    client.put(f"/api/candidates/project/{project.id}/reorder",
+               json={"candidate_ids": ids[::-1]}, headers=admin["headers"])
+    lock = next(i for i, s in enumerate(query_counter) if s.startswith("SELECT projects.data_version AS"))
+    read = next(i for i, s in enumerate(query_counter) if s.startswith("SELECT candidates.id AS candidates_id, candidates.display_order"))
+    assert lock < read
@@ -0,0 +1,33 @@
+import threading
+
+import pytest
+
+from password_hashing import PasswordHasher, PasswordHashingBusy
+
+
+def test_login_and_register_hash_on_the_pool(client, db, admin):
+    resp = client.post("/api/auth/register", json={
+        "username": "founder", "password": "s3cret", "company_name": "Other Co"
+    })
+    assert resp.status_code == 200
+    assert client.post("/api/auth/login", json={"username": "founder", "password": "s3cret"}).status_code == 200
+    assert client.post("/api/auth/login", json={"username": "founder", "password": "nope"}).status_code == 401
+
+    stats = client.get("/api/ops/password-hashing", headers=admin["headers"]).json()
+    assert stats["completed"] >= 3
+    assert stats["run"]["count"] == stats["completed"]
+
+
+def test_full_queue_is_rejected_not_queued():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    release = threading.Event()
+    running = hasher.submit(release.wait)
+    queued = hasher.submit(release.wait)
+    with pytest.raises(PasswordHashingBusy):
+        hasher.submit(release.wait)
+    release.set()
+    running.result(timeout=5)
+    queued.result(timeout=5)
+
+    stats = hasher.stats()
+    assert (stats["completed"], stats["rejected"], stats["queue_depth"]) == (2, 1, 0)
@@ -0,0 +1,115 @@
+import base64
+import hashlib
+import io
+
+import pytest
+
+import photo_store
+from auth import create_photo_key
+from models import Candidate
+
+# Smallest valid-looking JPEG header is enough: the store only sniffs the signature
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 64
+
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(photo_store, "PHOTO_STORE_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def photo_key(client, admin):
+    return client.get("/api/photos/key", headers=admin["headers"]).json()["key"]
+
+
+def test_upload_and_download_are_content_addressed(client, admin, photo_key):
+    resp = client.post("/api/photos", files={"file": ("a.jpg", JPEG, "image/jpeg")}, headers=admin["headers"])
+    assert resp.status_code == 200
+    url = resp.json()["url"]
+    assert url == f"/api/photos/{resp.json()['hash']}"
+
+    photo = client.get(url, params={"key": photo_key})
+    assert photo.content == JPEG
+    assert photo.headers["content-type"] == "image/jpeg"
+    assert photo.headers["cache-control"].startswith("private")
+    assert client.get(url, params={"key": photo_key}, headers={"If-None-Match": photo.headers["etag"]}).status_code == 304
+
+    # Without Pillow, or for images it can't decode, thumbnails are the original
+    assert client.get(url, params={"key": photo_key, "size": 64}).content == JPEG
+    assert client.get(url, params={"key": photo_key, "size": 65}).status_code == 400
+    assert client.get("/api/photos/" + "0" * 64, params={"key": photo_key}).status_code == 404
+
+    bad = client.post("/api/photos", files={"file": ("a.txt", b"hello", "text/plain")}, headers=admin["headers"])
+    assert bad.status_code == 400
+
+
+def test_inline_photos_are_moved_to_the_store(client, db, admin, make_project, photo_key):
+    project = make_project(1)
+    candidate = db.query(Candidate).filter(Candidate.project_id == project.id).one()
+    data_url = "data:image/jpeg;base64," + base64.b64encode(JPEG).decode()
+
+    resp = client.put(f"/api/candidates/{candidate.id}", json={"photo": data_url}, headers=admin["headers"])
+    assert resp.status_code == 200
+    url = resp.json()["photo"]
+    assert url.startswith("/api/photos/")
+    assert client.get(url, params={"key": photo_key}).content == JPEG
+
+    avatar = "https://ui-avatars.com/api/?name=A"
+    resp = client.put(f"/api/candidates/{candidate.id}", json={"photo": avatar}, headers=admin["headers"])
+    assert resp.json()["photo"] == avatar
+
+
+def test_photos_need_a_current_key(client, admin, photo_key):
+    url = client.post("/api/photos", files={"file": ("a.jpg", JPEG, "image/jpeg")}, headers=admin["headers"]).json()["url"]
+    user_id, expires, signature = photo_key.split(".")
+
+    assert client.get(url).status_code == 401
+    assert client.get(url, headers=admin["headers"]).status_code == 401  # <img> can't send it anyway
+    assert client.get(url, params={"key": f"{user_id}.{int(expires) + 1}.{signature}"}).status_code == 401
+    expired, _ = create_photo_key(int(user_id), now=0)
+    assert client.get(url, params={"key": expired}).status_code == 401
+    assert client.get(url, params={"key": photo_key}).status_code == 200
+    assert client.get("/api/photos/key").status_code in (401, 403)
+
+
+def test_oversized_images_are_refused_at_upload(client, admin, photo_key, monkeypatch):
+    Image = pytest.importorskip("PIL.Image")
+    out = io.BytesIO()
+    Image.new("L", (200, 100)).save(out, format="PNG")
+    png = out.getvalue()
+
+    monkeypatch.setattr(photo_store, "MAX_PHOTO_PIXELS", 10_000)
+    resp = client.post("/api/photos", files={"file": ("a.png", png, "image/png")}, headers=admin["headers"])
+    assert resp.status_code == 400
+    assert "megapixels" in resp.json()["detail"]
+
+    # Pillow's own decompression bomb limit is a 400 too, not a 500
+    monkeypatch.setattr(photo_store, "MAX_PHOTO_PIXELS", 50_000)
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 5_000)
+    resp = client.post("/api/photos", files={"file": ("a.png", png, "image/png")}, headers=admin["headers"])
+    assert resp.status_code == 400
+
+    # Stored before the check: thumbnails fall back to the original
+    digest = hashlib.sha256(png).hexdigest()
+    photo_store._write_atomic(photo_store._path(digest), png)
+    thumb = client.get(f"/api/photos/{digest}", params={"key": photo_key, "size": 64})
+    assert thumb.status_code == 200
+    assert thumb.content == png
+
+
+def test_startup_requires_a_persistent_store(monkeypatch, tmp_path):
+    for name in ("PHOTO_STORE_DIR", "PHOTO_STORE_EPHEMERAL", "RAILWAY_ENVIRONMENT", "RAILWAY_PROJECT_ID"):
+        monkeypatch.delenv(name, raising=False)
+    with pytest.raises(RuntimeError, match="PHOTO_STORE_DIR is not set"):
+        photo_store.check_photo_store()
+
+    # On Railway the store has to be on the attached volume, whatever PHOTO_STORE_DIR says
+    monkeypatch.setenv("PHOTO_STORE_DIR", str(tmp_path))
+    monkeypatch.setenv("RAILWAY_ENVIRONMENT", "production")
+    monkeypatch.setattr(photo_store, "RAILWAY_VOLUME", None)
+    assert photo_store.photo_store_problem() == "no Railway volume is attached to the service"
+    monkeypatch.setattr(photo_store, "RAILWAY_VOLUME", str(tmp_path / "volume"))
+    assert "not on the Railway volume" in photo_store.photo_store_problem()
+    monkeypatch.setattr(photo_store, "PHOTO_STORE_DIR", str(tmp_path / "volume" / "photos"))
+    photo_store.check_photo_store()
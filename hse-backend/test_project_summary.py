@@ -0,0 +1,33 @@
+from models import User
+
+
+def test_project_summary_is_a_fixed_number_of_queries(client, db, admin, make_project, query_counter):
+    lead = User(username="lead", password_hash="x", role="lead", is_admin=False,
+                organization_id=admin["user"].organization_id)
+    db.add(lead)
+    projects = [make_project(n, name=f"Project {n}") for n in (0, 2, 3)]
+    for project in projects:
+        project.hse_lead_photo = "data:image/jpeg;base64," + "A" * 10000
+        project.assigned_leads = [lead]
+    db.commit()
+
+    # Warm the auth caches, which only query on a miss
+    client.get("/api/projects/summary", headers=admin["headers"])
+    query_counter.clear()
+    resp = client.get("/api/projects/summary", headers=admin["headers"])
+    assert resp.status_code == 200
+    data = resp.json()
+    # version stamp + projects with counts + one selectinload for leads
+    assert len(query_counter) == 3
+    assert not any("hse_lead_photo" in s or "high_risk" in s for s in query_counter)
+    # Candidates are counted for the visible projects only
+    counted = next(s for s in query_counter if "count(candidates.id)" in s)
+    assert "candidates.project_id IN (SELECT projects.id" in counted
+
+    assert [p["candidate_count"] for p in data] == [0, 2, 3]
+    assert data[1]["assigned_leads"] == [{"id": lead.id, "username": "lead", "full_name": None, "role": "lead"}]
+    assert "hse_lead_photo" not in data[0]
+
+    cached = client.get("/api/projects/summary",
+                        headers=dict(admin["headers"], **{"If-None-Match": resp.headers["etag"]}))
+    assert cached.status_code == 304
@@ -0,0 +1,26 @@
+from sqlalchemy import create_engine, text
+
+from check_query_plans import check_plans, seed
+from migrations import migrate
+
+
+def seeded_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    migrate(engine)
+    seed(engine, projects=3, candidates=5, days=10)
+    return engine
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    assert check_plans(seeded_engine(tmp_path), verbose=False) == []
+
+
+def test_missing_index_is_reported(tmp_path):
+    engine = seeded_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_candidates_project_order"))
+        conn.execute(text("ANALYZE"))
+    failures = check_plans(engine, verbose=False)
+    assert [check.description for check in failures] == [
+        "candidate counts of listed projects", "candidates of a project in order"
+    ]
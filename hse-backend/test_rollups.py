@@ -0,0 +1,47 @@
+from datetime import date
+
+from models import Candidate, CandidateMonthlyRollup
+from rollups import COUNTER_COLUMNS, rebuild_rollups
+
+
+def rollup_rows(db):
+    db.expire_all()
+    return {
+        (r.candidate_id, r.month): {c: getattr(r, c) for c in COUNTER_COLUMNS}
+        for r in db.query(CandidateMonthlyRollup).all()
+    }
+
+
+def test_rollups_follow_daily_log_writes(client, db, admin, make_project):
+    project = make_project(1)
+    candidate = db.query(Candidate).filter(Candidate.project_id == project.id).one()
+    headers = admin["headers"]
+
+    log = {"candidate_id": candidate.id, "log_date": "2024-03-04",
+           "time_in": "08:00:00", "time_out": "16:30:00",
+           "task_briefing": True, "tbt_conducted": False}
+    created = client.post("/api/daily-logs", json=log, headers=headers).json()
+    client.post("/api/daily-logs", json={"candidate_id": candidate.id, "log_date": "2024-03-05",
+                                         "task_briefing": True}, headers=headers)
+
+    rollup = rollup_rows(db)[(candidate.id, date(2024, 3, 1))]
+    assert rollup["days_logged"] == 2
+    assert (rollup["answered"], rollup["yes"]) == (3, 2)
+    assert rollup["minutes_on_site"] == 510
+    assert rollup["task_briefing_yes"] == 2
+
+    # Re-posting the same day updates in place; moving a log changes months
+    client.post("/api/daily-logs", json=dict(log, tbt_conducted=True), headers=headers)
+    client.put(f"/api/daily-logs/{created['id']}", json=dict(log, log_date="2024-04-01"), headers=headers)
+    second = client.get(f"/api/daily-logs/candidate/{candidate.id}", headers=headers).json()
+    client.delete(f"/api/daily-logs/{[l for l in second if l['log_date'] == '2024-03-05'][0]['id']}", headers=headers)
+
+    incremental = rollup_rows(db)
+    assert incremental[(candidate.id, date(2024, 3, 1))]["days_logged"] == 0
+    assert incremental[(candidate.id, date(2024, 4, 1))]["tbt_conducted_answered"] == 1
+
+    rebuild_rollups(db)
+    db.commit()
+    rebuilt = rollup_rows(db)
+    nonzero = {k: v for k, v in incremental.items() if any(v.values())}
+    assert nonzero == rebuilt
@@ -0,0 +1,62 @@
+from datetime import date
+
+from models import Candidate, CandidateSection, DailyLog, Section
+from rollups import rebuild_rollups
+from scoring import percentage
+
+
+def test_percentage_rounds_like_the_frontend():
+    assert percentage(0, 0) == 0
+    assert percentage(1, 8) == 13  # 12.5 rounds up, as Math.round does
+    assert percentage(2, 3) == 67
+
+
+def test_project_scores(client, db, admin, make_project, query_counter):
+    project = make_project(3)
+    first, second, idle = db.query(Candidate).filter(
+        Candidate.project_id == project.id
+    ).order_by(Candidate.display_order).all()
+    section = Section(project_id=project.id, name="Civil")
+    db.add(section)
+    db.commit()
+    db.add(CandidateSection(candidate_id=first.id, section_id=section.id))
+    # first: 3 yes out of 4 answered; second: 1 yes out of 2; idle: no logs
+    db.add(DailyLog(candidate_id=first.id, log_date=date(2024, 1, 1),
+                    task_briefing=True, tbt_conducted=True, violation_briefing=None))
+    db.add(DailyLog(candidate_id=first.id, log_date=date(2024, 1, 2),
+                    task_briefing=True, tbt_conducted=False))
+    db.add(DailyLog(candidate_id=second.id, log_date=date(2024, 1, 1),
+                    task_briefing=False, near_miss_reported=True))
+    # Outside the requested month
+    db.add(DailyLog(candidate_id=second.id, log_date=date(2024, 2, 1), task_briefing=False))
+    db.commit()
+    rebuild_rollups(db)
+    db.commit()
+
+    # Whole month: served from the rollups
+    resp = client.get(f"/api/projects/{project.id}/scores?month=2024-01", headers=admin["headers"])
+    assert resp.status_code == 200
+    from_rollups = resp.json()
+
+    # Arbitrary range: one aggregate over daily_logs
+    query_counter.clear()
+    resp = client.get(f"/api/projects/{project.id}/scores?from=2024-01-01&to=2024-01-15", headers=admin["headers"])
+    assert resp.status_code == 200
+    data = resp.json()
+    assert sum("daily_logs" in s for s in query_counter) == 1
+    assert from_rollups["candidates"] == data["candidates"]
+
+    scores = {c["id"]: c for c in data["candidates"]}
+    assert (scores[first.id]["answered"], scores[first.id]["yes"], scores[first.id]["score"]) == (4, 3, 75)
+    assert scores[first.id]["fields"]["taskBriefing"] == {"answered": 2, "yes": 2, "score": 100}
+    assert scores[first.id]["fields"]["tbtConducted"]["score"] == 50
+    assert (scores[second.id]["answered"], scores[second.id]["yes"]) == (2, 1)
+    assert scores[idle.id]["score"] == 0
+
+    assert data["project"]["answered"] == 6
+    assert data["project"]["yes"] == 4
+    assert data["project"]["averageScore"] == 42  # (75 + 50 + 0) / 3
+    assert data["sections"] == [{
+        "id": section.id, "answered": 4, "yes": 3, "score": 75,
+        "candidateCount": 1, "averageScore": 75
+    }]
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+from models import Candidate, CandidateSection, Project, Section
+
+
+def test_sync_writes_only_the_difference(client, db, admin, make_project, query_counter):
+    project = make_project(4)
+    other = make_project(1, name="Other")
+    ids = [c.id for c in db.query(Candidate).filter(Candidate.project_id == project.id).order_by(Candidate.id)]
+    outsider = db.query(Candidate).filter(Candidate.project_id == other.id).one()
+    section = Section(project_id=project.id, name="Crew")
+    db.add(section)
+    db.commit()
+    url = f"/api/sections/{section.id}/sync-candidates"
+    headers = admin["headers"]
+
+    resp = client.put(url, json=ids[:3] + [outsider.id], headers=headers).json()
+    assert (resp["count"], resp["added"], resp["removed"]) == (3, 3, 0)
+    version = db.query(Project.data_version).filter(Project.id == project.id).scalar()
+
+    # Saving the same members again writes nothing
+    query_counter.clear()
+    resp = client.put(url, json=ids[:3], headers=headers).json()
+    assert (resp["added"], resp["removed"]) == (0, 0)
+    assert not any(s.startswith(("INSERT", "DELETE", "UPDATE")) for s in query_counter)
+    db.expire_all()
+    assert db.query(Project.data_version).filter(Project.id == project.id).scalar() == version
+
+    query_counter.clear()
+    resp = client.put(url, json=[ids[0], ids[1], ids[3]], headers=headers).json()
+    assert (resp["count"], resp["added"], resp["removed"]) == (3, 1, 1)
+    assert sum(s.startswith("DELETE FROM candidate_sections") for s in query_counter) == 1
+    assert sum(s.startswith("INSERT INTO candidate_sections") for s in query_counter) == 1
+    members = {cs.candidate_id for cs in db.query(CandidateSection).filter(CandidateSection.section_id == section.id)}
+    assert members == {ids[0], ids[1], ids[3]}
+
+    changes = client.get(f"/api/projects/{project.id}/changes", params={"since": version}, headers=headers).json()
+    assert [d["candidate_id"] for d in changes["deleted"]] == [ids[2]]
+    assert [a["candidateId"] for a in changes["sectionAssignments"]] == [ids[3]]
+
+
+def test_membership_is_unique_and_synced_under_the_project_lock(client, db, admin, make_project, query_counter):
+    project = make_project(2)
+    ids = [c.id for c in db.query(Candidate).filter(Candidate.project_id == project.id).order_by(Candidate.id)]
+    section = Section(project_id=project.id, name="Crew")
+    db.add(section)
+    db.commit()
+    db.add(CandidateSection(section_id=section.id, candidate_id=ids[0]))
+    db.commit()
+    db.add(CandidateSection(section_id=section.id, candidate_id=ids[0]))
+    with pytest.raises(IntegrityError):
+        db.commit()
+    db.rollback()
+
+    query_counter.clear()
+    resp = client.put(f"/api/sections/{section.id}/sync-candidates", json=[ids[1]], headers=admin["headers"]).json()
+    assert (resp["added"], resp["removed"]) == (1, 1)
+    lock = next(i for i, s in enumerate(query_counter) if s.startswith("SELECT projects.data_version AS"))
+    read = next(i for i, s in enumerate(query_counter) if "FROM candidate_sections" in s)
+    assert lock < read
+    delete = next(s for s in query_counter if s.startswith("DELETE FROM candidate_sections"))
+    assert "candidate_sections.section_id" in delete and "candidate_sections.candidate_id IN" in delete
@@ -0,0 +1,29 @@
+from datetime import date, time
+
+from sqlalchemy import select
+
+from checklist import CHECKLIST_FIELDS
+from models import Candidate, DailyLog, MonthlyKPI
+from serializers import parse_daily_log, parse_monthly_kpi, serialize_daily_log, serialize_monthly_kpi
+
+
+def test_payloads_match_the_model_and_parse_back(db, make_project):
+    project = make_project(1)
+    candidate = db.query(Candidate).filter(Candidate.project_id == project.id).one()
+    log = DailyLog(candidate_id=candidate.id, log_date=date(2024, 3, 4), time_in=time(7, 30),
+                   task_briefing=True, tbt_conducted=False, barcode_system_100=True, comment="ok")
+    db.add_all([log, MonthlyKPI(candidate_id=candidate.id, month=date(2024, 3, 1), violations=2, ncrs_open=1)])
+    db.commit()
+
+    row = db.execute(select(*serialize_daily_log.columns)).one()
+    payload = serialize_daily_log(row)
+    assert (payload["timeIn"], payload["timeOut"], payload["comment"]) == ("07:30:00", None, "ok")
+    assert {field.key: payload[field.key] for field in CHECKLIST_FIELDS} == {
+        field.key: getattr(log, field.column) for field in CHECKLIST_FIELDS
+    }
+    parsed = parse_daily_log(payload)
+    assert (parsed["checklist_answered"], parsed["checklist_yes"]) == (log.checklist_answered, log.checklist_yes)
+
+    kpi = serialize_monthly_kpi(db.execute(select(*serialize_monthly_kpi.columns)).one())
+    assert (kpi["violations"], kpi["ncrsOpen"], kpi["weeklyReportsClosed"]) == (2, 1, 0)
+    assert parse_monthly_kpi(kpi)["ncrs_open"] == 1
@@ -0,0 +1,94 @@
+from models import Candidate, DailyLog, MonthlyKPI
+
+
+def test_single_saves_are_one_upsert(client, db, admin, make_project, query_counter):
+    project = make_project(1)
+    candidate = db.query(Candidate).filter(Candidate.project_id == project.id).one()
+    headers = admin["headers"]
+    log = {"candidate_id": candidate.id, "log_date": "2024-03-04", "task_briefing": True}
+    client.post("/api/daily-logs", json=log, headers=headers)
+
+    query_counter.clear()
+    resp = client.post("/api/daily-logs", json=dict(log, comment="late"), headers=headers)
+    assert resp.status_code == 200
+    assert (resp.json()["task_briefing"], resp.json()["comment"]) == (True, "late")
+    writes = [s for s in query_counter if s.lstrip().startswith(("INSERT", "UPDATE"))]
+    assert sum("INTO daily_logs" in s for s in writes) == 1
+    assert not any(s.startswith("UPDATE daily_logs") for s in writes)
+    assert db.query(DailyLog).count() == 1
+
+    kpi = {"candidate_id": candidate.id, "month": "2024-03-01", "violations": 2, "ncrs_open": 1}
+    first = client.post("/api/monthly-kpis", json=kpi, headers=headers).json()
+    query_counter.clear()
+    second = client.post("/api/monthly-kpis", json={"candidate_id": candidate.id, "month": "2024-03-01",
+                                                    "violations": 3}, headers=headers).json()
+    # Just the version bump and the upsert, nothing read back
+    assert [s.split()[0] for s in query_counter] == ["UPDATE", "INSERT"]
+    assert second["id"] == first["id"]
+    assert (second["violations"], second["ncrs_open"]) == (3, 1)
+    assert db.query(MonthlyKPI).count() == 1
+
+
+def test_editing_a_log_locks_first_and_reads_nothing_back(client, db, admin, make_project, query_counter):
+    project = make_project(1)
+    candidate = db.query(Candidate).filter(Candidate.project_id == project.id).one()
+    headers = admin["headers"]
+    log = client.post("/api/daily-logs", json={"candidate_id": candidate.id, "log_date": "2024-03-04",
+                                               "task_briefing": True}, headers=headers).json()
+
+    query_counter.clear()
+    resp = client.put(f"/api/daily-logs/{log['id']}", json={"candidate_id": candidate.id, "log_date": "2024-03-04",
+                                                            "tbt_conducted": False}, headers=headers)
+    assert resp.status_code == 200
+    assert (resp.json()["task_briefing"], resp.json()["tbt_conducted"]) == (True, False)
+    # Project bump (the lock), the log read under it, its UPDATE ... RETURNING and the rollup
+    assert len(query_counter) == 4
+    assert query_counter[0].startswith("UPDATE projects")
+    assert query_counter[1].startswith("SELECT daily_logs.id")
+    assert query_counter[2].startswith("UPDATE daily_logs") and "RETURNING" in query_counter[2]
+    assert "candidate_monthly_rollups" in query_counter[3]
+
+    resp = client.put("/api/daily-logs/999999", json={"candidate_id": candidate.id, "log_date": "2024-03-04"},
+                      headers=headers)
+    assert resp.status_code == 404
+
+
+def test_moving_a_log_onto_an_existing_day_conflicts(client, db, admin, make_project):
+    project = make_project(2)
+    first, second = db.query(Candidate).filter(Candidate.project_id == project.id).order_by(Candidate.id)
+    headers = admin["headers"]
+    for candidate, day in ((first, "2024-03-04"), (second, "2024-03-06")):
+        client.post("/api/daily-logs", json={"candidate_id": candidate.id, "log_date": day}, headers=headers)
+    log = client.post("/api/daily-logs", json={"candidate_id": second.id, "log_date": "2024-03-05",
+                                               "task_briefing": True}, headers=headers).json()
+
+    # Onto another candidate's day, or another day of the same candidate
+    for move in ({"candidate_id": first.id, "log_date": "2024-03-04"},
+                 {"candidate_id": second.id, "log_date": "2024-03-06"}):
+        resp = client.put(f"/api/daily-logs/{log['id']}", json=move, headers=headers)
+        assert resp.status_code == 409
+    db.expire_all()
+    assert db.get(DailyLog, log["id"]).log_date.isoformat() == "2024-03-05"
+
+    resp = client.put(f"/api/daily-logs/{log['id']}", json={"candidate_id": first.id, "log_date": "2024-03-05"},
+                      headers=headers)
+    assert resp.status_code == 200
+
+
+def test_moving_a_kpi_onto_an_existing_month_conflicts(client, db, admin, make_project):
+    project = make_project(2)
+    first, second = db.query(Candidate).filter(Candidate.project_id == project.id).order_by(Candidate.id)
+    headers = admin["headers"]
+    client.post("/api/monthly-kpis", json={"candidate_id": first.id, "month": "2024-03-01"}, headers=headers)
+    kpi = client.post("/api/monthly-kpis", json={"candidate_id": second.id, "month": "2024-04-01", "violations": 2},
+                      headers=headers).json()
+
+    resp = client.put(f"/api/monthly-kpis/{kpi['id']}", json={"candidate_id": first.id, "month": "2024-03-01"},
+                      headers=headers)
+    assert resp.status_code == 409
+    db.expire_all()
+    assert (db.get(MonthlyKPI, kpi["id"]).candidate_id, db.get(MonthlyKPI, kpi["id"]).violations) == (second.id, 2)
+
+    resp = client.put(f"/api/monthly-kpis/{kpi['id']}", json={"candidate_id": first.id, "month": "2024-04-01"},
+                      headers=headers)
+    assert resp.status_code == 200
@@ -0,0 +1,122 @@
+import hashlib
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from models import Project, ChangeTombstone
+
+# ==================== PROJECT VERSION STAMPS ====================
+# Every write to a project's data (the project itself, its candidates,
+# sections, assignments, daily logs and KPIs) bumps projects.data_version.
+# Read endpoints derive their ETag from it instead of from the payload.
+#
+# Written rows are stamped with the new version in change_version, and
+# deletes leave a ChangeTombstone, so GET /api/projects/{id}/changes can
+# return everything newer than a client's cursor. The bump locks the
+# project row until commit, so versions are committed in order.
+
+def bump_project_version(db: Session, project_id: int) -> Optional[int]:
+    """Mark a project's data as changed and return the new version. The caller commits."""
+    result = db.execute(
+        update(Project)
+        .where(Project.id == project_id)
+        .values(data_version=Project.data_version + 1)
+        .returning(Project.data_version)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar()
+
+def lock_project(db: Session, project_id: int) -> Optional[int]:
+    """Lock the project row until commit (SELECT ... FOR UPDATE) and return its version.
+
+    Writes computed from rows they read first take the lock before reading,
+    so two of them on the same project run one after the other.
+    """
+    return db.query(Project.data_version).filter(Project.id == project_id).with_for_update().scalar()
+
+def project_data_version(db: Session, project_id: int) -> Optional[int]:
+    return db.query(Project.data_version).filter(Project.id == project_id).scalar()
+
+def project_change_window(db: Session, project_id: int) -> Optional[Tuple[int, int]]:
+    """(data_version, tombstone_horizon): the cursors GET /changes can answer with a delta"""
+    return db.query(Project.data_version, Project.tombstone_horizon).filter(Project.id == project_id).first()
+
+def stamp_changes(db: Session, project_id: int, *rows) -> Optional[int]:
+    """Bump the project's version and stamp `rows` with it. The caller commits."""
+    version = bump_project_version(db, project_id)
+    for row in rows:
+        row.change_version = version
+    return version
+
+def record_deletion(db: Session, project_id: int, version: int, entity: str, entity_id: int, **details):
+    """Leave a tombstone for a deleted row. The caller commits."""
+    db.add(ChangeTombstone(
+        project_id=project_id,
+        entity=entity,
+        entity_id=entity_id,
+        details=details or None,
+        change_version=version
+    ))
+
+# ==================== TOMBSTONE RETENTION ====================
+# Tombstones are kept for TOMBSTONE_RETENTION_DAYS. Pruning raises each
+# project's tombstone_horizon to the newest version it deleted: a client
+# whose cursor is below the horizon may have missed a deletion, so /changes
+# sends it the whole project ("reset": true) instead of a delta.
+
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+
+def prune_tombstones(db: Session, older_than: Optional[datetime] = None) -> int:
+    """Delete tombstones recorded before `older_than` (default: the retention
+    window ago) and return how many were deleted. The caller commits."""
+    if older_than is None:
+        older_than = datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    horizons = db.query(ChangeTombstone.project_id, func.max(ChangeTombstone.change_version)).filter(
+        ChangeTombstone.created_at < older_than
+    ).group_by(ChangeTombstone.project_id).order_by(ChangeTombstone.project_id).all()
+    if not horizons:
+        return 0
+    # Later tombstones have higher versions, so the horizon only moves forward
+    db.execute(update(Project), [{"id": project_id, "tombstone_horizon": version} for project_id, version in horizons])
+    return db.query(ChangeTombstone).filter(
+        ChangeTombstone.created_at < older_than
+    ).delete(synchronize_session=False)
+
+def bump_project_versions(db: Session, project_ids: Iterable[int]) -> Dict[int, int]:
+    """Bump several projects at once and return {project id: new version}. The caller commits."""
+    project_ids = set(project_ids)
+    if not project_ids:
+        return {}
+    result = db.execute(
+        update(Project)
+        .where(Project.id.in_(project_ids))
+        .values(data_version=Project.data_version + 1)
+        .returning(Project.id, Project.data_version)
+        .execution_options(synchronize_session=False)
+    )
+    return dict(result.all())
+
+# ==================== ETAGS ====================
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the parts that determine a response"""
+    digest = hashlib.sha1(":".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    return "*" in candidates or etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+def conditional_response(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Tag `response` with `etag`; return a 304 to send instead when the client is up to date"""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -177,6 +177,21 @@ export default function App() {
     }
   }, [selectedProject?.id, projectTab, fetchSections]);
 
+  // Candidate payloads only carry recent logs; pull in the chart range when it reaches further back
+  useEffect(() => {
+    const projectId = selectedProject?.id;
+    if (!projectId) return;
+    api.getCandidatesByProject(projectId, projectChartRange).then(ranged => {
+      const byId = Object.fromEntries(ranged.map(c => [c.id, c]));
+      setSelectedProject(prev => prev?.id !== projectId ? prev : {
+        ...prev,
+        candidates: (prev.candidates || []).map(c => byId[c.id]
+          ? { ...c, dailyLogs: { ...byId[c.id].dailyLogs, ...c.dailyLogs } }
+          : c)
+      });
+    }).catch(error => console.error('Error fetching chart range:', error));
+  }, [selectedProject?.id, projectChartRange]);
+
   // Handlers
   const saveProject = async () => {
     try {
@@ -306,7 +321,9 @@ export default function App() {
   const handlePhotoSave = async (base64) => {
     try {
       setLoading(true);
-      await api.updateCandidate(photoCandidate.id, { ...photoCandidate, photo: base64 }, selectedProject.id);
+      const blob = await (await fetch(base64)).blob();
+      const photo = await api.uploadPhoto(blob);
+      await api.updateCandidate(photoCandidate.id, { ...photoCandidate, photo }, selectedProject.id);
       await fetchProjects();
       setPhotoCandidate(null);
     } catch (error) {
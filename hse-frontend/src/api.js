@@ -14,7 +14,10 @@ const setToken = (token) => {
     localStorage.removeItem('hse_token');
   }
 };
-const removeToken = () => localStorage.removeItem('hse_token');
+const removeToken = () => {
+  localStorage.removeItem('hse_token');
+  localStorage.removeItem('hse_photo_key');
+};
 const getUser = () => {
   try {
     const user = localStorage.getItem('hse_user');
@@ -34,10 +37,40 @@ const setUser = (user) => {
 };
 const removeUser = () => localStorage.removeItem('hse_user');
 
+// Photo URLs carry a short-lived key (?key=...) because <img> tags can't send the token.
+// It is fetched before other requests, so data transformed after them can use it.
+const PHOTO_KEY_ENDPOINT = '/photos/key';
+const getPhotoKey = () => {
+  try {
+    return JSON.parse(localStorage.getItem('hse_photo_key'));
+  } catch (e) {
+    return null;
+  }
+};
+let photoKeyRequest = null;
+const ensurePhotoKey = async () => {
+  const current = getPhotoKey();
+  if (current && current.expires_at * 1000 > Date.now() + 60 * 60 * 1000) return;
+  if (!photoKeyRequest) {
+    photoKeyRequest = fetchAPI(PHOTO_KEY_ENDPOINT)
+      .then((data) => localStorage.setItem('hse_photo_key', JSON.stringify(data)))
+      .finally(() => { photoKeyRequest = null; });
+  }
+  try {
+    await photoKeyRequest;
+  } catch (e) {
+    // Photos won't load, but the request itself can go ahead
+  }
+};
+
 // Helper function for fetch with error handling and logging
 const fetchAPI = async (url, options = {}, requireAuth = true) => {
   const fullURL = url.startsWith('http') ? url : `${API_BASE}${url}`;
 
+  if (requireAuth && url !== PHOTO_KEY_ENDPOINT && getToken()) {
+    await ensurePhotoKey();
+  }
+
   console.log('🚀 Request:', options.method || 'GET', fullURL);
 
   const headers = {
@@ -122,6 +155,8 @@ export const changePassword = async (currentPassword, newPassword) => {
       new_password: newPassword
     }),
   });
+  // Other sessions are signed out; keep this one with the new token
+  if (data.access_token) setToken(data.access_token);
   return data;
 };
 
@@ -197,6 +232,21 @@ export const updateUserAssignments = async (userId, projectIds) => {
 
 // ==================== DATA TRANSFORMATION ====================
 
+// Uploaded photos are stored by the backend as "/api/photos/<hash>".
+// Resolve them against API_BASE with the photo key for <img src>, and send them back relative.
+const PHOTO_PATH = '/api/photos/';
+const resolvePhoto = (photo) => {
+  if (!photo || !photo.startsWith(PHOTO_PATH)) return photo;
+  const key = getPhotoKey();
+  const query = key ? `?key=${encodeURIComponent(key.key)}` : '';
+  return `${API_BASE}/photos/${photo.slice(PHOTO_PATH.length)}${query}`;
+};
+const photoRef = (photo) =>
+  photo && photo.startsWith(`${API_BASE}/photos/`)
+    ? `${PHOTO_PATH}${photo.slice(API_BASE.length + '/photos/'.length).split('?')[0]}`
+    : photo;
+const withResolvedPhoto = (candidate) => ({ ...candidate, photo: resolvePhoto(candidate.photo) });
+
 // Transform backend data (snake_case) to frontend (camelCase)
 const transformProject = (project) => ({
   id: project.id,
@@ -205,7 +255,7 @@ const transformProject = (project) => ({
   company: project.company,
   hseLead: {
     name: project.hse_lead_name,
-    photo: project.hse_lead_photo
+    photo: resolvePhoto(project.hse_lead_photo)
   },
   manpower: project.manpower,
   manHours: project.man_hours,
@@ -231,7 +281,7 @@ const transformProjectToBackend = (project) => ({
   location: project.location,
   company: project.company,
   hse_lead_name: project.hseLeadName,
-  hse_lead_photo: project.hseLeadPhoto,
+  hse_lead_photo: photoRef(project.hseLeadPhoto),
   manpower: parseInt(project.manpower) || 0,
   man_hours: parseInt(project.manHours) || 0,
   new_inductions: parseInt(project.newInductions) || 0,
@@ -243,7 +293,7 @@ const transformProjectToBackend = (project) => ({
 const transformCandidateToBackend = (candidate, projectId) => ({
   project_id: projectId,
   name: candidate.name,
-  photo: candidate.photo,
+  photo: photoRef(candidate.photo),
   role: candidate.role || '',
   display_order: candidate.displayOrder || 0
 });
@@ -255,6 +305,20 @@ export const getProjects = async () => {
   return data.map(transformProject);
 };
 
+// Lightweight list for pickers: id, name, location, lead names and candidate counts only
+export const getProjectSummaries = async () => {
+  const data = await fetchAPI('/projects/summary');
+  return data.map(project => ({
+    id: project.id,
+    name: project.name,
+    location: project.location,
+    company: project.company,
+    hseLeadName: project.hse_lead_name,
+    candidateCount: project.candidate_count,
+    assignedLeads: project.assigned_leads || []
+  }));
+};
+
 export const createProject = async (project) => {
   const data = await fetchAPI('/projects', {
     method: 'POST',
@@ -277,13 +341,54 @@ export const deleteProject = async (id) => {
   });
 };
 
+// Daily logs are limited to a date window (previous + current month by default).
+// Pass { from, to } (YYYY-MM-DD) to load a different range.
+const logWindowQuery = (range) => {
+  const params = new URLSearchParams();
+  if (range?.from) params.set('from', range.from);
+  if (range?.to) params.set('to', range.to);
+  const query = params.toString();
+  return query ? `?${query}` : '';
+};
+
+// Compliance scores computed on the server, no raw logs needed
+// { project, sections: [...], candidates: [{ id, score, fields }] }
+export const getProjectScores = async (projectId, range) => {
+  const data = await fetchAPI(`/projects/${projectId}/scores${logWindowQuery(range)}`);
+  return data;
+};
+
+// ==================== PHOTOS ====================
+
+// Upload an image (Blob) to the photo store; returns the URL to save on the row
+export const uploadPhoto = async (blob) => {
+  const body = new FormData();
+  body.append('file', blob, 'photo.jpg');
+  const response = await fetch(`${API_BASE}/photos`, {
+    method: 'POST',
+    headers: { Authorization: `Bearer ${getToken()}` },
+    body,
+  });
+  if (!response.ok) {
+    let errorMsg = `HTTP ${response.status}`;
+    try {
+      errorMsg = (await response.json()).detail || errorMsg;
+    } catch (e) {
+      // Not JSON
+    }
+    throw new Error(errorMsg);
+  }
+  const data = await response.json();
+  return data.url;
+};
+
 // ==================== CANDIDATES ====================
 // ⚠️ IMPORTANT: Backend returns COMPLETE data with dailyLogs and monthlyKPIs
 // We do NOT make separate API calls for logs/KPIs anymore
 
-export const getCandidatesByProject = async (projectId) => {
+export const getCandidatesByProject = async (projectId, range) => {
   console.log('📥 Getting candidates for project', projectId, '(with dailyLogs & monthlyKPIs included)');
-  const data = await fetchAPI(`/candidates/project/${projectId}`);
+  const data = await fetchAPI(`/candidates/project/${projectId}${logWindowQuery(range)}`);
 
   // Backend returns complete data structure:
   // [{
@@ -293,16 +398,16 @@ export const getCandidatesByProject = async (projectId) => {
   // }]
 
   console.log('✅ Received', data.length, 'candidates with complete data');
-  return data;
+  return data.map(withResolvedPhoto);
 };
 
-export const getCandidate = async (candidateId) => {
+export const getCandidate = async (candidateId, range) => {
   console.log('📥 Getting candidate', candidateId, '(with dailyLogs & monthlyKPIs included)');
-  const data = await fetchAPI(`/candidates/${candidateId}`);
+  const data = await fetchAPI(`/candidates/${candidateId}${logWindowQuery(range)}`);
 
   // Backend returns complete data with dailyLogs and monthlyKPIs already included
   console.log('✅ Received candidate with complete data');
-  return data;
+  return withResolvedPhoto(data);
 };
 
 export const createCandidate = async (candidate, projectId) => {
@@ -315,7 +420,7 @@ export const createCandidate = async (candidate, projectId) => {
   return {
     id: data.id,
     name: data.name,
-    photo: data.photo,
+    photo: resolvePhoto(data.photo),
     role: data.role,
     displayOrder: data.display_order || 0,
     dailyLogs: {},
@@ -341,7 +446,7 @@ export const updateCandidate = async (id, candidate, projectId) => {
   return {
     id: data.id,
     name: data.name,
-    photo: data.photo,
+    photo: resolvePhoto(data.photo),
     role: data.role,
     displayOrder: data.display_order || 0,
     dailyLogs: candidate.dailyLogs || {},
@@ -375,41 +480,54 @@ export const reorderCandidates = async (projectId, candidateIds) => {
 // These endpoints are for CREATING/UPDATING logs, NOT fetching them
 // (Logs are fetched as part of getCandidatesByProject)
 
+const dailyLogBody = (candidateId, date, log) => ({
+  candidate_id: candidateId,
+  log_date: date,
+  time_in: log.timeIn || null,
+  time_out: log.timeOut || null,
+  task_briefing: log.taskBriefing,
+  tbt_conducted: log.tbtConducted,
+  violation_briefing: log.violationBriefing,
+  checklist_submitted: log.checklistSubmitted,
+  inductions_covered: log.inductionsCovered,
+  barcode_implemented: log.barcodeImplemented,
+  attendance_verified: log.attendanceVerified,
+  safety_observations_recorded: log.safetyObservationsRecorded,
+  sor_ncr_closed: log.sorNcrClosed,
+  mock_drill_participated: log.mockDrillParticipated,
+  campaign_participated: log.campaignParticipated,
+  monthly_inspections_completed: log.monthlyInspectionsCompleted,
+  near_miss_reported: log.nearMissReported,
+  weekly_training_briefed: log.weeklyTrainingBriefed,
+  daily_reports_followup: log.dailyReportsFollowup,
+  msra_communicated: log.msraCommunicated,
+  consultant_responses: log.consultantResponses,
+  weekly_tbt_full_participation: log.weeklyTbtFullParticipation,
+  welfare_facilities_monitored: log.welfareFacilitiesMonitored,
+  monday_ncr_shared: log.mondayNcrShared,
+  safety_walks_conducted: log.safetyWalksConducted,
+  training_sessions_conducted: log.trainingSessionsConducted,
+  barcode_system_100: log.barcodeSystem100,
+  task_briefings_participating: log.taskBriefingsParticipating,
+  comment: log.comment || null,
+  description: log.description || null
+});
+
 export const createDailyLog = async (candidateId, date, log) => {
   const data = await fetchAPI('/daily-logs', {
     method: 'POST',
-    body: JSON.stringify({
-      candidate_id: candidateId,
-      log_date: date,
-      time_in: log.timeIn || null,
-      time_out: log.timeOut || null,
-      task_briefing: log.taskBriefing,
-      tbt_conducted: log.tbtConducted,
-      violation_briefing: log.violationBriefing,
-      checklist_submitted: log.checklistSubmitted,
-      inductions_covered: log.inductionsCovered,
-      barcode_implemented: log.barcodeImplemented,
-      attendance_verified: log.attendanceVerified,
-      safety_observations_recorded: log.safetyObservationsRecorded,
-      sor_ncr_closed: log.sorNcrClosed,
-      mock_drill_participated: log.mockDrillParticipated,
-      campaign_participated: log.campaignParticipated,
-      monthly_inspections_completed: log.monthlyInspectionsCompleted,
-      near_miss_reported: log.nearMissReported,
-      weekly_training_briefed: log.weeklyTrainingBriefed,
-      daily_reports_followup: log.dailyReportsFollowup,
-      msra_communicated: log.msraCommunicated,
-      consultant_responses: log.consultantResponses,
-      weekly_tbt_full_participation: log.weeklyTbtFullParticipation,
-      welfare_facilities_monitored: log.welfareFacilitiesMonitored,
-      monday_ncr_shared: log.mondayNcrShared,
-      safety_walks_conducted: log.safetyWalksConducted,
-      training_sessions_conducted: log.trainingSessionsConducted,
-      barcode_system_100: log.barcodeSystem100,
-      task_briefings_participating: log.taskBriefingsParticipating,
-      comment: log.comment || null,
-      description: log.description || null
-    }),
+    body: JSON.stringify(dailyLogBody(candidateId, date, log)),
+  });
+  return data;
+};
+
+// Saves many logs in one request, e.g. a week of a project's grid.
+// entries: [{ candidateId, date, log }]; returns one result per entry
+// ({ index, status: 'created' | 'updated' | 'forbidden', log })
+export const saveDailyLogs = async (entries) => {
+  const data = await fetchAPI('/daily-logs/bulk', {
+    method: 'POST',
+    body: JSON.stringify(entries.map(({ candidateId, date, log }) => dailyLogBody(candidateId, date, log))),
   });
   return data;
 };
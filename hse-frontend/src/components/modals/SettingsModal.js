@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { X, AlertCircle, CheckCircle2, Users, UserPlus, Trash2, Shield, User, Download, Key } from 'lucide-react';
-import { changePassword, getUsers, inviteUser, deleteUser, updateUserRole, exportData, getProjects, updateUserAssignments } from '../../api';
+import { changePassword, getUsers, inviteUser, deleteUser, updateUserRole, exportData, getProjectSummaries, updateUserAssignments } from '../../api';
 
 export const SettingsModal = ({ isOpen, onClose, currentUser, projects = [], onRefresh }) => {
     const [activeTab, setActiveTab] = useState('security'); // 'security' or 'team'
@@ -44,7 +44,7 @@ export const SettingsModal = ({ isOpen, onClose, currentUser, projects = [], onR
 
     const fetchAllProjects = async () => {
         try {
-            const data = await getProjects();
+            const data = await getProjectSummaries();
             setAllProjects(data);
         } catch (err) {
             console.error('Failed to fetch projects');